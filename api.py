@@ -0,0 +1,338 @@
+"""
+Headless HTTP API for EduTutor AI
+
+Serves the same generators as the Streamlit app as JSON endpoints, with server-sent
+event streaming and a batch endpoint, for LMS integrations that should not pay for a
+Streamlit script rerun per request.
+
+Run with:
+    uvicorn api:app --host 0.0.0.0 --port 8000
+"""
+import asyncio
+import base64
+import binascii
+import json
+import os
+
+import anyio
+from dotenv import load_dotenv
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+from utils.content_gen import (
+    generate_lesson,
+    generate_practice_exercises,
+    stream_answer,
+    stream_flashcard_deck,
+    stream_quiz_items,
+    summarize_content,
+)
+from utils.library import library
+from utils.metrics import metrics
+from utils.resilience import DeadlineExceeded, ErrorResult
+from utils.retrieval import retrieve_context
+from utils.scheduler import SchedulerBusy
+
+# Load .env
+load_dotenv()
+
+# Worker threads for the blocking generator calls; most of them just wait on the
+# LLM scheduler or a coalesced request, so this can be far above the upstream limit
+API_THREADS = int(os.getenv("EDUTUTOR_API_THREADS", 256))
+MAX_BATCH_SIZE = int(os.getenv("EDUTUTOR_API_MAX_BATCH", 50))
+MAX_DECK_SIZE = 500
+
+_limiter = None
+
+
+def _get_limiter():
+    # Created lazily, since it must belong to the server's event loop
+    global _limiter
+    if _limiter is None:
+        _limiter = anyio.CapacityLimiter(API_THREADS)
+    return _limiter
+
+
+class BadRequest(ValueError):
+    """Raised for a request body that does not match the endpoint's parameters."""
+
+
+def _text(value):
+    if not isinstance(value, str):
+        raise TypeError
+    return value
+
+
+def _count(value):
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise TypeError
+    if not 1 <= value <= MAX_DECK_SIZE:
+        raise ValueError
+    return value
+
+
+def _styles(value):
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list) or not all(isinstance(style, str) for style in value):
+        raise TypeError
+    return value
+
+
+# Parameters accepted per content type: name -> (parser, required)
+PARAMETERS = {
+    "lesson": {"topic": (_text, True), "detail_level": (_text, False), "difficulty": (_text, False),
+               "learning_style": (_styles, False)},
+    "quiz": {"topic": (_text, True), "difficulty": (_text, False)},
+    "flashcards": {"topic": (_text, True), "count": (_count, False)},
+    "exercises": {"topic": (_text, True), "difficulty": (_text, False)},
+    "summary": {"content": (_text, True), "length": (_text, False)},
+    "ask": {"question": (_text, True), "document": (_text, False), "document_id": (_text, False),
+            "file": (_text, False), "file_type": (_text, False), "file_name": (_text, False)},
+}
+
+
+def parse_params(kind, body):
+    """
+    Validate a request body against the parameters of a content type
+
+    Args:
+        kind (str): Content type
+        body (dict): Decoded JSON body
+
+    Returns:
+        dict: Parameters to pass to the generator
+
+    Raises:
+        BadRequest: On unknown, missing or mistyped parameters
+    """
+    if not isinstance(body, dict):
+        raise BadRequest("Request body must be a JSON object")
+    spec = PARAMETERS[kind]
+    unknown = sorted(set(body) - set(spec))
+    if unknown:
+        raise BadRequest(f"Unknown parameters for {kind}: {', '.join(unknown)}")
+    params = {}
+    for name, (parse, required) in spec.items():
+        if name not in body:
+            if required:
+                raise BadRequest(f"Missing required parameter: {name}")
+            continue
+        try:
+            params[name] = parse(body[name])
+        except (TypeError, ValueError):
+            raise BadRequest(f"Invalid value for parameter: {name}")
+        if required and not str(params[name]).strip():
+            raise BadRequest(f"Missing required parameter: {name}")
+    return params
+
+
+def _document_excerpts(params):
+    document = params.pop("document", None)
+    document_id = params.pop("document_id", None)
+    encoded = params.pop("file", None)
+    file_type = params.pop("file_type", "text/plain")
+    file_name = params.pop("file_name", None)
+    if encoded is not None:
+        try:
+            data = base64.b64decode(encoded, validate=True)
+        except (binascii.Error, ValueError):
+            raise BadRequest("file must be base64-encoded")
+    elif document:
+        data, file_type = document.encode("utf-8"), "text/plain"
+    else:
+        data = None
+    if data is not None:
+        # Inline text goes to the document library like files do, so it is indexed once
+        # per content and held on disk rather than in memory
+        document_id = library.add(data, file_type, file_name)
+        if document_id is None:
+            raise BadRequest("Unsupported file type or empty file")
+    if document_id is not None:
+        index = library.index(document_id)
+        if index is None:
+            raise BadRequest(f"Unknown document_id: {document_id}")
+        return retrieve_context(index, params["question"])
+    return None
+
+
+def _start_stream(kind, params):
+    """
+    Start the streamed generator for a content type
+
+    Returns:
+        tuple: (iterator, event name) where the iterator yields str chunks for text
+        content or dicts for structured quiz questions and flashcards
+    """
+    if kind == "lesson":
+        return generate_lesson(**params, stream=True), "chunk"
+    if kind == "quiz":
+        return stream_quiz_items(**params), "item"
+    if kind == "flashcards":
+        return stream_flashcard_deck(**params), "item"
+    if kind == "exercises":
+        return generate_practice_exercises(**params, stream=True), "chunk"
+    if kind == "summary":
+        return summarize_content(**params, stream=True), "chunk"
+    return stream_answer(params["question"], _document_excerpts(params)), "chunk"
+
+
+def generate(kind, params):
+    """
+    Run one generation request to completion (blocking)
+
+    Args:
+        kind (str): Content type
+        params (dict): Parameters returned by parse_params
+
+    Returns:
+        dict: {"content": markdown} for text content, {"items": [...]} for quiz
+        questions and flashcards
+
+    Raises:
+        RuntimeError: If the generator reported an error
+    """
+    params = dict(params)
+    if kind in ("quiz", "flashcards"):
+        iterator, _ = _start_stream(kind, params)
+        items = list(iterator)
+        if not items:
+            raise RuntimeError(f"Error generating {kind}: the model returned no usable items")
+        return {"items": items}
+    if kind == "ask":
+        iterator, _ = _start_stream(kind, params)
+        return {"content": "".join(iterator)}
+    generator = {"lesson": generate_lesson, "exercises": generate_practice_exercises,
+                 "summary": summarize_content}[kind]
+    content = generator(**params)
+    if isinstance(content, ErrorResult):
+        raise RuntimeError(content)
+    return {"content": content}
+
+
+def _error_payload(e):
+    if isinstance(e, BadRequest):
+        return 400, {"error": str(e)}
+    if isinstance(e, SchedulerBusy):
+        return 503, {"error": str(e)}
+    if isinstance(e, DeadlineExceeded):
+        return 504, {"error": str(e)}
+    return 502, {"error": str(e) or type(e).__name__}
+
+
+async def _read_json(request):
+    try:
+        return await request.json()
+    except (ValueError, UnicodeDecodeError):
+        raise BadRequest("Request body must be valid JSON")
+
+
+async def _run(kind, body):
+    params = parse_params(kind, body)
+    return await anyio.to_thread.run_sync(generate, kind, params, limiter=_get_limiter())
+
+
+async def generate_endpoint(request):
+    kind = request.path_params["kind"]
+    if kind not in PARAMETERS:
+        return JSONResponse({"error": f"Unknown content type: {kind}"}, status_code=404)
+    try:
+        result = await _run(kind, await _read_json(request))
+    except Exception as e:
+        status, payload = _error_payload(e)
+        headers = {"Retry-After": "5"} if status == 503 else None
+        return JSONResponse(payload, status_code=status, headers=headers)
+    return JSONResponse(result)
+
+
+def _event(name, data):
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+
+_DONE = object()
+
+
+async def _sse(kind, params):
+    limiter = _get_limiter()
+    iterator = None
+    try:
+        iterator, event = await anyio.to_thread.run_sync(_start_stream, kind, dict(params), limiter=limiter)
+        while True:
+            piece = await anyio.to_thread.run_sync(next, iterator, _DONE, limiter=limiter)
+            if piece is _DONE:
+                break
+            yield _event(event, {"text": piece} if event == "chunk" else piece)
+        yield _event("done", {})
+    except Exception as e:
+        yield _event("error", _error_payload(e)[1])
+    finally:
+        close = getattr(iterator, "close", None)
+        if close:
+            # If the client went away mid-stream and nobody else shares the stream, the
+            # upstream request stops at its next chunk and releases its scheduler slot
+            await anyio.to_thread.run_sync(close, limiter=limiter)
+
+
+async def stream_endpoint(request):
+    kind = request.path_params["kind"]
+    if kind not in PARAMETERS:
+        return JSONResponse({"error": f"Unknown content type: {kind}"}, status_code=404)
+    try:
+        params = parse_params(kind, await _read_json(request))
+    except BadRequest as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    return StreamingResponse(
+        _sse(kind, params),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def batch_endpoint(request):
+    try:
+        body = await _read_json(request)
+        requests = body.get("requests") if isinstance(body, dict) else None
+        if not isinstance(requests, list) or not requests:
+            raise BadRequest("Body must be an object with a non-empty 'requests' list")
+        if len(requests) > MAX_BATCH_SIZE:
+            raise BadRequest(f"At most {MAX_BATCH_SIZE} requests per batch")
+    except BadRequest as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    async def run_one(item):
+        try:
+            if not isinstance(item, dict) or item.get("type") not in PARAMETERS:
+                raise BadRequest(f"Each request needs a 'type' of: {', '.join(PARAMETERS)}")
+            params = {name: value for name, value in item.items() if name != "type"}
+            return {"type": item["type"], "status": 200, **await _run(item["type"], params)}
+        except Exception as e:
+            status, payload = _error_payload(e)
+            return {"type": item.get("type") if isinstance(item, dict) else None, "status": status, **payload}
+
+    # Identical items in one batch are coalesced by the response cache layer
+    results = await asyncio.gather(*(run_one(item) for item in requests))
+    return JSONResponse({"results": results})
+
+
+async def health_endpoint(request):
+    return JSONResponse({"status": "ok"})
+
+
+async def metrics_endpoint(request):
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+app = Starlette(routes=[
+    Route("/health", health_endpoint, methods=["GET"]),
+    Route("/metrics", metrics_endpoint, methods=["GET"]),
+    Route("/v1/batch", batch_endpoint, methods=["POST"]),
+    Route("/v1/{kind}", generate_endpoint, methods=["POST"]),
+    Route("/v1/{kind}/stream", stream_endpoint, methods=["POST"]),
+])
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host=os.getenv("EDUTUTOR_API_HOST", "127.0.0.1"), port=int(os.getenv("EDUTUTOR_API_PORT", 8000)))
@@ -1,92 +1,43 @@
 import streamlit as st
+import html
 import os
+import uuid
 from dotenv import load_dotenv
-from langchain_community.chat_models import ChatOpenAI
-from langchain.prompts import PromptTemplate
-import requests
 from streamlit_option_menu import option_menu
+from utils.cache import refresh, response_cache
+from utils.resources import load_css, load_lottie
+from utils.metrics import metrics, start_metrics_server
+from utils.prefetch import prefetcher
+from utils.resilience import ErrorResult, resilience_stats
+from utils.scheduler import scheduler
+from utils.semantic_cache import semantic_cache
+from utils.singleflight import single_flight
+from utils.tokens import compaction_stats
+from utils.results import ResultStore
+from utils.library import library
+from utils.retrieval import retrieve_context
+from utils.router import router
+from utils.generation import templates
+from utils.content_gen import (
+    generate_lesson,
+    generate_quiz,
+    generate_study_pack,
+    prefetch_after_lesson,
+    stream_flashcard_deck,
+)
+from utils.conversation import Conversation
 
 # Load .env
 load_dotenv()
-API_KEY = os.getenv("OPENAI_API_KEY")
-API_BASE = os.getenv("OPENAI_API_BASE")
-
-# Initialize LLM
-llm = ChatOpenAI(
-    model="mistralai/mixtral-8x7b-instruct",
-    temperature=0.7,
-    openai_api_key=API_KEY,
-    openai_api_base=API_BASE
-)
-
-# Function to load lottie animation
-def load_lottieurl(url: str):
-    r = requests.get(url)
-    if r.status_code != 200:
-        return None
-    return r.json()
-
-lottie_ai = load_lottieurl("https://lottie.host/4d266ee4-2d6f-4c86-83a9-4fd050c61bc5/qwJ6zNUzBc.json")
 
-# ---------- Content Generation Functions ----------
-def generate_lesson(topic, detail_level="Basic", difficulty="Intermediate", learning_style=["Visual"]):
-    prompt_template = PromptTemplate(
-        input_variables=["topic", "detail_level", "difficulty", "learning_style"],
-        template="""Create a {detail_level} lesson about {topic} for a {difficulty} level student who prefers {learning_style} learning style. 
-Include:
-1. Learning Objectives
-2. Main content with examples
-3. Key takeaways
-4. Practice activities
-Use markdown for formatting with headings, bullet points, and bold text for emphasis."""
-    )
-    prompt = prompt_template.format(
-        topic=topic,
-        detail_level=detail_level,
-        difficulty=difficulty,
-        learning_style=", ".join(learning_style)
-    )
-    try:
-        response = llm.invoke(prompt)
-        return response.content
-    except Exception as e:
-        return f"Error: {str(e)}"
-
-def generate_quiz(topic, difficulty="Intermediate"):
-    prompt_template = PromptTemplate(
-        input_variables=["topic", "difficulty"],
-        template="""Create a 5-question multiple choice quiz about {topic} for {difficulty} students.
-Format each question clearly with:
-- Question stem
-- Options labeled A-D
-- Correct answer marked with (Correct)
-- Brief explanation for each answer
-Use markdown formatting with ### for question headings and > for explanations."""
-    )
-    prompt = prompt_template.format(topic=topic, difficulty=difficulty)
-    try:
-        response = llm.invoke(prompt)
-        return response.content
-    except Exception as e:
-        return f"Error: {str(e)}"
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+CSS_PATH = os.path.join(APP_DIR, "assets", "styles.css")
+LOTTIE_URL = "https://lottie.host/4d266ee4-2d6f-4c86-83a9-4fd050c61bc5/qwJ6zNUzBc.json"
+# Show the Admin tab with live latency percentiles and cache/scheduler stats
+ADMIN_ENABLED = os.getenv("EDUTUTOR_ADMIN", "").lower() in ("1", "true", "yes")
 
-def generate_flashcards(topic, count=5):
-    prompt_template = PromptTemplate(
-        input_variables=["topic", "count"],
-        template="""Create {count} high-quality flashcards for {topic}.
-Format each card as:
-**Front:** [Question/Term]  
-**Back:** [Answer/Definition] (1-2 sentences max)
-
-Separate each flashcard with ---
-Ensure concepts are clear and suitable for students."""
-    )
-    prompt = prompt_template.format(topic=topic, count=count)
-    try:
-        response = llm.invoke(prompt)
-        return response.content
-    except Exception as e:
-        return f"Error: {str(e)}"
+# Prometheus-style /metrics endpoint, when EDUTUTOR_METRICS_PORT is set
+start_metrics_server()
 
 # ---------- UI Configuration ----------
 st.set_page_config(
@@ -96,198 +47,12 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-# Responsive CSS with media queries
-st.markdown("""
-<style>
-html, body {
-    font-family: 'Segoe UI', sans-serif;
-    background-color: #f0f4f8;
-    margin: 0;
-    padding: 0;
-}
-
-.main-title {
-    font-size: 50px;
-    font-weight: bold;
-    background: linear-gradient(90deg, #1d8cf8, #f96332);
-    -webkit-background-clip: text;
-    -webkit-text-fill-color: transparent;
-    text-align: center;
-    animation: fadeIn 1s ease-in;
-}
-
-.subtitle {
-    text-align: center;
-    font-size: 20px;
-    color: #555;
-    margin-bottom: 30px;
-    animation: fadeInUp 1.5s ease-in-out;
-}
-
-.stButton>button {
-    background: linear-gradient(to right, #ff416c, #ff4b2b);
-    color: white;
-    font-size: 18px;
-    padding: 10px 24px;
-    border-radius: 12px;
-    border: none;
-    transition: all 0.4s ease-in-out;
-    box-shadow: 0 4px 15px rgba(255, 75, 75, 0.3);
-}
-
-.stButton>button:hover {
-    transform: scale(1.05);
-    box-shadow: 0 6px 20px rgba(255, 75, 75, 0.4);
-        color: white;
-    
-}
-
-.card {
-    background-color: white;
-    padding: 20px;
-    border-radius: 12px;
-    box-shadow: 0 6px 20px rgba(0,0,0,0.08);
-    margin-bottom: 20px;
-    transition: transform 0.3s ease;
-    border-left: 4px solid #4B8BBE;
-}
-
-.card:hover {
-    transform: translateY(-5px);
-}
-
-.flashcard {
-    perspective: 1000px;
-    margin-bottom: 20px;
-}
-
-.flashcard-inner {
-    position: relative;
-    width: 100%;
-    height: 150px;
-    transition: transform 0.8s;
-    transform-style: preserve-3d;
-}
-
-.flashcard:hover .flashcard-inner {
-    transform: rotateY(180deg);
-}
-
-.flashcard-front, .flashcard-back {
-    position: absolute;
-    width: 100%;
-    height: 100%;
-    padding: 15px;
-    backface-visibility: hidden;
-    border-radius: 10px;
-    box-shadow: 0 4px 10px rgba(0,0,0,0.1);
-    display: flex;
-    align-items: center;
-    justify-content: center;
-    text-align: center;
-}
-
-.flashcard-front {
-    background: #ffffff;
-    border: 1px solid #4B8BBE;
-}
-
-.flashcard-back {
-    background: #1d8cf8;
-    color: white;
-    transform: rotateY(180deg);
-}
-
-/* Responsive adjustments */
-@media (max-width: 768px) {
-    .main-title {
-        font-size: 36px;
-    }
-    
-    .subtitle {
-        font-size: 16px;
-    }
-    
-    .stButton>button {
-        font-size: 16px;
-        padding: 8px 16px;
-    }
-    
-    .card {
-        padding: 15px;
-    }
-    
-    .flashcard-inner {
-        height: 120px;
-    }
-}
-
-@media (max-width: 480px) {
-    .main-title {
-        font-size: 28px;
-    }
-    
-    .stButton>button {
-        width: 100%;
-    }
-    
-    .flashcard-inner {
-        height: 100px;
-    }
-}
-
-/* Animation keyframes */
-@keyframes fadeIn {
-    from { opacity: 0; }
-    to { opacity: 1; }
-}
-
-@keyframes fadeInUp {
-    from { 
-        opacity: 0;
-        transform: translateY(20px);
-    }
-    to { 
-        opacity: 1;
-        transform: translateY(0);
-    }
-}
-
-/* Custom container for better spacing */
-.custom-container {
-    padding: 2rem;
-    max-width: 1200px;
-    margin: 0 auto;
-}
-
-/* Form styling */
-.stTextInput>div>div>input, 
-.stTextArea>div>div>textarea,
-.stSelectbox>div>div>select {
-    border-radius: 8px !important;
-    border: 1px solid #ddd !important;
-    padding: 10px !important;
-}
-
-.stTextInput>div>div>input:focus, 
-.stTextArea>div>div>textarea:focus,
-.stSelectbox>div>div>select:focus {
-    border-color: #4B8BBE !important;
-    box-shadow: 0 0 0 2px rgba(75, 139, 190, 0.2) !important;
-}
-
-/* Custom divider */
-.custom-divider {
-    height: 1px;
-    background: linear-gradient(to right, transparent, #4B8BBE, transparent);
-    margin: 2rem 0;
-}
-</style>
-""", unsafe_allow_html=True)
+# Responsive CSS with media queries (read from disk once per process)
+st.markdown(load_css(CSS_PATH), unsafe_allow_html=True)
 
 # Get the current query parameters
 query_params = st.query_params
-initial_tab = query_params.get("tab", ["Home"])[0]
+initial_tab = query_params.get("tab", "Home")
 
 # Map tab names to indices
 tab_mapping = {
@@ -295,8 +60,15 @@ tab_mapping = {
     "Generate Lesson": 1,
     "Quiz": 2,
     "Flashcards": 3,
-    "Ask AI": 4
+    "Ask AI": 4,
+    "Study Pack": 5
 }
+menu_options = ["Home", "Generate Lesson", "Quiz", "Flashcards", "Ask AI", "Study Pack"]
+menu_icons = ["house", "book", "question-square", "card-checklist", "chat", "collection"]
+if ADMIN_ENABLED:
+    tab_mapping["Admin"] = len(menu_options)
+    menu_options.append("Admin")
+    menu_icons.append("speedometer2")
 
 # Set the default index based on the query parameter
 default_index = tab_mapping.get(initial_tab, 0)
@@ -304,8 +76,8 @@ default_index = tab_mapping.get(initial_tab, 0)
 with st.container():
     selected = option_menu(
         menu_title=None,
-        options=["Home", "Generate Lesson", "Quiz", "Flashcards", "Ask AI"],
-        icons=["house", "book", "question-square", "card-checklist", "chat"],
+        options=menu_options,
+        icons=menu_icons,
         default_index=default_index,
         orientation="horizontal",
         styles={
@@ -336,6 +108,52 @@ def update_query_param(tab_name):
     st.query_params["tab"] = tab_name
     st.rerun()
 
+# ---------- Session Results ----------
+# Generated content survives reruns (downloads, widget changes) without another LLM call
+results = ResultStore(st.session_state)
+result_tabs = {
+    "lesson": "Generate Lesson",
+    "quiz": "Quiz",
+    "flashcards": "Flashcards",
+    "study_pack": "Study Pack",
+}
+
+def regenerate_button(kind):
+    if st.button("Regenerate", key=f"regenerate_{kind}"):
+        results.regenerate(kind)
+        st.rerun()
+
+def render_flashcard(card):
+    front = html.escape(card["front"])
+    back = html.escape(card["back"])
+    
+    # Display as interactive card
+    st.markdown(f"""
+    <div class="flashcard">
+        <div class="flashcard-inner">
+            <div class="flashcard-front">
+                <div><strong>Front:</strong> {front}</div>
+            </div>
+            <div class="flashcard-back">
+                <div><strong>Back:</strong> {back}</div>
+            </div>
+        </div>
+    </div>
+    """, unsafe_allow_html=True)
+
+with st.sidebar:
+    st.markdown("### History")
+    history = results.history()
+    if not history:
+        st.caption("Generated content will be listed here.")
+    for entry in history:
+        if st.button(entry["title"], key=f"history_{entry['key']}", help=result_tabs[entry["kind"]]):
+            results.select(entry["key"])
+            update_query_param(result_tabs[entry["kind"]])
+    if history and st.button("Clear History"):
+        results.clear()
+        st.rerun()
+
 # ---------- Page Content ----------
 if selected == "Home":
     # Hero Section
@@ -356,7 +174,7 @@ if selected == "Home":
             update_query_param("Generate Lesson")
     
     with col2:
-        if lottie_ai:
+        if load_lottie(LOTTIE_URL):
             st.components.v1.html("""
                 <div style="text-align: center;">
                     <script src="https://unpkg.com/@lottiefiles/lottie-player@latest/dist/lottie-player.js"></script>
@@ -420,21 +238,37 @@ elif selected == "Generate Lesson":
     
     if submitted:
         if topic:
-            with st.spinner("Creating your personalized lesson..."):
-                lesson = generate_lesson(topic, detail_level, difficulty, learning_style)
-                st.markdown("---")
-                st.markdown("### Your Custom Lesson")
-                st.markdown(lesson, unsafe_allow_html=True)
-                
-                # Add download button
-                st.download_button(
-                    label="Download Lesson",
-                    data=lesson,
-                    file_name=f"{topic}_lesson.md",
-                    mime="text/markdown"
-                )
+            results.request("lesson", f"📚 {topic}", topic=topic, detail_level=detail_level,
+                            difficulty=difficulty, learning_style=learning_style)
         else:
             st.warning("Please enter a topic to generate a lesson.")
+    
+    entry = results.current("lesson")
+    if entry:
+        st.markdown("---")
+        st.markdown("### Your Custom Lesson")
+        if entry["value"] is None:
+            try:
+                # Render the lesson as it streams in; write_stream returns the full text
+                with refresh(entry["refresh"]):
+                    results.save(entry, st.write_stream(generate_lesson(**entry["params"], stream=True)))
+                # Warm the cache for the quiz and flashcards students usually open next (opt-in)
+                prefetch_after_lesson(entry["params"]["topic"], entry["params"]["difficulty"])
+            except Exception as e:
+                results.discard(entry)
+                st.error(f"Error: {str(e)}")
+        else:
+            st.markdown(entry["value"], unsafe_allow_html=True)
+        
+        if entry["value"] is not None:
+            # Add download button
+            st.download_button(
+                label="Download Lesson",
+                data=entry["value"],
+                file_name=f"{entry['params']['topic']}_lesson.md",
+                mime="text/markdown"
+            )
+            regenerate_button("lesson")
 
 elif selected == "Quiz":
     st.markdown("""
@@ -454,21 +288,33 @@ elif selected == "Quiz":
     
     if submitted:
         if topic:
-            with st.spinner("Creating your quiz..."):
-                quiz = generate_quiz(topic, difficulty)
-                st.markdown("---")
-                st.markdown("### Your Quiz")
-                st.markdown(quiz, unsafe_allow_html=True)
-                
-                # Add download button
-                st.download_button(
-                    label="Download Quiz",
-                    data=quiz,
-                    file_name=f"{topic}_quiz.md",
-                    mime="text/markdown"
-                )
+            results.request("quiz", f"📝 {topic}", topic=topic, difficulty=difficulty)
         else:
             st.warning("Please enter a topic to generate a quiz.")
+    
+    entry = results.current("quiz")
+    if entry:
+        st.markdown("---")
+        st.markdown("### Your Quiz")
+        if entry["value"] is None:
+            try:
+                with refresh(entry["refresh"]):
+                    results.save(entry, st.write_stream(generate_quiz(**entry["params"], stream=True)))
+            except Exception as e:
+                results.discard(entry)
+                st.error(f"Error: {str(e)}")
+        else:
+            st.markdown(entry["value"], unsafe_allow_html=True)
+        
+        if entry["value"] is not None:
+            # Add download button
+            st.download_button(
+                label="Download Quiz",
+                data=entry["value"],
+                file_name=f"{entry['params']['topic']}_quiz.md",
+                mime="text/markdown"
+            )
+            regenerate_button("quiz")
 
 elif selected == "Flashcards":
     st.markdown("""
@@ -481,68 +327,60 @@ elif selected == "Flashcards":
     
     with st.form("flashcard_form"):
         topic = st.text_input("Flashcard Topic", placeholder="Enter a topic (e.g., French Vocabulary)")
-        count = st.slider("Number of Flashcards", 3, 10, 5)
+        count = st.slider("Number of Flashcards", 3, 500, 5)
         
         submitted = st.form_submit_button("Generate Flashcards", type="primary")
     
     if submitted:
         if topic:
-            with st.spinner("Creating your flashcards..."):
-                flashcards = generate_flashcards(topic, count)
-                st.markdown("---")
-                st.markdown("### Your Flashcards")
-                
-                # Process flashcards for better display
-                cards = [card.strip() for card in flashcards.split("---") if card.strip()]
-                for i, card in enumerate(cards, 1):
-                    # Extract front and back
-                    parts = card.split("**Back:**")
-                    front = parts[0].replace("**Front:**", "").strip()
-                    back = parts[1].strip() if len(parts) > 1 else ""
-                    
-                    # Display as interactive card
-                    st.markdown(f"""
-                    <div class="flashcard">
-                        <div class="flashcard-inner">
-                            <div class="flashcard-front">
-                                <div><strong>Front:</strong> {front}</div>
-                            </div>
-                            <div class="flashcard-back">
-                                <div><strong>Back:</strong> {back}</div>
-                            </div>
-                        </div>
-                    </div>
-                    """, unsafe_allow_html=True)
-                
-                # Add download button
-                st.download_button(
-                    label="Download Flashcards",
-                    data=flashcards,
-                    file_name=f"{topic}_flashcards.md",
-                    mime="text/markdown"
-                )
+            results.request("flashcards", f"🔖 {topic} ({count} cards)", topic=topic, count=count)
         else:
             st.warning("Please enter a topic to generate flashcards.")
-
-elif selected == "Ask AI":
-    import fitz  # PyMuPDF
-    from docx import Document
-
-    def extract_text_from_file(file):
-        if file.type == "application/pdf":
-            text = ""
-            pdf = fitz.open(stream=file.read(), filetype="pdf")
-            for page in pdf:
-                text += page.get_text()
-            return text
-        elif file.type in ["application/vnd.openxmlformats-officedocument.wordprocessingml.document", "application/msword"]:
-            doc = Document(file)
-            return "\n".join([para.text for para in doc.paragraphs])
-        elif file.type == "text/plain":
-            return file.read().decode("utf-8")
+    
+    entry = results.current("flashcards")
+    if entry:
+        st.markdown("---")
+        st.markdown("### Your Flashcards")
+        count = entry["params"]["count"]
+        if entry["value"] is None:
+            cards = []
+            progress = st.progress(0.0, text=f"0 of {count} cards")
+            try:
+                with st.spinner("Creating your flashcards..."), refresh(entry["refresh"]):
+                    # Each card renders as soon as its JSON object is complete in the stream;
+                    # large decks arrive from several subtopic shards at once
+                    for card in stream_flashcard_deck(**entry["params"]):
+                        cards.append(card)
+                        progress.progress(min(len(cards) / count, 1.0), text=f"{len(cards)} of {count} cards")
+                        render_flashcard(card)
+            except Exception as e:
+                st.error(f"Error: {str(e)}")
+            progress.empty()
+            if cards:
+                results.save(entry, cards)
+            else:
+                results.discard(entry)
+                st.warning("No usable flashcards were generated. Please try again.")
         else:
-            return None
+            for card in entry["value"]:
+                render_flashcard(card)
+        
+        cards = entry["value"]
+        if cards:
+            if len(cards) < count:
+                st.info(f"Generated {len(cards)} distinct cards; duplicates and unusable cards were left out.")
+            flashcards = "\n\n---\n\n".join(f"**Front:** {card['front']}  \n**Back:** {card['back']}" for card in cards)
+            
+            # Add download button
+            st.download_button(
+                label="Download Flashcards",
+                data=flashcards,
+                file_name=f"{entry['params']['topic']}_flashcards.md",
+                mime="text/markdown"
+            )
+            regenerate_button("flashcards")
 
+elif selected == "Ask AI":
     st.markdown("""
         <div class="custom-container">
             <h1 style='color: #4B8BBE;'>Ask <span style='color:#FF4B4B;'>EduTutor AI</span></h1>
@@ -551,39 +389,203 @@ elif selected == "Ask AI":
         </div>
     """, unsafe_allow_html=True)
     
+    # The library is shared by every session, but each session only lists its own uploads
+    if "library_owner" not in st.session_state:
+        st.session_state["library_owner"] = uuid.uuid4().hex
+    owner = st.session_state["library_owner"]
+
     file = st.file_uploader("Upload a file (PDF, DOCX, or TXT)", type=["pdf", "docx", "txt"])
-    file_text = ""
+    document_id = None
     if file:
-        with st.spinner("Extracting file content..."):
-            file_text = extract_text_from_file(file)
-            if not file_text:
-                st.error("Unsupported file type or empty file.")
-            else:
-                st.success("File content extracted successfully!")
-                with st.expander("View extracted text"):
-                    st.text(file_text[:1000] + "..." if len(file_text) > 1000 else file_text)
+        # Reruns keep the same upload; only a newly uploaded file is added (and hashed) again
+        upload = st.session_state.get("library_upload")
+        evicted = upload is not None and upload[1] is not None and library.get(upload[1]) is None
+        if upload is None or upload[0] != file.file_id or evicted:
+            # The library keys documents by content, so a re-upload is found without parsing it again
+            with st.spinner("Adding the file to your library..."):
+                upload = st.session_state["library_upload"] = (file.file_id, library.add_file(file, owner))
+        document_id = upload[1]
+        if document_id is None:
+            st.error("Unsupported file type or empty file.")
+    else:
+        documents = {document["id"]: document["name"] for document in library.documents(owner)}
+        if documents:
+            document_id = st.selectbox("Or ask about a document from the library", [None, *documents],
+                                       format_func=lambda id: "No document" if id is None else documents[id])
+    
+    document_index = library.index(document_id) if document_id else None
+    if document_index is not None:
+        st.success(f"Using {library.get(document_id)['name']} ({len(document_index)} sections).")
+        with st.expander("View extracted text"):
+            preview = document_index.chunks[0]
+            st.text(preview[:1000] + "..." if len(preview) > 1000 else preview)
+
+    # One conversation per session; follow-ups see a summary of earlier turns plus the latest ones
+    if "conversation" not in st.session_state:
+        st.session_state["conversation"] = Conversation()
+    conversation = st.session_state["conversation"]
+    
+    def show_excerpts(excerpts):
+        with st.expander(f"Document excerpts used ({len(excerpts)})"):
+            for excerpt in excerpts:
+                st.text(excerpt)
+    
+    for turn in conversation.turns:
+        with st.chat_message("user"):
+            st.markdown(turn["question"])
+        with st.chat_message("assistant"):
+            st.markdown(turn["answer"])
+            if turn["excerpts"]:
+                show_excerpts(turn["excerpts"])
+    
+    query = st.chat_input("Ask any educational question...")
+    if query and query.strip():
+        with st.chat_message("user"):
+            st.markdown(query)
+        with st.chat_message("assistant"):
+            try:
+                excerpts = retrieve_context(document_index, conversation.search_text(query)) if document_index is not None else None
+                st.write_stream(conversation.ask(query, excerpts))
+                if excerpts:
+                    show_excerpts(excerpts)
+            except Exception as e:
+                st.error(f"Error: {str(e)}")
+    
+    if conversation.turns:
+        col1, col2 = st.columns(2)
+        with col1:
+            transcript = "\n\n".join(f"**You:** {turn['question']}\n\n**EduTutor AI:** {turn['answer']}"
+                                      for turn in conversation.turns)
+            st.download_button(
+                label="Download Conversation",
+                data=transcript,
+                file_name="ai_conversation.md",
+                mime="text/markdown"
+            )
+        with col2:
+            if st.button("New Conversation"):
+                st.session_state["conversation"] = Conversation()
+                st.rerun()
 
-    query = st.text_area("Ask any educational question:", placeholder="Type your question here...", height=150)
-    if st.button("Get Answer", type="primary"):
-        if query.strip():
-            with st.spinner("Thinking..."):
-                try:
-                    if file_text:
-                        prompt = f"Based on the following content:\n\n{file_text}\n\nAnswer this question:\n{query}"
-                    else:
-                        prompt = query
-                    response = llm.invoke(prompt)
-                    st.markdown("### AI Response:")
-                    st.markdown(response.content, unsafe_allow_html=True)
-                    
-                    # Add copy button
-                    st.download_button(
-                        label="Copy Answer",
-                        data=response.content,
-                        file_name="ai_response.txt",
-                        mime="text/plain"
-                    )
-                except Exception as e:
-                    st.error(f"Error: {str(e)}")
+elif selected == "Study Pack":
+    st.markdown("""
+        <div class="custom-container">
+            <h1 style='color: #4B8BBE;'>Build a <span style='color:#FF4B4B;'>Study Pack</span></h1>
+            <p style="color: #555;">Get a lesson, quiz, flashcards and practice exercises on one topic in a single step.</p>
+            <div class="custom-divider"></div>
+        </div>
+    """, unsafe_allow_html=True)
+    
+    with st.form("study_pack_form"):
+        col1, col2 = st.columns(2)
+        with col1:
+            topic = st.text_input("Study Pack Topic", placeholder="Enter a topic (e.g., Photosynthesis)")
+            detail_level = st.selectbox("Detail Level", 
+                                      ["Overview", "Basic", "Detailed", "Comprehensive"])
+        with col2:
+            difficulty = st.selectbox("Difficulty Level", 
+                                    ["Beginner", "Intermediate", "Advanced"])
+            count = st.slider("Number of Flashcards", 3, 10, 5)
+        
+        submitted = st.form_submit_button("Build Study Pack", type="primary")
+    
+    if submitted:
+        if topic:
+            results.request("study_pack", f"🗂️ {topic}", topic=topic, difficulty=difficulty,
+                            detail_level=detail_level, count=count)
         else:
-            st.warning("Please enter a question to get a response.")
\ No newline at end of file
+            st.warning("Please enter a topic to build a study pack.")
+    
+    entry = results.current("study_pack")
+    if entry:
+        topic = entry["params"]["topic"]
+        section_titles = {
+            "lesson": "📚 Lesson",
+            "quiz": "📝 Quiz",
+            "flashcards": "🔖 Flashcards",
+            "exercises": "🏋️ Practice Exercises"
+        }
+        # Reserve a slot per section so each one renders in place as soon as it finishes
+        placeholders = {}
+        for section, title in section_titles.items():
+            st.markdown(f"### {title}")
+            placeholders[section] = st.empty()
+            placeholders[section].info("Generating...")
+        
+        def show_section(section, content):
+            with placeholders[section].container():
+                st.markdown(content, unsafe_allow_html=True)
+                st.download_button(
+                    label=f"Download {section.title()}",
+                    data=content,
+                    file_name=f"{topic}_{section}.md",
+                    mime="text/markdown",
+                    key=f"download_{section}"
+                )
+        
+        if entry["value"] is None:
+            sections = {}
+            with refresh(entry["refresh"]):
+                for section, content in generate_study_pack(**entry["params"]):
+                    sections[section] = content
+                    show_section(section, content)
+            if all(isinstance(content, ErrorResult) for content in sections.values()):
+                results.discard(entry)
+            else:
+                results.save(entry, sections)
+        else:
+            for section, content in entry["value"].items():
+                show_section(section, content)
+        
+        if entry["value"] is not None:
+            regenerate_button("study_pack")
+
+elif selected == "Admin" and ADMIN_ENABLED:
+    st.markdown("""
+        <div class="custom-container">
+            <h1 style='color: #4B8BBE;'>Admin <span style='color:#FF4B4B;'>Metrics</span></h1>
+            <p style="color: #555;">Live latency percentiles over the most recent calls in this process.</p>
+            <div class="custom-divider"></div>
+        </div>
+    """, unsafe_allow_html=True)
+
+    if st.button("Refresh"):
+        st.rerun()
+
+    rows = metrics.summary()
+    if rows:
+        st.markdown("### Latency (seconds)")
+        st.dataframe(
+            [{name: round(value, 3) if isinstance(value, float) else value for name, value in row.items()}
+             for row in rows]
+        )
+    else:
+        st.info("No calls recorded yet.")
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.markdown("### Response Cache")
+        st.json(response_cache.stats())
+        st.markdown("### Semantic Cache")
+        st.json(semantic_cache.stats())
+    with col2:
+        st.markdown("### Scheduler")
+        st.json(scheduler.stats())
+        st.markdown("### Request Coalescing")
+        st.json(single_flight.stats())
+        st.markdown("### Hedging & Fallback")
+        st.json(resilience_stats())
+        st.markdown("### Model Routing")
+        st.json(router.stats())
+    with col3:
+        st.markdown("### Speculative Prefetch")
+        st.json(prefetcher.stats())
+        st.markdown("### Document Library")
+        st.json(library.stats())
+        st.markdown("### Prompt Compaction")
+        st.json(compaction_stats())
+        st.markdown("### Prompt Templates")
+        st.json(templates.versions())
+
+    with st.expander("Recent calls"):
+        st.dataframe(list(reversed(metrics.recent())))
@@ -0,0 +1,220 @@
+"""
+Multi-session load test for one EduTutor AI process against the mock LLM backend.
+
+Each simulated student runs a realistic flow: generate a lesson, then a quiz, then
+flashcards, then asks a question about an uploaded document. Every step makes the same
+calls the corresponding page makes (streamed generation, structured flashcards,
+extraction + retrieval + streamed answer), so the shared caches, request coalescing,
+scheduler and prompt budgeting are all exercised under concurrency. Streamlit's AppTest
+swaps a process-global runtime on every run and cannot run sessions concurrently, so
+script rerun overhead is measured separately by benchmarks.run_benchmarks.
+
+The number of concurrent sessions ramps up step by step and each step reports
+throughput, per-page latency percentiles (total and time to first chunk), memory growth,
+response cache hit rate and errors by exception type. Each step starts with an empty
+response cache and new flows and uploads (unless --warm is given), so later steps do not
+replay earlier ones from the cache. The scheduler's rate limits and hedging are off
+unless set with the flags, so the results show the process's capacity rather than the
+configured provider quota.
+
+    python -m benchmarks.load_test --sessions 1,5,10,20,40 --latency 1.0 --chunk-delay 0.02
+"""
+import argparse
+import collections
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+PAGES = ["lesson", "quiz", "flashcards", "ask_ai"]
+TOPICS = [
+    "Photosynthesis", "World War II", "French Vocabulary", "Linear Equations", "Cell Division",
+    "The French Revolution", "Newton's Laws", "Plate Tectonics", "The Water Cycle", "Supply and Demand",
+    "Shakespeare's Sonnets", "Chemical Bonding", "Ancient Rome", "Probability", "DNA Replication",
+]
+DOCUMENT = ("Chapter {n}. The mitochondria produce ATP through cellular respiration. "
+            "Glycolysis happens in the cytoplasm and the Krebs cycle in the matrix. ") * 40
+
+
+def rss_mb():
+    """Current resident set size of this process in MB."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(samples, q):
+    if not samples:
+        return None
+    samples = sorted(samples)
+    return round(samples[min(len(samples) - 1, int(len(samples) * q))] * 1000, 1)
+
+
+def timed_stream(chunks):
+    """Consume a stream, returning (total seconds, seconds to first chunk)."""
+    start = time.perf_counter()
+    first = None
+    for _ in chunks:
+        if first is None:
+            first = time.perf_counter() - start
+    total = time.perf_counter() - start
+    return total, total if first is None else first
+
+
+def ask_about_document(session_id, question, step=0):
+    # What the Ask AI page does with an upload
+    from utils.content_gen import stream_answer
+    from utils.library import library
+    from utils.retrieval import retrieve_context
+
+    start = time.perf_counter()
+    data = "\n\n".join(DOCUMENT.format(n=n) for n in range(200)).encode("utf-8")
+    data += f"step {step} session {session_id}".encode()
+    document_id = library.add(data, "text/plain", f"session-{session_id}.txt", owner=f"load-test-{session_id}")
+    excerpts = retrieve_context(library.index(document_id), question)
+    prepare = time.perf_counter() - start
+    total, first = timed_stream(stream_answer(question, excerpts))
+    return prepare + total, prepare + first
+
+
+def session(session_id, rng, timings, errors, step=0):
+    from utils.content_gen import generate_lesson, generate_quiz, stream_flashcard_items
+
+    topic = rng.choice(TOPICS)
+    difficulty = rng.choice(["Beginner", "Intermediate", "Advanced"])
+    detail_level = rng.choice(["Overview", "Basic", "Detailed", "Comprehensive"])
+    steps = {
+        "lesson": lambda: timed_stream(generate_lesson(topic, detail_level, difficulty, ["Visual"], stream=True)),
+        "quiz": lambda: timed_stream(generate_quiz(topic, difficulty, stream=True)),
+        "flashcards": lambda: timed_stream(stream_flashcard_items(topic, rng.randint(3, 10))),
+        "ask_ai": lambda: ask_about_document(session_id, f"How is ATP produced in {topic}?", step),
+    }
+    for page in PAGES:
+        try:
+            total, first = steps[page]()
+        except Exception as e:
+            errors[page][type(e).__name__] += 1
+            continue
+        timings[page].append(total)
+        timings[page + "_first_chunk"].append(first)
+
+
+def run_step(sessions, seed, step=0, warm=False):
+    from utils.cache import response_cache
+    from utils.singleflight import single_flight
+
+    if not warm:
+        response_cache.clear()
+    timings = {name: [] for page in PAGES for name in (page, page + "_first_chunk")}
+    errors = {page: collections.Counter() for page in PAGES}
+    cache_before = response_cache.stats()
+    coalesced_before = single_flight.stats()["coalesced"]
+    memory_before = rss_mb()
+    # Each step draws its own flows, so it does not repeat the previous step's requests
+    threads = [
+        threading.Thread(target=session, args=(i, random.Random(seed + 100000 * step + i), timings, errors, step))
+        for i in range(sessions)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    requests = sessions * len(PAGES)
+    total_errors = sum(sum(counts.values()) for counts in errors.values())
+    cache_after = response_cache.stats()
+    hits, misses = (
+        sum(cache_after[name] - cache_before[name] for name in names)
+        for names in (("memory_hits", "disk_hits"), ("misses",))
+    )
+    error_types = collections.Counter()
+    for counts in errors.values():
+        error_types.update(counts)
+    return {
+        "sessions": sessions,
+        "wall_seconds": round(wall, 2),
+        "throughput_pages_per_second": round(requests / wall, 2),
+        "error_rate": round(total_errors / requests, 4),
+        "error_types": dict(error_types),
+        "cache_hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+        "coalesced": single_flight.stats()["coalesced"] - coalesced_before,
+        "memory_mb_before": round(memory_before, 1),
+        "memory_mb_after": round(rss_mb(), 1),
+        "pages": {
+            page: {
+                "p50_ms": percentile(timings[page], 0.50),
+                "p95_ms": percentile(timings[page], 0.95),
+                "p99_ms": percentile(timings[page], 0.99),
+                "first_chunk_p50_ms": percentile(timings[page + "_first_chunk"], 0.50),
+                "first_chunk_p95_ms": percentile(timings[page + "_first_chunk"], 0.95),
+                "errors": sum(errors[page].values()),
+                "error_types": dict(errors[page]),
+            }
+            for page in PAGES
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", default="1,5,10,20", help="comma-separated concurrent session counts to ramp through")
+    parser.add_argument("--latency", type=float, default=1.0, help="mock time to first token in seconds")
+    parser.add_argument("--chunk-delay", type=float, default=0.01, help="mock delay between streamed chunks")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--warm", action="store_true", help="keep the response cache between steps")
+    parser.add_argument("--rpm", type=float, default=0, help="scheduler requests per minute (0 = unlimited)")
+    parser.add_argument("--tpm", type=float, default=0, help="scheduler tokens per minute (0 = unlimited)")
+    parser.add_argument("--concurrency", type=int, help="scheduler concurrency (default EDUTUTOR_LLM_CONCURRENCY)")
+    parser.add_argument("--hedge", action="store_true", help="hedge slow requests as in production")
+    parser.add_argument("--first-chunk-deadline", type=float,
+                        help="seconds a stream may take to start (default EDUTUTOR_FIRST_CHUNK_DEADLINE)")
+    parser.add_argument("--output", default=os.path.join(BENCH_DIR, "load_results.json"))
+    args = parser.parse_args()
+
+    os.environ["EDUTUTOR_CACHE_DIR"] = tempfile.mkdtemp(prefix="edututor-load-")
+    os.environ.setdefault("OPENAI_API_KEY", "load-test")
+    # Read once when utils is imported, so they must be set first
+    os.environ["EDUTUTOR_LLM_RPM"] = str(args.rpm)
+    os.environ["EDUTUTOR_LLM_TPM"] = str(args.tpm)
+    os.environ["EDUTUTOR_HEDGE"] = "1" if args.hedge else "0"
+    if args.concurrency is not None:
+        os.environ["EDUTUTOR_LLM_CONCURRENCY"] = str(args.concurrency)
+    if args.first_chunk_deadline is not None:
+        os.environ["EDUTUTOR_FIRST_CHUNK_DEADLINE"] = str(args.first_chunk_deadline)
+    sys.path.insert(0, ROOT_DIR)
+    from benchmarks.mock_llm import MockLLMServer
+
+    steps = []
+    with MockLLMServer(latency=args.latency, chunk_delay=args.chunk_delay) as server:
+        os.environ["OPENAI_API_BASE"] = server.url
+        for index, count in enumerate(int(value) for value in args.sessions.split(",")):
+            requests_before = server.requests
+            step = run_step(count, args.seed, index, args.warm)
+            step["upstream_requests"] = server.requests - requests_before
+            steps.append(step)
+
+            print(f"\n{count} sessions: {step['throughput_pages_per_second']} pages/s, "
+                  f"errors {step['error_rate']:.1%} {step['error_types'] or ''}, "
+                  f"upstream calls {step['upstream_requests']}, cache hit rate {step['cache_hit_rate']:.1%}, coalesced {step['coalesced']}, "
+                  f"memory {step['memory_mb_before']} -> {step['memory_mb_after']} MB")
+            for page, stats in step["pages"].items():
+                print(f"  {page:<12} p50 {stats['p50_ms']} ms  p95 {stats['p95_ms']} ms  p99 {stats['p99_ms']} ms  "
+                      f"first chunk p95 {stats['first_chunk_p95_ms']} ms")
+
+    settings = {name: getattr(args, name) for name in ("rpm", "tpm", "concurrency", "hedge", "warm")}
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"latency": args.latency, "chunk_delay": args.chunk_delay, **settings, "steps": steps}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
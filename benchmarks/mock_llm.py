@@ -0,0 +1,190 @@
+"""
+Local stand-in for an OpenAI-compatible chat completions endpoint.
+
+Returns canned completions with configurable latency, so benchmarks and load tests
+measure EduTutor's own overhead without paying for (or waiting on) a real provider.
+
+    python -m benchmarks.mock_llm --port 8001 --latency 0.5 --chunk-delay 0.02
+"""
+import argparse
+import json
+import re
+import socket
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LESSON_PARAGRAPH = (
+    "## Key Idea\n\nThis section explains the concept with a worked **example**, "
+    "a short list of facts and a practice prompt.\n\n- Fact one\n- Fact two\n- Fact three\n\n"
+)
+
+
+def canned_completion(prompt, words=300):
+    """
+    Pick a plausible completion for a prompt
+
+    Args:
+        prompt (str): Prompt text sent by the client
+        words (int): Approximate length of free-text completions
+
+    Returns:
+        str: Completion text
+    """
+    if "JSON array" in prompt:
+        count = int((re.search(r"Create (\d+)", prompt) or re.search(r"(\d+)-question", prompt) or [0, 5])[1])
+        if "flashcards" in prompt:
+            items = [{"front": f"Term {i}", "back": f"Definition of term {i} in one sentence."} for i in range(1, count + 1)]
+        else:
+            items = [{"question": f"Question {i}?", "options": ["One", "Two", "Three", "Four"], "answer": "B",
+                      "explanation": f"Explanation {i}."} for i in range(1, count + 1)]
+        return json.dumps(items, indent=1)
+    text = ""
+    while len(text.split()) < words:
+        text += LESSON_PARAGRAPH
+    return text
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default listen backlog of 5 drops connections during concurrent bursts,
+    # which shows up as 1 s and 3 s SYN retransmit stalls in the measurements
+    request_queue_size = 1024
+
+
+class MockLLMServer:
+    """
+    Threaded HTTP server implementing POST /v1/chat/completions (plain and streamed).
+
+    Args:
+        port (int): Port to bind (0 picks a free port)
+        latency (float): Seconds before the first token / full response
+        chunk_delay (float): Seconds between streamed chunks
+        chunk_chars (int): Characters per streamed chunk
+        words (int): Approximate length of free-text completions
+    """
+
+    def __init__(self, port=0, latency=0.0, chunk_delay=0.0, chunk_chars=16, words=300):
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.chunk_chars = chunk_chars
+        self.words = words
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = _Server(("127.0.0.1", port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self):
+                super().setup()
+                # Without this, Nagle + delayed ACK adds ~40 ms to every small response
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with mock._lock:
+                    mock.requests += 1
+                prompt = "\n".join(str(message.get("content", "")) for message in body.get("messages", []))
+                completion = canned_completion(prompt, mock.words)
+                model = body.get("model", "mock")
+                time.sleep(mock.latency)
+                if body.get("stream"):
+                    self._stream(completion, model)
+                else:
+                    self._complete(prompt, completion, model)
+
+            def _complete(self, prompt, completion, model):
+                payload = json.dumps({
+                    "id": f"chatcmpl-{uuid.uuid4().hex}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": completion},
+                                 "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(completion) // 4,
+                              "total_tokens": (len(prompt) + len(completion)) // 4},
+                }).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _stream(self, completion, model):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                chunk_id = f"chatcmpl-{uuid.uuid4().hex}"
+                pieces = [completion[i:i + mock.chunk_chars] for i in range(0, len(completion), mock.chunk_chars)]
+                for index, piece in enumerate(pieces + [None]):
+                    delta = {"content": piece} if piece is not None else {}
+                    if index == 0:
+                        delta["role"] = "assistant"
+                    event = {
+                        "id": chunk_id,
+                        "object": "chat.completion.chunk",
+                        "created": int(time.time()),
+                        "model": model,
+                        "choices": [{"index": 0, "delta": delta, "finish_reason": None if piece is not None else "stop"}],
+                    }
+                    self.wfile.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                    if piece is not None and mock.chunk_delay:
+                        time.sleep(mock.chunk_delay)
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+                self.close_connection = True
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before the first token")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="seconds between streamed chunks")
+    parser.add_argument("--chunk-chars", type=int, default=16, help="characters per streamed chunk")
+    parser.add_argument("--words", type=int, default=300, help="length of free-text completions")
+    args = parser.parse_args()
+
+    server = MockLLMServer(args.port, args.latency, args.chunk_delay, args.chunk_chars, args.words)
+    print(f"Mock LLM listening on {server.url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
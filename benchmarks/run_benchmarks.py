@@ -0,0 +1,234 @@
+"""
+Offline micro-benchmarks for EduTutor AI's own overhead.
+
+All LLM traffic goes to a local mock OpenAI-compatible server, so timings exclude
+provider latency. Results are written as JSON and can be compared against a stored
+baseline:
+
+    python -m benchmarks.run_benchmarks --output benchmarks/results.json
+    python -m benchmarks.run_benchmarks --save-baseline
+    python -m benchmarks.run_benchmarks --baseline benchmarks/baseline.json --tolerance 0.25
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, "results.json")
+
+
+def measure(fn, repeat=20, warmup=2):
+    """
+    Time a zero-argument callable
+
+    Args:
+        fn (callable): Function to time
+        repeat (int): Timed runs
+        warmup (int): Untimed runs before measuring
+
+    Returns:
+        dict: median_ms, p95_ms, min_ms and runs
+    """
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "median_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+        "min_ms": round(samples[0], 3),
+        "runs": repeat,
+    }
+
+
+def make_pdf(pages):
+    import fitz  # PyMuPDF
+
+    doc = fitz.open()
+    for number in range(pages):
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(50, 50, 550, 800), f"Page {number + 1}\n" + "Photosynthesis converts light energy. " * 60)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def make_docx(pages):
+    import io
+
+    from docx import Document
+
+    doc = Document()
+    for number in range(pages * 10):
+        doc.add_paragraph(f"Paragraph {number}: " + "Cells divide by mitosis and meiosis. " * 8)
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def make_txt(pages):
+    return ("The French Revolution began in 1789. " * 80 + "\n\n").encode("utf-8") * pages
+
+
+def bench_generators(results, repeat):
+    from utils import content_gen, generation
+
+    calls = {
+        "generate_lesson": lambda f: f("Photosynthesis", "Detailed", "Intermediate", ["Visual", "Kinesthetic"]),
+        "generate_quiz": lambda f: f("World War II", "Intermediate"),
+        "generate_flashcards": lambda f: f("French Vocabulary", 10),
+        "generate_practice_exercises": lambda f: f("Linear Equations", "Beginner"),
+        "summarize_content": lambda f: f("The mitochondria is the powerhouse of the cell. " * 200, "short"),
+    }
+    original_invoke = generation.invoke_text
+    try:
+        # Prompt building only: the upstream call returns immediately
+        generation.invoke_text = lambda llm, prompt, **kwargs: prompt
+        for name, call in calls.items():
+            func = getattr(content_gen, name).__wrapped__
+            results[f"prompt_build.{name}"] = measure(lambda: call(func), repeat)
+    finally:
+        generation.invoke_text = original_invoke
+
+    for name, call in calls.items():
+        # Full generator path against the zero-latency mock, bypassing the response cache
+        func = getattr(content_gen, name).__wrapped__
+        results[f"generate_uncached.{name}"] = measure(lambda: call(func), repeat)
+        # Cache hit path through the decorator
+        func = getattr(content_gen, name)
+        results[f"generate_cached.{name}"] = measure(lambda: call(func), repeat)
+
+
+def bench_parsing(results, repeat):
+    from benchmarks.mock_llm import canned_completion
+    from utils.structured import iter_structured_items, normalize_flashcard, normalize_question
+
+    for kind, normalize in (("flashcards", normalize_flashcard), ("quiz", normalize_question)):
+        text = canned_completion(f"Create 50 {kind} items. Respond with only a JSON array", 0)
+        chunks = [text[i:i + 16] for i in range(0, len(text), 16)]
+        results[f"parse.{kind}_json_50"] = measure(lambda: list(iter_structured_items(chunks, normalize)), repeat)
+
+
+def bench_extraction(results, repeat, sizes):
+    from utils import documents
+
+    builders = {
+        "pdf": (make_pdf, documents.PDF_TYPE),
+        "docx": (make_docx, documents.WORD_TYPES[0]),
+        "txt": (make_txt, documents.TEXT_TYPE),
+    }
+    for kind, (build, mime) in builders.items():
+        try:
+            fixtures = {pages: build(pages) for pages in sizes}
+        except ImportError as e:
+            print(f"Skipping {kind} extraction: {e}", file=sys.stderr)
+            continue
+        for pages, data in fixtures.items():
+            runs = max(3, repeat // max(1, pages // 20))
+            results[f"extract.{kind}.{pages}_pages"] = measure(lambda: documents._extract(data, mime), runs, warmup=1)
+        documents.extract_text(fixtures[sizes[-1]], mime)
+        results[f"extract_cached.{kind}.{sizes[-1]}_pages"] = measure(
+            lambda: documents.extract_text(fixtures[sizes[-1]], mime), repeat)
+
+
+def bench_reruns(results, repeat):
+    try:
+        from streamlit.testing.v1 import AppTest
+    except ImportError as e:
+        print(f"Skipping Streamlit reruns: {e}", file=sys.stderr)
+        return
+
+    app = AppTest.from_file(os.path.join(ROOT_DIR, "app.py"), default_timeout=60)
+    app.run()
+    if app.exception:
+        print(f"Skipping Streamlit reruns: app raised {app.exception}", file=sys.stderr)
+        return
+    results["app.rerun.home"] = measure(app.run, repeat)
+
+
+def compare(results, baseline, tolerance):
+    """
+    Find benchmarks whose median regressed beyond the tolerance
+
+    Args:
+        results (dict): Current results
+        baseline (dict): Baseline results
+        tolerance (float): Allowed relative slowdown (0.25 = 25%)
+
+    Returns:
+        list: (name, baseline_ms, current_ms) for every regression
+    """
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous and current["median_ms"] > previous["median_ms"] * (1 + tolerance):
+            regressions.append((name, previous["median_ms"], current["median_ms"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="where to write the results JSON")
+    parser.add_argument("--baseline", help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help=f"also write results to {DEFAULT_BASELINE}")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown per benchmark")
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per benchmark")
+    parser.add_argument("--sizes", default="10,100,400", help="page counts for extraction fixtures")
+    args = parser.parse_args()
+
+    # Everything runs against a throwaway cache and the local mock backend
+    os.environ["EDUTUTOR_CACHE_DIR"] = tempfile.mkdtemp(prefix="edututor-bench-")
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    # Measure the app's own overhead: no rate-limit waits and no duplicate hedge requests.
+    # These are read when utils.scheduler and utils.resilience are first imported.
+    os.environ["EDUTUTOR_LLM_RPM"] = "0"
+    os.environ["EDUTUTOR_LLM_TPM"] = "0"
+    os.environ["EDUTUTOR_HEDGE"] = "0"
+    sys.path.insert(0, ROOT_DIR)
+    from benchmarks.mock_llm import MockLLMServer
+
+    results = {}
+    with MockLLMServer() as server:
+        os.environ["OPENAI_API_BASE"] = server.url
+        bench_generators(results, args.repeat)
+        bench_parsing(results, args.repeat)
+        bench_extraction(results, args.repeat, [int(size) for size in args.sizes.split(",")])
+        bench_reruns(results, args.repeat)
+
+    report = {
+        "meta": {"python": platform.python_version(), "platform": platform.platform(), "time": time.time()},
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(DEFAULT_BASELINE, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    for name, stats in results.items():
+        print(f"{name:<50} {stats['median_ms']:>10.3f} ms  (p95 {stats['p95_ms']:.3f} ms)")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        for name, before, after in regressions:
+            print(f"REGRESSION {name}: {before:.3f} ms -> {after:.3f} ms", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
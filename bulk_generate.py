@@ -0,0 +1,353 @@
+"""
+Pre-generate content for a catalog of topics and warm the app's response cache.
+
+Reads one topic per row from CSV or JSONL. Optional columns/keys: difficulty,
+detail_level, learning_style (separated by ";"), count and types (separated by ";").
+Each row is expanded into one job per content type and the jobs run through a
+bounded worker pool. Every finished job is appended to the output store right away,
+so an interrupted run picks up where it stopped when started again with the same
+output; failed jobs are retried.
+
+    python bulk_generate.py syllabus.csv --output catalog.jsonl
+    python bulk_generate.py syllabus.jsonl --output catalog.sqlite3 --types lesson,quiz --workers 16
+
+Run it with the same EDUTUTOR_CACHE_DIR as the app, so students get the stored
+responses instantly.
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import signal
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from dotenv import load_dotenv
+
+# Load .env before the generators build their client
+load_dotenv()
+
+from utils.cache import response_cache
+from utils.content_gen import (
+    generate_lesson,
+    generate_practice_exercises,
+    generate_quiz,
+    stream_flashcard_deck,
+)
+from utils.resilience import ErrorResult
+from utils.scheduler import BACKGROUND, priority
+
+DEFAULT_TYPES = ("lesson", "quiz", "flashcards")
+
+
+def _lesson(topic, detail_level="Basic", difficulty="Intermediate", learning_style=("Visual",)):
+    return {"content": generate_lesson(topic, detail_level, difficulty, list(learning_style))}
+
+
+def _quiz(topic, difficulty="Intermediate"):
+    return {"content": generate_quiz(topic, difficulty)}
+
+
+def _flashcards(topic, count=5):
+    # Same structured request as the Flashcards page, so its cache entry is the one warmed
+    items = list(stream_flashcard_deck(topic, count))
+    if not items:
+        raise RuntimeError("Error generating flashcards: the model returned no usable cards")
+    return {"items": items}
+
+
+def _exercises(topic, difficulty="Intermediate"):
+    return {"content": generate_practice_exercises(topic, difficulty)}
+
+
+# Content type -> (runner, parameters it accepts besides the topic)
+GENERATORS = {
+    "lesson": (_lesson, ("detail_level", "difficulty", "learning_style")),
+    "quiz": (_quiz, ("difficulty",)),
+    "flashcards": (_flashcards, ("count",)),
+    "exercises": (_exercises, ("difficulty",)),
+}
+
+
+def _split(value):
+    if isinstance(value, list):
+        return [str(item).strip() for item in value if str(item).strip()]
+    return [item.strip() for item in str(value).split(";") if item.strip()]
+
+
+def read_rows(path):
+    """
+    Read catalog rows from a CSV or JSONL file
+
+    Args:
+        path (str): Input file; ".jsonl"/".json" is read as JSON lines, anything else as CSV
+
+    Yields:
+        dict: One row per topic, with empty values removed
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith((".jsonl", ".json")):
+            rows = (json.loads(line) for line in f if line.strip())
+        else:
+            rows = csv.DictReader(f)
+        for row in rows:
+            yield {name.strip(): value for name, value in row.items() if name and value not in (None, "")}
+
+
+def expand_jobs(rows, default_types):
+    """
+    Turn catalog rows into one job per (topic, content type)
+
+    Args:
+        rows (iterable): Rows from read_rows
+        default_types (list): Content types for rows without a "types" value
+
+    Returns:
+        list: Job dicts with id, type, topic and params
+
+    Raises:
+        ValueError: On rows without a topic, unknown types or malformed counts
+    """
+    jobs = []
+    seen = set()
+    for line, row in enumerate(rows, start=1):
+        topic = str(row.get("topic", "")).strip()
+        if not topic:
+            raise ValueError(f"Row {line} has no topic")
+        for kind in _split(row["types"]) if "types" in row else default_types:
+            if kind not in GENERATORS:
+                raise ValueError(f"Row {line}: unknown content type {kind!r}")
+            params = {}
+            for name in GENERATORS[kind][1]:
+                if name not in row:
+                    continue
+                value = row[name]
+                if name == "learning_style":
+                    value = _split(value)
+                elif name == "count":
+                    try:
+                        value = int(value)
+                    except ValueError:
+                        raise ValueError(f"Row {line}: count must be a whole number")
+                else:
+                    value = str(value).strip()
+                params[name] = value
+            payload = json.dumps({"type": kind, "topic": " ".join(topic.lower().split()), "params": params},
+                                 sort_keys=True)
+            job_id = hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+            if job_id not in seen:
+                seen.add(job_id)
+                jobs.append({"id": job_id, "type": kind, "topic": topic, "params": params})
+    return jobs
+
+
+class JSONLStore:
+    """Append-only JSON lines output; finished job ids double as the checkpoint."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def completed(self):
+        done = set()
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A line cut short by an interrupted run
+                        continue
+                    if record.get("status") == "ok":
+                        done.add(record["id"])
+        return done
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def close(self):
+        pass
+
+
+class SQLiteStore:
+    """SQLite output with one row per job; a failed job is replaced when it succeeds later."""
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS results (
+                id TEXT PRIMARY KEY,
+                type TEXT NOT NULL,
+                topic TEXT NOT NULL,
+                params TEXT NOT NULL,
+                status TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                seconds REAL,
+                created_at REAL NOT NULL
+            )"""
+        )
+        self._conn.commit()
+
+    def completed(self):
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT id FROM results WHERE status = 'ok'")}
+
+    def write(self, record):
+        result = {name: record[name] for name in ("content", "items") if name in record}
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (id, type, topic, params, status, result, error, seconds, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (record["id"], record["type"], record["topic"], json.dumps(record["params"]), record["status"],
+                 json.dumps(result, ensure_ascii=False) if result else None, record.get("error"),
+                 record["seconds"], time.time()),
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def open_store(path):
+    """
+    Open the output store for a path
+
+    Args:
+        path (str): ".sqlite3"/".sqlite"/".db" opens a SQLite store, anything else JSON lines
+
+    Returns:
+        JSONLStore | SQLiteStore: Output store
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if path.endswith((".sqlite3", ".sqlite", ".db")):
+        return SQLiteStore(path)
+    return JSONLStore(path)
+
+
+def run_job(job):
+    """
+    Generate one job's content (this also stores it in the response cache)
+
+    Args:
+        job (dict): Job from expand_jobs
+
+    Returns:
+        dict: Output record with status "ok" or "error"
+    """
+    runner = GENERATORS[job["type"]][0]
+    start = time.perf_counter()
+    record = dict(job)
+    try:
+        # Below interactive traffic if the catalog is generated inside a serving process
+        with priority(BACKGROUND):
+            result = runner(job["topic"], **job["params"])
+        content = result.get("content")
+        if isinstance(content, ErrorResult):
+            raise RuntimeError(content)
+        record.update(result, status="ok")
+    except Exception as e:
+        record.update(status="error", error=str(e) or type(e).__name__)
+    record["seconds"] = round(time.perf_counter() - start, 3)
+    return record
+
+
+def run(jobs, store, workers, progress_every=25):
+    """
+    Run jobs through a bounded worker pool, writing each result as it finishes
+
+    At most ``2 * workers`` jobs are queued at once, so memory stays flat for large
+    catalogs. Ctrl-C stops submitting new jobs and waits for the running ones.
+
+    Args:
+        jobs (list): Jobs that still need to run
+        store: Output store
+        workers (int): Concurrent jobs
+        progress_every (int): Print progress after this many finished jobs
+
+    Returns:
+        dict: ok, error and interrupted counts
+    """
+    counts = {"ok": 0, "error": 0, "interrupted": False}
+    stop = threading.Event()
+    previous_handler = signal.signal(signal.SIGINT, lambda *_: stop.set())
+    start = time.perf_counter()
+    pending = set()
+    remaining = iter(jobs)
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while True:
+                while not stop.is_set() and len(pending) < 2 * workers:
+                    job = next(remaining, None)
+                    if job is None:
+                        break
+                    pending.add(executor.submit(run_job, job))
+                if not pending:
+                    break
+                finished, pending = wait(pending, timeout=1, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    record = future.result()
+                    store.write(record)
+                    counts[record["status"]] += 1
+                    if record["status"] == "error":
+                        print(f"[error] {record['type']} '{record['topic']}': {record['error']}", file=sys.stderr)
+                    done = counts["ok"] + counts["error"]
+                    if done % progress_every == 0 or done == len(jobs):
+                        rate = done / (time.perf_counter() - start)
+                        print(f"{done}/{len(jobs)} jobs, {counts['error']} failed, {rate:.2f} jobs/s", file=sys.stderr)
+    finally:
+        signal.signal(signal.SIGINT, previous_handler)
+    counts["interrupted"] = stop.is_set()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="catalog of topics (.csv or .jsonl)")
+    parser.add_argument("--output", default="catalog.jsonl", help="results store (.jsonl or .sqlite3); also the checkpoint")
+    parser.add_argument("--types", default=",".join(DEFAULT_TYPES),
+                        help=f"content types for rows without a 'types' column (from: {', '.join(GENERATORS)})")
+    parser.add_argument("--workers", type=int, default=8, help="concurrent generation jobs")
+    parser.add_argument("--cache-ttl-days", type=float,
+                        help="keep generated responses in the cache this long (default: EDUTUTOR_CACHE_TTL)")
+    args = parser.parse_args()
+
+    try:
+        jobs = expand_jobs(read_rows(args.input), [kind.strip() for kind in args.types.split(",") if kind.strip()])
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    if args.cache_ttl_days is not None:
+        response_cache.ttl = int(args.cache_ttl_days * 24 * 60 * 60)
+
+    store = open_store(args.output)
+    try:
+        done = store.completed()
+        todo = [job for job in jobs if job["id"] not in done]
+        print(f"{len(jobs)} jobs, {len(jobs) - len(todo)} already done, {len(todo)} to run", file=sys.stderr)
+        counts = run(todo, store, args.workers)
+    finally:
+        store.close()
+
+    print(f"Finished: {counts['ok']} generated, {counts['error']} failed", file=sys.stderr)
+    if counts["interrupted"]:
+        print("Interrupted; run the same command again to resume.", file=sys.stderr)
+        sys.exit(130)
+    sys.exit(1 if counts["error"] else 0)
+
+
+if __name__ == "__main__":
+    main()
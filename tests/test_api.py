@@ -0,0 +1,28 @@
+import pytest
+from starlette.testclient import TestClient
+
+import api
+from utils.resilience import ErrorResult
+
+
+@pytest.fixture
+def client():
+    return TestClient(api.app)
+
+
+def test_content_that_starts_with_error_is_returned(client, monkeypatch):
+    monkeypatch.setattr(api, "generate_lesson", lambda **params: "Error analysis is the study of mistakes.")
+
+    response = client.post("/v1/lesson", json={"topic": "Error analysis"})
+
+    assert response.status_code == 200
+    assert response.json() == {"content": "Error analysis is the study of mistakes."}
+
+
+def test_generator_failure_is_a_bad_gateway(client, monkeypatch):
+    monkeypatch.setattr(api, "generate_lesson", lambda **params: ErrorResult("Error generating lesson: boom"))
+
+    response = client.post("/v1/lesson", json={"topic": "Photosynthesis"})
+
+    assert response.status_code == 502
+    assert response.json() == {"error": "Error generating lesson: boom"}
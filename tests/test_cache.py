@@ -0,0 +1,150 @@
+import time
+
+import pytest
+
+from utils import cache as cache_module
+from utils import router as router_module
+from utils.cache import ResponseCache, cached_response, make_key, refresh
+from utils.resilience import ErrorResult
+from utils.router import ModelRouter
+
+LARGE = router_module.TIERS["large"]
+FAST = router_module.TIERS["fast"]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ResponseCache(path=str(tmp_path / "responses.sqlite3"))
+
+
+@pytest.fixture
+def router(monkeypatch):
+    router = ModelRouter()
+    monkeypatch.setattr(cache_module, "router", router)
+    return router
+
+
+def downgrade(router, kind):
+    router._downgraded[kind] = time.monotonic() + 60
+
+
+def test_downgraded_calls_still_serve_the_preferred_models_answers(store, router):
+    calls = []
+
+    @cached_response("lesson", "Lesson on {topic}", cache=store, semantic=False)
+    def lesson(topic):
+        model = router_module._pinned.get()[1]
+        calls.append(model)
+        return f"{model}: {topic}"
+
+    assert lesson("Photosynthesis") == f"{LARGE}: Photosynthesis"
+    downgrade(router, "lesson")
+
+    # Stored large-tier answer is still served; only a miss goes to the faster tier
+    assert lesson("Photosynthesis") == f"{LARGE}: Photosynthesis"
+    assert lesson("Cell division") == f"{FAST}: Cell division"
+    assert lesson("Cell division") == f"{FAST}: Cell division"
+    assert calls == [LARGE, FAST]
+    assert lesson.cached("Photosynthesis") and lesson.cached("Cell division")
+    assert store.stats()["misses"] == 2
+
+
+def test_restored_tier_does_not_serve_downgraded_answers(store, router):
+    @cached_response("lesson", "Lesson on {topic}", cache=store, semantic=False)
+    def lesson(topic):
+        return router_module._pinned.get()[1]
+
+    downgrade(router, "lesson")
+    assert lesson("Photosynthesis") == FAST
+    router._downgraded.clear()
+
+    assert lesson("Photosynthesis") == LARGE
+
+
+def test_error_results_are_not_stored_but_content_starting_with_error_is(store, router):
+    @cached_response("lesson", "Lesson on {topic}", cache=store, semantic=False)
+    def lesson(topic):
+        if topic == "broken":
+            return ErrorResult("Error generating lesson: upstream failed")
+        return f"Error analysis: {topic}"
+
+    assert isinstance(lesson("broken"), ErrorResult)
+    assert not lesson.cached("broken")
+    assert lesson("measurement") == "Error analysis: measurement"
+    assert lesson.cached("measurement")
+
+
+def test_key_is_stable_across_parameter_order_and_topic_spelling():
+    key = make_key("lesson", "Lesson on {topic}", "model", topic="Photosynthesis", difficulty="Beginner",
+                   learning_style=["Visual", "Auditory"])
+
+    assert key == make_key("lesson", "Lesson on {topic}", "model", learning_style=("Auditory", "Visual"),
+                           difficulty="Beginner", topic="  photosynthesis ")
+    assert key != make_key("lesson", "Lesson on {topic}", "model", topic="Photosynthesis", difficulty="Advanced",
+                           learning_style=["Visual", "Auditory"])
+    assert key != make_key("lesson", "Lesson about {topic}", "model", topic="Photosynthesis",
+                           difficulty="Beginner", learning_style=["Visual", "Auditory"])
+    assert key != make_key("lesson", "Lesson on {topic}", "other-model", topic="Photosynthesis",
+                           difficulty="Beginner", learning_style=["Visual", "Auditory"])
+
+
+def test_entries_expire_after_their_ttl(store):
+    store.set("short", "value", ttl=0.05)
+    store.set("long", "value")
+
+    assert store.get("short") == "value"
+    time.sleep(0.1)
+    assert store.get("short") is None
+    assert not store.contains("short")
+    assert store.get("long") == "value"
+    # Expired entries are gone from disk too, not only from memory
+    assert ResponseCache(path=store.path).get("short") is None
+
+
+def test_memory_tier_evicts_least_recently_used(tmp_path):
+    store = ResponseCache(path=str(tmp_path / "responses.sqlite3"), memory_max_entries=2)
+    store.set("a", "1")
+    store.set("b", "2")
+    store.get("a")
+    store.set("c", "3")
+
+    assert store.stats()["memory_entries"] == 2
+    assert store.stats()["evictions"] == 1
+    # "b" fell out of memory but is still served from SQLite
+    assert store.get("b") == "2"
+    assert store.stats()["disk_hits"] == 1
+
+
+def test_disk_hits_are_promoted_to_memory(store):
+    store.set("key", "value")
+    fresh = ResponseCache(path=store.path)
+
+    assert fresh.get("key") == "value"
+    assert fresh.get("key") == "value"
+    stats = fresh.stats()
+    assert (stats["disk_hits"], stats["memory_hits"], stats["memory_entries"]) == (1, 1, 1)
+
+
+def test_disk_tier_is_bounded(tmp_path):
+    store = ResponseCache(path=str(tmp_path / "responses.sqlite3"), memory_max_entries=1, disk_max_entries=2)
+    for key in ("a", "b", "c"):
+        store.set(key, key)
+        time.sleep(0.01)
+
+    fresh = ResponseCache(path=store.path)
+    assert fresh.get("a") is None
+    assert fresh.get("b") == "b" and fresh.get("c") == "c"
+
+
+def test_refresh_regenerates_and_replaces_the_stored_response(store, router):
+    answers = iter(["first", "second"])
+
+    @cached_response("lesson", "Lesson on {topic}", cache=store, semantic=False)
+    def lesson(topic):
+        return next(answers)
+
+    assert lesson("Photosynthesis") == "first"
+    assert lesson("Photosynthesis") == "first"
+    with refresh():
+        assert lesson("Photosynthesis") == "second"
+    assert lesson("Photosynthesis") == "second"
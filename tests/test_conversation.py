@@ -0,0 +1,105 @@
+import threading
+import time
+
+import pytest
+
+from utils import conversation as conversation_module
+from utils.conversation import Conversation
+from utils.resilience import ErrorResult
+from utils.tokens import estimate_tokens
+
+
+class FakeSummarizer:
+    """Stands in for summarize_conversation: appends the folded questions to the summary."""
+
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+        self.release.set()
+        self.fail = False
+
+    def __call__(self, summary, turns, words):
+        self.calls.append([question for question, _ in turns])
+        self.release.wait(2)
+        if self.fail:
+            return ErrorResult("Error generating chat summary: upstream failed")
+        return " ".join(part for part in [summary, *(question for question, _ in turns)] if part)
+
+
+@pytest.fixture
+def summarizer(monkeypatch):
+    summarizer = FakeSummarizer()
+    monkeypatch.setattr(conversation_module, "summarize_conversation", summarizer)
+    return summarizer
+
+
+def folded(conversation, count, timeout=2.0):
+    end = time.monotonic() + timeout
+    while conversation.stats()["folded_turns"] != count:
+        assert time.monotonic() < end, "fold did not finish"
+        time.sleep(0.005)
+    conversation.wait()
+
+
+def test_older_turns_are_folded_in_order(summarizer):
+    conversation = Conversation(recent_turns=2)
+    for n in range(3):
+        conversation.add(f"q{n}", f"a{n}")
+    folded(conversation, 1)
+    for n in range(3, 5):
+        conversation.add(f"q{n}", f"a{n}")
+    folded(conversation, 3)
+
+    summary, recent = conversation.context()
+    assert summary == "q0 q1 q2"
+    assert recent == [("q3", "a3"), ("q4", "a4")]
+    assert [turn for call in summarizer.calls for turn in call] == ["q0", "q1", "q2"]
+
+
+def test_turns_added_during_a_fold_are_folded_afterwards(summarizer):
+    conversation = Conversation(recent_turns=1)
+    summarizer.release.clear()
+    conversation.add("q0", "a0")
+    conversation.add("q1", "a1")
+    # The first fold (q0) is running; these turns arrive before it lands
+    for n in range(2, 5):
+        conversation.add(f"q{n}", f"a{n}")
+    assert len(summarizer.calls) == 1
+    # Until the fold lands, unfolded turns stay out of the prompt
+    assert conversation.context() == ("", [("q4", "a4")])
+    summarizer.release.set()
+    folded(conversation, 4)
+
+    assert conversation.context() == ("q0 q1 q2 q3", [("q4", "a4")])
+    assert summarizer.calls == [["q0"], ["q1", "q2", "q3"]]
+
+
+def test_failed_fold_is_retried_after_the_next_turn(summarizer):
+    conversation = Conversation(recent_turns=1)
+    summarizer.fail = True
+    conversation.add("q0", "a0")
+    conversation.add("q1", "a1")
+    conversation.wait()
+    assert conversation.stats()["folded_turns"] == 0
+
+    summarizer.fail = False
+    conversation.add("q2", "a2")
+    folded(conversation, 2)
+
+    assert conversation.context()[0] == "q0 q1"
+
+
+def test_prompt_history_stays_within_the_token_budget(summarizer):
+    conversation = Conversation(recent_turns=4, history_tokens=300)
+    answer = "word " * 2000
+    for n in range(20):
+        conversation.add(f"question {n}", answer)
+    folded(conversation, 16)
+
+    summary, recent = conversation.context()
+    history_tokens = sum(estimate_tokens(question) + estimate_tokens(text) for question, text in recent)
+    assert recent and recent[-1][0] == "question 19"
+    # Each answer is clipped, and only as many recent turns as fit the budget are kept
+    assert all(estimate_tokens(text) <= conversation_module.TURN_ANSWER_TOKENS + 1 for _, text in recent)
+    assert history_tokens <= max(300, estimate_tokens(recent[-1][0]) + estimate_tokens(recent[-1][1]))
+    assert conversation.stats()["prompt_history_tokens"] == estimate_tokens(summary) + history_tokens
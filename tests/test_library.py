@@ -0,0 +1,60 @@
+import os
+
+import pytest
+
+from utils import documents
+from utils.library import MAX_QUERY_TERMS, DocumentLibrary
+from utils.retrieval import retrieve_context
+
+
+def text_file(topic, paragraphs=40):
+    return "\n\n".join(f"Paragraph {n} about {topic}. The {topic} section explains {topic} in detail."
+                       for n in range(paragraphs)).encode("utf-8")
+
+
+@pytest.fixture
+def library(tmp_path, monkeypatch):
+    monkeypatch.setattr(documents, "EXTRACT_DIR", str(tmp_path / "extracted"))
+    return DocumentLibrary(path=str(tmp_path / "library"))
+
+
+def test_documents_are_indexed_once_and_listed_per_owner(library):
+    first = library.add(text_file("mitochondria"), "text/plain", "bio.txt", owner="alice")
+    second = library.add(text_file("mitochondria"), "text/plain", "copy.txt", owner="bob")
+
+    assert first == second
+    assert [document["name"] for document in library.documents("alice")] == ["bio.txt"]
+    assert [document["id"] for document in library.documents("bob")] == [first]
+    assert library.documents("carol") == []
+    assert any("mitochondria" in excerpt for excerpt in retrieve_context(library.index(first), "What are mitochondria?"))
+
+
+def test_library_text_is_not_also_written_to_the_extraction_cache(library):
+    library.add(text_file("photosynthesis"), "text/plain", owner="alice")
+
+    assert not os.path.exists(documents.EXTRACT_DIR)
+
+
+def test_least_recently_used_documents_are_evicted_over_budget(library):
+    readded = library.add(text_file("volcanoes"), "text/plain", owner="alice")
+    stale = library.add(text_file("glaciers"), "text/plain", owner="alice")
+    size = library.stats()["stored_bytes"] // 2
+    library.max_bytes = int(size * 2.5)
+    # Re-adding counts as a use, so "volcanoes" is now the most recent of the two
+    library.add(text_file("volcanoes"), "text/plain", owner="bob")
+
+    new = library.add(text_file("earthquakes"), "text/plain", owner="carol")
+
+    assert library.get(stale) is None
+    assert library.get(readded) is not None and library.get(new) is not None
+    assert [document["id"] for document in library.documents("alice")] == [readded]
+    assert not os.path.exists(os.path.join(library.path, stale))
+    assert library.stats()["stored_bytes"] <= library.max_bytes
+
+
+def test_long_queries_stay_within_the_sql_parameter_limit(library):
+    document_id = library.add(text_file("tides"), "text/plain")
+    question = " ".join(f"word{n}" for n in range(5000)) + " tides"
+
+    assert library.index(document_id).search(question)
+    assert len(library._postings_ranges(document_id, question.split() * 2)) <= MAX_QUERY_TERMS
@@ -0,0 +1,148 @@
+import threading
+import time
+
+import pytest
+
+from utils import llm, resilience
+from utils.resilience import DeadlineExceeded, is_retryable, resilient_invoke
+from utils.scheduler import LLMScheduler, SchedulerBusy
+
+
+class _Message:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeClient:
+    """Chat client that answers after ``delay`` seconds, honoring a per-call timeout like the HTTP client."""
+
+    def __init__(self, model_name, delay=0.0, error=None):
+        self.model_name = model_name
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    def invoke(self, prompt, timeout=None):
+        self.calls += 1
+        if timeout is not None and timeout < self.delay:
+            time.sleep(timeout)
+            raise TimeoutError("Request timed out.")
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return _Message(f"{self.model_name}: {prompt}")
+
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"Error code: {status_code}")
+        self.status_code = status_code
+
+
+def call(client, timeout):
+    return llm.invoke_text(client, "prompt", timeout=timeout)
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    scheduler = LLMScheduler(max_concurrency=2, requests_per_minute=0, tokens_per_minute=0, max_wait=30)
+    monkeypatch.setattr(llm, "scheduler", scheduler)
+    monkeypatch.setattr(resilience, "scheduler", scheduler)
+    monkeypatch.setattr(resilience, "HEDGE_ENABLED", False)
+    monkeypatch.setitem(resilience.DEADLINES, "lesson", 1)
+    return scheduler
+
+
+def test_fallback_answers_when_slow_primaries_hold_every_slot(scheduler):
+    primary = FakeClient("large", delay=5)
+    fallback = FakeClient("fast", delay=0.05)
+    results = [None] * 3
+
+    def run(i):
+        try:
+            results[i] = resilient_invoke(call, primary, "lesson", fallback)
+        except Exception as e:
+            results[i] = e
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["fast: prompt"] * 3
+    assert time.monotonic() - started < 2.5
+    stats = scheduler.stats()
+    assert stats["active"] == 0
+    assert stats["queued"] == 0
+
+
+def test_deadline_exceeded_without_fallback(scheduler):
+    primary = FakeClient("large", delay=5)
+
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        resilient_invoke(call, primary, "lesson")
+
+    assert time.monotonic() - started < 1.5
+    # The abandoned request gave its slot back at the deadline, not after its own 5 s
+    time.sleep(0.1)
+    assert scheduler.stats()["active"] == 0
+
+
+def test_auth_errors_are_not_retried_or_sent_to_fallback(scheduler):
+    primary = FakeClient("large", error=StatusError(401))
+    fallback = FakeClient("fast")
+
+    with pytest.raises(StatusError):
+        resilient_invoke(call, primary, "lesson", fallback)
+
+    assert primary.calls == 1
+    assert fallback.calls == 0
+
+
+def test_client_errors_skip_retries_but_try_fallback(scheduler):
+    primary = FakeClient("large", error=StatusError(400))
+    fallback = FakeClient("fast")
+
+    assert resilient_invoke(call, primary, "lesson", fallback) == "fast: prompt"
+    assert primary.calls == 1
+
+
+def test_server_errors_are_retried(scheduler, monkeypatch):
+    monkeypatch.setattr(resilience, "BACKOFF_BASE", 0.01)
+    primary = FakeClient("large", error=StatusError(503))
+
+    with pytest.raises(StatusError):
+        resilient_invoke(call, primary, "lesson")
+
+    assert primary.calls == 1 + resilience.MAX_RETRIES
+
+
+@pytest.mark.parametrize("error, retryable", [
+    (StatusError(400), False),
+    (StatusError(401), False),
+    (StatusError(404), False),
+    (StatusError(408), True),
+    (StatusError(429), True),
+    (StatusError(500), True),
+    (TimeoutError(), True),
+    (SchedulerBusy(), False),
+])
+def test_is_retryable(error, retryable):
+    assert is_retryable(error) is retryable
+
+
+def test_stream_reads_are_not_cut_to_the_remaining_budget():
+    options = llm._request_options(2.0, 1.5, stream=True)
+    timeout = options["timeout"]
+
+    assert timeout.connect == pytest.approx(0.5)
+    assert timeout.read == resilience.STREAM_IDLE_TIMEOUT
+
+
+def test_plain_requests_get_the_remaining_budget():
+    assert llm._request_options(2.0, 0.5) == {"timeout": pytest.approx(1.5)}
+    with pytest.raises(TimeoutError):
+        llm._request_options(1.0, 1.0)
@@ -0,0 +1,59 @@
+from utils.results import ResultStore
+
+
+def test_same_request_keeps_its_stored_value():
+    state = {}
+    results = ResultStore(state)
+    entry = results.request("lesson", "Photosynthesis", topic="Photosynthesis", difficulty="Beginner")
+    results.save(entry, "lesson text")
+
+    # A rerun builds a new store over the same session state
+    again = ResultStore(state).request("lesson", "Photosynthesis", topic=" photosynthesis", difficulty="Beginner")
+
+    assert again is entry
+    assert again["value"] == "lesson text"
+    assert ResultStore(state).current("lesson") is entry
+
+
+def test_current_result_is_tracked_per_kind():
+    results = ResultStore({})
+    lesson = results.request("lesson", "A", topic="A")
+    quiz = results.request("quiz", "B", topic="B")
+    other = results.request("lesson", "C", topic="C")
+
+    assert results.current("lesson") is other
+    assert results.current("quiz") is quiz
+    assert results.select(lesson["key"]) is lesson
+    assert results.current("lesson") is lesson
+
+
+def test_regenerate_clears_the_value_and_requests_a_refresh():
+    results = ResultStore({})
+    entry = results.request("quiz", "Cells", topic="Cells")
+    results.save(entry, "old quiz")
+
+    results.regenerate("quiz")
+
+    assert entry["value"] is None and entry["refresh"] is True
+    results.save(entry, "new quiz")
+    assert entry["refresh"] is False
+
+
+def test_discard_forgets_a_failed_request():
+    results = ResultStore({})
+    entry = results.request("lesson", "Cells", topic="Cells")
+
+    results.discard(entry)
+
+    assert results.current("lesson") is None
+    assert results.history() == []
+
+
+def test_history_is_bounded_and_lists_generated_results_newest_first():
+    results = ResultStore({}, max_entries=2)
+    for topic in ("A", "B", "C"):
+        results.save(results.request("lesson", topic, topic=topic), f"lesson {topic}")
+    results.request("quiz", "pending", topic="D")
+
+    assert [entry["title"] for entry in results.history()] == ["C"]
+    assert results.select(results.key("lesson", topic="A")) is None
@@ -0,0 +1,108 @@
+import time
+
+import pytest
+
+from utils import router as router_module
+from utils.metrics import Metrics
+from utils.router import ModelRouter
+
+LARGE = router_module.TIERS["large"]
+FAST = router_module.TIERS["fast"]
+
+
+@pytest.fixture
+def metrics(monkeypatch):
+    metrics = Metrics(trace_file="")
+    monkeypatch.setattr(router_module, "metrics", metrics)
+    monkeypatch.setattr(router_module, "ROUTER_MIN_SAMPLES", 10)
+    return metrics
+
+
+def record_calls(metrics, count, model=LARGE, latency=1.0, errors=0):
+    for i in range(count):
+        metrics.record("llm", kind="lesson", model=model, latency=latency,
+                       error="APIError" if i < errors else None)
+
+
+def test_routes_follow_the_table():
+    router = ModelRouter()
+
+    assert router.route("lesson") == "large"
+    assert router.route("lesson", "Overview") == "fast"
+    assert router.route("flashcards") == "fast"
+    assert router.route("unknown-kind") == router_module.DEFAULT_TIER
+
+
+def test_slow_p95_downgrades_to_the_faster_tier(metrics):
+    router = ModelRouter()
+    # Lessons may take 90 s, so a p95 above 45 s is too slow
+    record_calls(metrics, 10, latency=50)
+
+    assert router.model("lesson") == FAST
+    assert router.stats()["downgrades"] == 1
+    assert "lesson" in router.stats()["active_downgrades"]
+
+
+@pytest.mark.parametrize("count, latency, errors", [
+    (9, 50, 0),   # too few samples to judge
+    (10, 40, 0),  # p95 under the limit
+    (12, 1, 3),   # error rate at 0.25 is not above the limit
+])
+def test_no_downgrade_below_the_thresholds(metrics, count, latency, errors):
+    router = ModelRouter()
+    record_calls(metrics, count, latency=latency, errors=errors)
+
+    assert router.model("lesson") == LARGE
+
+
+def test_error_rate_downgrades_to_the_faster_tier(metrics):
+    router = ModelRouter()
+    record_calls(metrics, 10, latency=1, errors=3)
+
+    assert router.model("lesson") == FAST
+
+
+def test_slow_calls_on_another_model_or_kind_do_not_count(metrics):
+    router = ModelRouter()
+    record_calls(metrics, 10, model=FAST, latency=50)
+    for _ in range(10):
+        metrics.record("llm", kind="quiz", model=LARGE, latency=50)
+
+    assert router.model("lesson") == LARGE
+
+
+def test_downgrade_ends_after_the_cooldown_with_fresh_statistics(metrics, monkeypatch):
+    monkeypatch.setattr(router_module, "DOWNGRADE_COOLDOWN", 0.1)
+    router = ModelRouter()
+    record_calls(metrics, 10, latency=50)
+
+    assert router.model("lesson") == FAST
+    assert router.model("lesson") == FAST
+    time.sleep(0.15)
+    # The slow calls from before the downgrade no longer count
+    assert router.model("lesson") == LARGE
+    assert router.model("lesson") == LARGE
+    stats = router.stats()
+    assert stats["restores"] == 1
+    assert stats["active_downgrades"] == {}
+
+
+def test_tiers_without_a_faster_tier_are_never_downgraded(metrics):
+    router = ModelRouter()
+    for _ in range(10):
+        metrics.record("llm", kind="flashcards", model=FAST, latency=500, error="APIError")
+
+    assert router.model("flashcards") == FAST
+
+
+def test_pinned_model_overrides_routing_for_its_kind_only(monkeypatch):
+    monkeypatch.setattr(router_module, "get_llm", lambda model, temperature: (model, temperature))
+    router = ModelRouter()
+
+    with router.pinned("lesson", FAST):
+        assert router.client("lesson") == (FAST, router_module.DEFAULT_TEMPERATURE)
+        assert router.client("quiz") == (LARGE, router_module.DEFAULT_TEMPERATURE)
+        with router.pinned("lesson", LARGE):
+            assert router.client("lesson")[0] == LARGE
+        assert router.client("lesson")[0] == FAST
+    assert router.client("lesson")[0] == LARGE
@@ -0,0 +1,130 @@
+import threading
+import time
+
+import pytest
+
+from utils.scheduler import BACKGROUND, DEFAULT, INTERACTIVE, LLMScheduler, SchedulerBusy, priority
+
+
+def unlimited(**kwargs):
+    return LLMScheduler(requests_per_minute=0, tokens_per_minute=0, **kwargs)
+
+
+def wait_until(predicate, timeout=2.0):
+    end = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < end, "condition not reached"
+        time.sleep(0.005)
+
+
+def test_queue_runs_higher_priority_first():
+    scheduler = unlimited(max_concurrency=1)
+    order = []
+    release = threading.Event()
+
+    def hold():
+        with scheduler.slot():
+            release.wait()
+
+    def call(name, level):
+        with scheduler.slot(level=level):
+            order.append(name)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    wait_until(lambda: scheduler.stats()["active"] == 1)
+    waiters = []
+    for name, level in [("background", BACKGROUND), ("default", DEFAULT), ("interactive", INTERACTIVE),
+                        ("background-2", BACKGROUND)]:
+        waiter = threading.Thread(target=call, args=(name, level))
+        waiter.start()
+        waiters.append(waiter)
+        # Queue them one at a time, so arrival order is known
+        wait_until(lambda: scheduler.stats()["queued"] == len(waiters))
+    release.set()
+    for thread in [holder, *waiters]:
+        thread.join()
+
+    assert order == ["interactive", "default", "background", "background-2"]
+
+
+def test_priority_context_sets_the_default_level():
+    scheduler = unlimited(max_concurrency=1)
+    seen = []
+    release = threading.Event()
+
+    def hold():
+        with scheduler.slot():
+            release.wait()
+
+    def call(name, level):
+        with priority(level):
+            with scheduler.slot():
+                seen.append(name)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    wait_until(lambda: scheduler.stats()["active"] == 1)
+    background = threading.Thread(target=call, args=("background", BACKGROUND))
+    background.start()
+    wait_until(lambda: scheduler.stats()["queued"] == 1)
+    interactive = threading.Thread(target=call, args=("interactive", INTERACTIVE))
+    interactive.start()
+    wait_until(lambda: scheduler.stats()["queued"] == 2)
+    release.set()
+    for thread in (holder, background, interactive):
+        thread.join()
+
+    assert seen == ["interactive", "background"]
+
+
+def test_full_queue_is_rejected_immediately():
+    scheduler = unlimited(max_concurrency=1, max_queue_depth=1)
+    release = threading.Event()
+
+    def hold():
+        with scheduler.slot():
+            release.wait()
+
+    threads = [threading.Thread(target=hold) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    wait_until(lambda: scheduler.stats()["queued"] == 1)
+
+    started = time.monotonic()
+    with pytest.raises(SchedulerBusy):
+        with scheduler.slot():
+            pass
+    assert time.monotonic() - started < 0.5
+    release.set()
+    for thread in threads:
+        thread.join()
+    stats = scheduler.stats()
+    assert stats["rejected"] == 1
+    assert stats["active"] == 0 and stats["queued"] == 0
+
+
+@pytest.mark.parametrize("max_wait, limit", [(0.2, None), (30, 0.2)])
+def test_wait_past_the_limit_raises_busy_and_leaves_the_queue(max_wait, limit):
+    scheduler = unlimited(max_concurrency=1, max_wait=max_wait)
+    release = threading.Event()
+
+    def hold():
+        with scheduler.slot():
+            release.wait()
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    wait_until(lambda: scheduler.stats()["active"] == 1)
+
+    started = time.monotonic()
+    with pytest.raises(SchedulerBusy):
+        with scheduler.slot(max_wait=limit):
+            pass
+    assert 0.15 < time.monotonic() - started < 1
+    stats = scheduler.stats()
+    assert stats["timed_out"] == 1
+    assert stats["queued"] == 0
+    release.set()
+    holder.join()
+
@@ -0,0 +1,81 @@
+import pytest
+
+from utils.semantic_cache import SemanticCache, discriminating_terms, topic_terms
+
+
+@pytest.mark.parametrize("stored, requested", [
+    ("C", "C++"),
+    ("C++", "C"),
+    ("C", "C#"),
+    ("Introduction to C", "Introduction to C++"),
+    ("Work and energy", "energy"),
+    ("Reinforcement learning", "reinforcement"),
+    ("Machine learning", "Learning"),
+])
+def test_different_subjects_do_not_match(stored, requested):
+    cache = SemanticCache()
+    cache.add("lesson", "Intermediate", stored, "stored-key")
+
+    assert cache.lookup("lesson", "Intermediate", requested) is None
+    assert topic_terms(stored) != topic_terms(requested)
+
+
+@pytest.mark.parametrize("stored, requested", [
+    ("Neural networks", "neural network"),
+    ("Introduction to photosynthesis", "photosynthesis basics"),
+    ("Explain the French Revolution", "French Revolution"),
+    ("Introduction to C++", "C++"),
+    ("How does photosynthesis work", "photosynthesis"),
+    ("World War II", "world war 2"),
+])
+def test_rephrased_subjects_match(stored, requested):
+    cache = SemanticCache()
+    cache.add("lesson", "Intermediate", stored, "stored-key")
+
+    match = cache.lookup("lesson", "Intermediate", requested)
+
+    assert match is not None
+    assert match[0] == "stored-key"
+    assert match[2] == stored
+
+
+@pytest.mark.parametrize("requested", ["photosynthesys", "Photosynthesis process", "photosynthesis in plants"])
+def test_threshold_decides_near_variants(requested):
+    cache = SemanticCache()
+    cache.add("lesson", "Intermediate", "photosynthesis", "stored-key")
+
+    assert cache.lookup("lesson", "Intermediate", requested) is None
+    assert cache.lookup("lesson", "Intermediate", requested, threshold=0.6)[0] == "stored-key"
+
+
+@pytest.mark.parametrize("stored, requested", [
+    ("C", "C++"),
+    ("C#", "C++"),
+    ("Python 2", "Python 3"),
+])
+def test_version_and_language_markers_never_match(stored, requested):
+    cache = SemanticCache(threshold=0.0)
+    cache.add("lesson", "Intermediate", stored, "stored-key")
+
+    assert cache.lookup("lesson", "Intermediate", requested) is None
+    assert discriminating_terms(stored) != discriminating_terms(requested)
+
+
+def test_partitions_are_separate():
+    cache = SemanticCache()
+    cache.add("lesson", "Beginner", "Photosynthesis", "beginner-key")
+
+    assert cache.lookup("lesson", "Advanced", "Photosynthesis") is None
+    assert cache.lookup("quiz", "Beginner", "Photosynthesis") is None
+
+
+def test_audit_log_records_closest_miss():
+    cache = SemanticCache()
+    cache.add("lesson", "Intermediate", "Work and energy", "work-key")
+
+    cache.lookup("lesson", "Intermediate", "energy")
+
+    entry = cache.audit_log()[-1]
+    assert entry["hit"] is False
+    assert entry["matched_topic"] == "Work and energy"
+    assert cache.stats()["hits"] == 0
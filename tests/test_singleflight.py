@@ -0,0 +1,178 @@
+import threading
+import time
+
+import pytest
+
+from utils.singleflight import SingleFlight
+
+
+def run_concurrently(fn, count):
+    results = [None] * count
+    barrier = threading.Barrier(count)
+
+    def run(i):
+        barrier.wait()
+        try:
+            results[i] = fn()
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_calls_with_the_same_key_share_one_call():
+    flight = SingleFlight()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.2)
+        return "response"
+
+    results = run_concurrently(lambda: flight.do("key", fetch), 5)
+
+    assert results == ["response"] * 5
+    assert len(calls) == 1
+    assert flight.stats() == {"issued": 1, "coalesced": 4, "in_flight": 0}
+
+
+def test_different_keys_are_not_coalesced():
+    flight = SingleFlight()
+    calls = []
+
+    def fetch(key):
+        calls.append(key)
+        time.sleep(0.05)
+        return key
+
+    results = run_concurrently(lambda: flight.do(threading.current_thread().name, lambda: fetch("x")), 3)
+
+    assert results == ["x"] * 3
+    assert len(calls) == 3
+
+
+def test_error_is_shared_and_the_key_is_released():
+    flight = SingleFlight()
+
+    def fail():
+        time.sleep(0.1)
+        raise ValueError("upstream failed")
+
+    results = run_concurrently(lambda: flight.do("key", fail), 3)
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flight.do("key", lambda: "retried") == "retried"
+
+
+def test_concurrent_streams_share_one_upstream_stream():
+    flight = SingleFlight()
+    calls = []
+    completed = []
+
+    def stream():
+        calls.append(1)
+        for piece in ("a", "b", "c"):
+            time.sleep(0.05)
+            yield piece
+
+    results = run_concurrently(lambda: "".join(flight.stream("key", stream, on_complete=completed.append)), 4)
+
+    assert results == ["abc"] * 4
+    assert len(calls) == 1
+    assert completed == ["abc"]
+
+
+def test_late_subscriber_receives_the_chunks_already_sent():
+    flight = SingleFlight()
+    started = threading.Event()
+
+    def stream():
+        yield "first "
+        started.set()
+        time.sleep(0.1)
+        yield "second"
+
+    leader = flight.stream("key", stream)
+    started.wait()
+    follower = flight.stream("key", stream)
+
+    assert "".join(follower) == "first second"
+    assert "".join(leader) == "first second"
+    assert flight.stats()["issued"] == 1
+
+
+def test_stream_error_reaches_every_subscriber():
+    flight = SingleFlight()
+
+    def stream():
+        yield "partial"
+        time.sleep(0.05)
+        raise RuntimeError("stream broke")
+
+    subscribers = [flight.stream("key", stream) for _ in range(2)]
+
+    for subscriber in subscribers:
+        with pytest.raises(RuntimeError):
+            list(subscriber)
+
+
+def test_streamed_and_plain_calls_use_separate_keys():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def stream():
+        release.wait()
+        yield "streamed"
+
+    chunks = flight.stream("key", stream)
+    # A plain call with the same key does not join the in-flight stream
+    assert flight.do("key", lambda: "plain") == "plain"
+    release.set()
+    assert "".join(chunks) == "streamed"
+    assert flight.stats()["coalesced"] == 0
+
+
+def slow_stream(closed, count=50):
+    def stream():
+        try:
+            for i in range(count):
+                time.sleep(0.02)
+                yield str(i)
+        finally:
+            closed.set()
+    return stream
+
+
+def test_upstream_stops_when_the_last_subscriber_leaves():
+    flight = SingleFlight()
+    closed = threading.Event()
+    completed = []
+
+    chunks = flight.stream("key", slow_stream(closed), on_complete=completed.append)
+    assert next(chunks) == "0"
+    chunks.close()
+
+    assert closed.wait(1)
+    assert completed == []
+    # A new caller starts a fresh stream instead of joining the stopped one
+    assert "".join(flight.stream("key", lambda: iter(["new"]))) == "new"
+    assert flight.stats()["issued"] == 2
+
+
+def test_upstream_continues_while_a_subscriber_remains():
+    flight = SingleFlight()
+    closed = threading.Event()
+    completed = []
+
+    leaving = flight.stream("key", slow_stream(closed, 5), on_complete=completed.append)
+    staying = flight.stream("key", slow_stream(closed, 5))
+    next(leaving)
+    leaving.close()
+
+    assert "".join(staying) == "01234"
+    assert completed == ["01234"]
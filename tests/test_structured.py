@@ -0,0 +1,84 @@
+import pytest
+
+from utils.structured import (
+    JSONObjectStreamParser,
+    iter_structured_items,
+    normalize_flashcard,
+    normalize_question,
+    repair_json,
+)
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ('{"front": "ATP", "back": "Energy"}', {"front": "ATP", "back": "Energy"}),
+    ('{"front": "ATP", "back": "Energy",}', {"front": "ATP", "back": "Energy"}),
+    ('{"front": "ATP", "back": "Line one\nline two"}', {"front": "ATP", "back": "Line one\nline two"}),
+    ('{"front": "ATP", "back": "Energy', {"front": "ATP", "back": "Energy"}),
+    ('{"front": "ATP", "tags": ["a", "b"', {"front": "ATP", "tags": ["a", "b"]}),
+    ('{"front": "Say \\"hi\\"", "back": "x" "y"}', {"front": 'Say "hi"', "back": "x"}),
+])
+def test_repair_json(raw, expected):
+    assert repair_json(raw) == expected
+
+
+@pytest.mark.parametrize("raw", ["[1, 2]", "no json here", "{}"])
+def test_repair_json_gives_up(raw):
+    assert not repair_json(raw)
+
+
+def test_stream_parser_handles_objects_split_across_chunks():
+    parser = JSONObjectStreamParser()
+    chunks = ['[{"front": "a {brace', '}", "back": "1"}, {"fr', 'ont": "b", "back": "2"}]']
+
+    objects = [raw for chunk in chunks for raw in parser.feed(chunk)]
+
+    assert objects == ['{"front": "a {brace}", "back": "1"}', '{"front": "b", "back": "2"}']
+    assert parser.close() is None
+
+
+def test_stream_parser_flushes_unterminated_object():
+    parser = JSONObjectStreamParser()
+    parser.feed('[{"front": "a", "back": "cut off')
+
+    assert parser.close() == '{"front": "a", "back": "cut off'
+
+
+def test_iter_structured_items_repairs_and_skips():
+    chunks = [
+        'Here are your cards:\n[{"front": "ATP", "back": "Energy",},\n',
+        '{"back": "no front"},\n',
+        '{"term": "DNA", "definition": "Genetic\ncode"},\n',
+        '{"front": "RNA", "back": "Messen',
+    ]
+
+    cards = list(iter_structured_items(chunks, normalize_flashcard))
+
+    assert cards == [
+        {"front": "ATP", "back": "Energy"},
+        {"front": "DNA", "back": "Genetic\ncode"},
+        {"front": "RNA", "back": "Messen"},
+    ]
+
+
+def test_iter_structured_items_unpacks_wrapper_object():
+    chunks = ['{"cards": [{"front": "a", "back": "1"}, {"front": "b", "back": "2"}]}']
+
+    assert [card["front"] for card in iter_structured_items(chunks, normalize_flashcard)] == ["a", "b"]
+
+
+@pytest.mark.parametrize("item, options, answer", [
+    ({"question": "Q?", "options": ["A) one", "B) two", "C) three", "D) four"], "answer": "B"},
+     ["one", "two", "three", "four"], "B"),
+    ({"question": "Q?", "options": {"A": "one", "B": "two"}, "answer": "b) two"}, ["one", "two"], "B"),
+    ({"question": "Q?", "A": "one", "B": "two", "C": "three", "correct": "three"}, ["one", "two", "three"], "C"),
+    ({"question": "Q?", "choices": ["Apple", "Banana"], "answer": "Apple"}, ["Apple", "Banana"], "A"),
+])
+def test_normalize_question(item, options, answer):
+    question = normalize_question(item)
+
+    assert question["options"] == options
+    assert question["answer"] == answer
+
+
+def test_normalize_question_without_text_is_dropped():
+    assert normalize_question({"options": ["a", "b"], "answer": "A"}) is None
@@ -0,0 +1,429 @@
+import contextvars
+import hashlib
+import inspect
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import wraps
+
+from utils.metrics import metrics, tagged
+from utils.resilience import ErrorResult
+from utils.router import router
+from utils.semantic_cache import semantic_cache
+from utils.singleflight import single_flight
+
+# Cache settings (override through .env)
+CACHE_DIR = os.getenv("EDUTUTOR_CACHE_DIR", ".cache")
+CACHE_TTL = int(os.getenv("EDUTUTOR_CACHE_TTL", 7 * 24 * 60 * 60))
+MEMORY_MAX_ENTRIES = int(os.getenv("EDUTUTOR_CACHE_MEMORY_ENTRIES", 256))
+DISK_MAX_ENTRIES = int(os.getenv("EDUTUTOR_CACHE_DISK_ENTRIES", 5000))
+
+_refresh = contextvars.ContextVar("edututor_cache_refresh", default=False)
+
+
+@contextmanager
+def refresh(enabled=True):
+    """
+    Regenerate the enclosed cached calls instead of serving stored responses
+
+    The new responses replace the stored ones.
+
+    Args:
+        enabled (bool): Whether to bypass the cache, so callers can pass a flag through
+    """
+    token = _refresh.set(enabled)
+    try:
+        yield
+    finally:
+        _refresh.reset(token)
+
+
+def normalize_topic(topic):
+    """
+    Normalize a topic so trivial variations share a cache entry
+
+    Args:
+        topic (str): Raw topic as typed by the user
+
+    Returns:
+        str: Lower-cased topic with collapsed whitespace
+    """
+    return " ".join(str(topic).lower().split())
+
+
+def template_hash(template):
+    """
+    Short content hash of a prompt template, so editing a prompt invalidates old entries
+
+    Args:
+        template (str): Prompt template text
+
+    Returns:
+        str: First 12 hex characters of the SHA-256 digest
+    """
+    return hashlib.sha256(template.encode("utf-8")).hexdigest()[:12]
+
+
+def make_key(kind, template, model, **params):
+    """
+    Build a cache key from the content type, prompt template, model and call parameters
+
+    Args:
+        kind (str): Content type (e.g., "lesson", "quiz")
+        template (str | PromptSpec): Prompt template used for the request; a compiled
+            template contributes its precomputed version
+        model (str): Model name the request is sent to
+        **params: Parameters the generator was called with
+
+    Returns:
+        str: Hex digest identifying the request
+    """
+    normalized = {}
+    for name, value in params.items():
+        if name == "topic":
+            value = normalize_topic(value)
+        elif isinstance(value, (list, tuple, set)):
+            value = sorted(str(item) for item in value)
+        normalized[name] = value
+    version = getattr(template, "version", None) or template_hash(template)
+    payload = json.dumps(
+        {"kind": kind, "template": version, "model": model, "params": normalized},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Two-tier cache for LLM responses: an in-process LRU in front of a SQLite file.
+
+    Entries expire after ``ttl`` seconds. Both tiers are bounded by entry count and
+    evict the least recently used entries first.
+    """
+
+    def __init__(self, path=None, ttl=CACHE_TTL, memory_max_entries=MEMORY_MAX_ENTRIES,
+                 disk_max_entries=DISK_MAX_ENTRIES):
+        self.path = path or os.path.join(CACHE_DIR, "responses.sqlite3")
+        self.ttl = ttl
+        self.memory_max_entries = memory_max_entries
+        self.disk_max_entries = disk_max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.RLock()
+        self._conn = None
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "sets": 0, "evictions": 0}
+
+    def _connection(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+            self._conn.commit()
+        return self._conn
+
+    def _remember(self, key, value, expires_at):
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_max_entries:
+            self._memory.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def get(self, key):
+        """
+        Look up a cached response
+
+        Args:
+            key (str): Key built with make_key
+
+        Returns:
+            str | None: Cached response, or None on a miss or expired entry
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._counters["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+
+            conn = self._connection()
+            row = conn.execute("SELECT value, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                value, expires_at = row
+                if expires_at > now:
+                    conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+                    conn.commit()
+                    self._remember(key, value, expires_at)
+                    self._counters["disk_hits"] += 1
+                    return value
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                conn.commit()
+
+            self._counters["misses"] += 1
+            return None
+
+    def contains(self, key):
+        """
+        Check for a live entry without counting a lookup or refreshing its recency
+
+        Args:
+            key (str): Key built with make_key
+
+        Returns:
+            bool: Whether a response is stored and not expired
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and entry[1] > now:
+                return True
+            row = self._connection().execute(
+                "SELECT 1 FROM responses WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            return row is not None
+
+    def set(self, key, value, ttl=None):
+        """
+        Store a response in both tiers
+
+        Args:
+            key (str): Key built with make_key
+            value (str): Response text to store
+            ttl (int, optional): Override for the default time-to-live in seconds
+        """
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._remember(key, value, expires_at)
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, expires_at, now),
+            )
+            conn.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+            overflow = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.disk_max_entries
+            if overflow > 0:
+                conn.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY last_access ASC LIMIT ?)",
+                    (overflow,),
+                )
+                self._counters["evictions"] += overflow
+            conn.commit()
+            self._counters["sets"] += 1
+
+    def clear(self):
+        """Remove every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            conn = self._connection()
+            conn.execute("DELETE FROM responses")
+            conn.commit()
+
+    def stats(self):
+        """
+        Hit/miss counters for both tiers
+
+        Returns:
+            dict: Counters plus the current entry count and hit rate
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
+
+
+# Shared by every Streamlit session in this process
+response_cache = ResponseCache()
+
+
+def _timed_stream(chunks, started, outcome, tags):
+    # Records the generator call once the caller has consumed (or abandoned) the stream
+    ttft = error = None
+    try:
+        for chunk in chunks:
+            if ttft is None:
+                ttft = time.monotonic() - started
+            yield chunk
+    except Exception as e:
+        error = type(e).__name__
+        raise
+    finally:
+        # An abandoned stream lets go of its shared upstream call right away
+        close = getattr(chunks, "close", None)
+        if close:
+            close()
+        metrics.record("generate", latency=time.monotonic() - started, ttft=ttft, cache=outcome(),
+                       error=error, stream=True, **tags)
+
+
+def cached_response(kind, template, model=None, cache=None, semantic=True):
+    """
+    Decorator that serves a generator function from the response cache
+
+    Functions with a ``topic`` parameter also consult the semantic cache, so a
+    near-duplicate topic with otherwise identical parameters reuses a stored response.
+    ErrorResult strings returned by the wrapped function are never stored.
+    Inside refresh() the stored response is ignored and replaced by a new one.
+    When called with ``stream=True`` a hit is replayed as a single chunk and a miss is
+    stored once the stream completes. Concurrent identical misses are coalesced into one
+    upstream call through the shared SingleFlight. Every call records its latency, time
+    to first chunk (when streaming), cache outcome and errors in the shared metrics
+    registry, and upstream calls made underneath are tagged with the content type,
+    difficulty and model. The decorated function's ``cached(...)`` takes the same
+    arguments and tells whether an exact response is already stored.
+
+    Unless a fixed model is given, utils.router picks the model for each call (from the
+    content type and any ``detail_level`` parameter) and the call is pinned to that
+    model, so keys and metric tags name the model that actually generated the response.
+    While the router has downgraded a content type, responses stored for its preferred
+    model are still served first; only a miss there is generated on the faster model.
+
+    Args:
+        kind (str): Content type used in the cache key
+        template (str | PromptSpec): Prompt template the function formats
+        model (str, optional): Fixed model name the function calls, instead of routing
+        cache (ResponseCache, optional): Cache instance, defaults to the shared one
+        semantic (bool): Whether to match near-duplicate topics
+
+    Returns:
+        callable: Decorator
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        def call_params(args, kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            params = dict(bound.arguments)
+            return params, params.pop("stream", False)
+
+        def candidate_models(params):
+            # Preferred model first, then the one the router currently sends new calls to
+            if model:
+                return [model]
+            detail_level = params.get("detail_level")
+            preferred = router.tiers[router.preferred_tier(kind, detail_level)]
+            routed = router.model(kind, detail_level)
+            return [preferred] if routed == preferred else [preferred, routed]
+
+        def lookup(store, models, params):
+            # Exact keys on every candidate model before any near-duplicate topic
+            for i, candidate in enumerate(models):
+                key = make_key(kind, template, candidate, **params)
+                # Only the last exact lookup counts as a miss in the cache statistics
+                if i < len(models) - 1 and not store.contains(key):
+                    continue
+                cached = store.get(key)
+                if cached is not None:
+                    return cached, candidate, "hit"
+            if semantic and "topic" in params:
+                # Partition by every parameter except the topic itself
+                rest = {name: value for name, value in params.items() if name != "topic"}
+                for candidate in models:
+                    partition = make_key(kind, template, candidate, **rest)
+                    match = semantic_cache.lookup(kind, partition, params["topic"])
+                    cached = store.get(match[0]) if match is not None else None
+                    if cached is not None:
+                        return cached, candidate, "semantic_hit"
+            return None, None, None
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            store = cache or response_cache
+            params, stream = call_params(args, kwargs)
+            models = candidate_models(params)
+            # Inside refresh() only the lookups are skipped; the new response is still stored
+            if _refresh.get():
+                cached, served_by, outcome = None, None, None
+            else:
+                cached, served_by, outcome = lookup(store, models, params)
+            model_name = served_by or models[-1]
+            key = make_key(kind, template, model_name, **params)
+            tags = {"kind": kind, "model": model_name}
+            if params.get("difficulty") is not None:
+                tags["difficulty"] = params["difficulty"]
+            started = time.monotonic()
+
+            with tagged(**tags), router.pinned(kind, model_name):
+                if cached is not None:
+                    metrics.record("generate", latency=time.monotonic() - started, cache=outcome,
+                                   stream=stream or None, **tags)
+                    return iter([cached]) if stream else cached
+
+                if semantic and "topic" in params:
+                    topic = params["topic"]
+                    partition = make_key(kind, template, model_name,
+                                         **{name: value for name, value in params.items() if name != "topic"})
+                    on_store = lambda: semantic_cache.add(kind, partition, topic, key)
+                else:
+                    on_store = None
+
+                def store_result(text):
+                    if text and not isinstance(text, ErrorResult):
+                        store.set(key, text)
+                        if on_store:
+                            on_store()
+
+                # Set when this caller's own upstream call ran, rather than joining another's
+                ran = []
+
+                # Concurrent identical misses share one upstream call
+                if stream:
+                    def produce():
+                        ran.append(True)
+                        return func(*args, **kwargs)
+
+                    chunks = single_flight.stream(key, produce, on_complete=store_result)
+                    return _timed_stream(chunks, started, lambda: "miss" if ran else "coalesced", tags)
+
+                def compute():
+                    ran.append(True)
+                    result = func(*args, **kwargs)
+                    if isinstance(result, str):
+                        store_result(result)
+                    return result
+
+                try:
+                    result = single_flight.do(key, compute)
+                except Exception as e:
+                    metrics.record("generate", latency=time.monotonic() - started,
+                                   cache="miss" if ran else "coalesced", error=type(e).__name__, **tags)
+                    raise
+                # Generators report failures as ErrorResult strings instead of raising
+                failed = isinstance(result, ErrorResult)
+                metrics.record("generate", latency=time.monotonic() - started, cache="miss" if ran else "coalesced",
+                               error="ErrorResult" if failed else None, **tags)
+                return result
+
+        def cached(*args, **kwargs):
+            # Exact-key check only; used to skip work that would be a cache hit anyway
+            params, _ = call_params(args, kwargs)
+            store = cache or response_cache
+            return any(store.contains(make_key(kind, template, candidate, **params))
+                       for candidate in candidate_models(params))
+
+        wrapper.cached = cached
+        return wrapper
+
+    return decorator
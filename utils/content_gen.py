@@ -1,20 +1,157 @@
-from langchain_community.chat_models import ChatOpenAI
-from langchain.prompts import PromptTemplate
-import os
+import contextvars
+import json
+import math
+import queue
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
+from utils.cache import cached_response, normalize_topic
+from utils.generation import complete, templates
+from utils.prefetch import prefetcher
+from utils.resilience import DeadlineExceeded, ErrorResult
+from utils.scheduler import BACKGROUND, INTERACTIVE, SchedulerBusy
+from utils.semantic_cache import embed, similarity
+from utils.structured import iter_structured_items, normalize_flashcard, normalize_question
+from utils.tokens import estimate_tokens, split_by_tokens
 
 # Load environment variables
 load_dotenv()
 
-# Initialize the LLMcan you make me like home and learing page 
-llm = ChatOpenAI(
-    model="mistralai/mixtral-8x7b-instruct",
-    temperature=0.7,
-    openai_api_key=os.getenv("OPENAI_API_KEY"),
-    openai_api_base=os.getenv("OPENAI_API_BASE")
-)
+# ---------- Prompt Templates ----------
+LESSON_TEMPLATE = """Create a {detail_level} lesson about {topic} for a {difficulty} level student who prefers {learning_style} learning style. 
+Include:
+1. Learning Objectives
+2. Main content with examples
+3. Key takeaways
+4. Practice activities
+Use markdown for formatting with headings, bullet points, and bold text for emphasis."""
 
-def generate_lesson(topic, detail_level="Basic", difficulty="Intermediate", learning_style=["Visual"]):
+QUIZ_TEMPLATE = """Create a 5-question multiple choice quiz about {topic} for {difficulty} students.
+Format each question clearly with:
+- Question stem
+- Options labeled A-D
+- Correct answer marked with (Correct)
+- Brief explanation for each answer
+Use markdown formatting with ### for question headings and > for explanations."""
+
+FLASHCARDS_TEMPLATE = """Create {count} high-quality flashcards for {topic}.
+Format each card as:
+**Front:** [Question/Term]  
+**Back:** [Answer/Definition] (1-2 sentences max)
+
+Separate each flashcard with ---
+Ensure concepts are clear and suitable for students."""
+
+EXERCISES_TEMPLATE = """Create 3 practice exercises about {topic} suitable for {difficulty} level students.
+        For each exercise include:
+        - Problem statement
+        - Step-by-step solution
+        - Explanation of key concepts
+        
+        Make the exercises progressively more challenging. Use markdown formatting for clear presentation."""
+
+SUMMARY_TEMPLATE = """Create a {length} summary of the following content:
+        {content}
+        
+        The summary should capture the key points and main ideas while being concise."""
+
+FLASHCARDS_JSON_TEMPLATE = """Create {count} flashcards about {topic}.
+        Respond with only a JSON array, no other text. Each element must be an object with exactly these keys:
+        {{"front": "Term or question", "back": "Definition or answer in 1-2 sentences"}}
+        Ensure the flashcards cover key concepts and important details about the topic."""
+
+QUIZ_JSON_TEMPLATE = """Create a 5-question multiple choice quiz about {topic} suitable for {difficulty} level students.
+        Respond with only a JSON array, no other text. Each element must be an object with exactly these keys:
+        {{"question": "Question stem", "options": ["option A", "option B", "option C", "option D"], "answer": "Letter of the correct option", "explanation": "Why the answer is correct"}}
+        Include a mix of factual and conceptual questions."""
+
+CHUNK_SUMMARY_TEMPLATE = """Summarize the following section of a longer document.
+        Keep every key point, definition and important detail, and leave out filler:
+        {content}"""
+
+SUBTOPICS_TEMPLATE = """List {count} distinct subtopics of {topic} that together cover it for a student.
+        Respond with only a JSON array of short strings, no other text. Subtopics must not overlap."""
+
+DECK_SHARD_TEMPLATE = """Create {count} flashcards about {subtopic}, as one section of a larger deck on {topic}.
+        Only cover {subtopic}; other sections of the deck cover the rest of {topic}.
+        Respond with only a JSON array, no other text. Each element must be an object with exactly these keys:
+        {{"front": "Term or question", "back": "Definition or answer in 1-2 sentences"}}"""
+
+QUESTION_TEMPLATE = """{question}"""
+
+DOCUMENT_QA_TEMPLATE = """Based on the following excerpts from the uploaded document:
+
+{context}
+
+Answer this question:
+{question}"""
+
+CHAT_TEMPLATE = """You are EduTutor AI, tutoring a student in an ongoing conversation.
+
+Summary of the earlier conversation:
+{summary}
+
+Most recent messages:
+{history}
+
+Answer the student's new question, using the conversation for context:
+{question}"""
+
+DOCUMENT_CHAT_TEMPLATE = """You are EduTutor AI, tutoring a student in an ongoing conversation about an uploaded document.
+
+Summary of the earlier conversation:
+{summary}
+
+Most recent messages:
+{history}
+
+Excerpts from the document relevant to the new question:
+
+{context}
+
+Answer the student's new question, using the conversation and the excerpts for context:
+{question}"""
+
+CHAT_SUMMARY_TEMPLATE = """Update the running summary of a tutoring conversation with the messages below.
+
+Current summary:
+{summary}
+
+New messages:
+{history}
+
+Write the updated summary in at most {words} words. Keep what the student asked about, the key facts and explanations they were given, and any open questions. Respond with only the summary."""
+
+# Compiled once at import; cache keys use each template's content-hash version
+LESSON = templates.register("lesson", LESSON_TEMPLATE)
+QUIZ = templates.register("quiz", QUIZ_TEMPLATE)
+FLASHCARDS = templates.register("flashcards", FLASHCARDS_TEMPLATE)
+EXERCISES = templates.register("exercises", EXERCISES_TEMPLATE, "practice exercises")
+SUMMARY = templates.register("summary", SUMMARY_TEMPLATE)
+FLASHCARDS_JSON = templates.register("flashcards_json", FLASHCARDS_JSON_TEMPLATE, "flashcards")
+QUIZ_JSON = templates.register("quiz_json", QUIZ_JSON_TEMPLATE, "quiz")
+CHUNK_SUMMARY = templates.register("summary_chunk", CHUNK_SUMMARY_TEMPLATE, "summary")
+SUBTOPICS = templates.register("subtopics", SUBTOPICS_TEMPLATE)
+DECK_SHARD = templates.register("flashcards_shard", DECK_SHARD_TEMPLATE, "flashcards")
+QUESTION = templates.register("question", QUESTION_TEMPLATE, "answer")
+DOCUMENT_QA = templates.register("document_qa", DOCUMENT_QA_TEMPLATE, "answer")
+CHAT = templates.register("chat", CHAT_TEMPLATE, "answer")
+DOCUMENT_CHAT = templates.register("document_chat", DOCUMENT_CHAT_TEMPLATE, "answer")
+CHAT_SUMMARY = templates.register("chat_summary", CHAT_SUMMARY_TEMPLATE, "conversation summary")
+
+# Map-reduce settings for long content
+SUMMARY_CHUNK_TOKENS = 3000
+SUMMARY_MAX_WORKERS = 4
+
+# Large decks are split into subtopic shards of about this many cards, generated in parallel
+DECK_SHARD_SIZE = 25
+DECK_MAX_WORKERS = 8
+# Cards whose fronts are at least this similar to an earlier card are dropped
+DECK_DUPLICATE_THRESHOLD = 0.85
+
+@cached_response("lesson", LESSON)
+def generate_lesson(topic, detail_level="Basic", difficulty="Intermediate", learning_style=["Visual"], stream=False):
     """
     Generate a personalized lesson on the given topic
     
@@ -23,160 +160,398 @@ def generate_lesson(topic, detail_level="Basic", difficulty="Intermediate", lear
         detail_level (str): Level of detail ("Overview", "Basic", "Detailed", "Comprehensive")
         difficulty (str): Difficulty level ("Beginner", "Intermediate", "Advanced")
         learning_style (list): Preferred learning styles (e.g., ["Visual", "Auditory"])
+        stream (bool): Yield the content in chunks as it is generated
     
     Returns:
-        str: Generated lesson content
-    """
-    prompt_template = PromptTemplate(
-        input_variables=["topic", "detail_level", "difficulty", "learning_style"],
-        template="""Create a {detail_level} lesson about {topic} for a {difficulty} level student who prefers {learning_style} learning style. 
-        Structure the lesson with:
-        1. Clear learning objectives
-        2. Main content with examples
-        3. Key takeaways
-        4. Suggested practice activities
-        
-        Make it engaging and suitable for the specified level. Use markdown formatting for headings, lists, and emphasis."""
-    )
-    
-    prompt = prompt_template.format(
+        str: Generated lesson content (an iterator of str chunks when stream=True)
+    """
+    return complete(
+        LESSON,
+        stream,
         topic=topic,
         detail_level=detail_level,
         difficulty=difficulty,
         learning_style=", ".join(learning_style)
     )
-    
-    try:
-        response = llm.invoke(prompt)
-        return response.content
-    except Exception as e:
-        return f"Error generating lesson: {str(e)}"
 
-def generate_quiz(topic, difficulty="Intermediate"):
+@cached_response("quiz", QUIZ)
+def generate_quiz(topic, difficulty="Intermediate", stream=False):
     """
     Generate a quiz with questions about the given topic
     
     Args:
         topic (str): The topic to generate a quiz about
         difficulty (str): Difficulty level ("Beginner", "Intermediate", "Advanced")
+        stream (bool): Yield the content in chunks as it is generated
     
     Returns:
-        str: Generated quiz content
-    """
-    prompt_template = PromptTemplate(
-        input_variables=["topic", "difficulty"],
-        template="""Create a 5-question multiple choice quiz about {topic} suitable for {difficulty} level students. 
-        Format each question with:
-        - Question stem
-        - 4 options (A-D)
-        - Correct answer marked with (Correct)
-        
-        Include a mix of factual and conceptual questions. Add explanations for the answers at the end.
-        Use markdown formatting for clear presentation."""
-    )
-    
-    prompt = prompt_template.format(
-        topic=topic,
-        difficulty=difficulty
-    )
-    
-    try:
-        response = llm.invoke(prompt)
-        return response.content
-    except Exception as e:
-        return f"Error generating quiz: {str(e)}"
+        str: Generated quiz content (an iterator of str chunks when stream=True)
+    """
+    return complete(QUIZ, stream, topic=topic, difficulty=difficulty)
 
-def generate_flashcards(topic, count=5):
+@cached_response("flashcards", FLASHCARDS)
+def generate_flashcards(topic, count=5, stream=False):
     """
     Generate flashcards for the given topic
     
     Args:
         topic (str): The topic to generate flashcards about
         count (int): Number of flashcards to generate
+        stream (bool): Yield the content in chunks as it is generated
     
     Returns:
-        str: Generated flashcards content
+        str: Generated flashcards content (an iterator of str chunks when stream=True)
     """
-    prompt_template = PromptTemplate(
-        input_variables=["topic", "count"],
-        template="""Create {count} flashcards about {topic}. For each flashcard:
-        Front: [Term/Question]
-        Back: [Definition/Answer]
-        
-        Make the back side concise (1-2 sentences). Format the response with clear separation between cards.
-        Ensure the flashcards cover key concepts and important details about the topic."""
-    )
+    return complete(FLASHCARDS, stream, topic=topic, count=count)
+
+@cached_response("flashcards_json", FLASHCARDS_JSON)
+def _generate_flashcards_json(topic, count=5, stream=False):
+    return complete(FLASHCARDS_JSON, stream, topic=topic, count=count)
+
+def stream_flashcard_items(topic, count=5):
+    """
+    Generate flashcards in structured JSON mode, yielding each card as soon as it is complete
     
-    prompt = prompt_template.format(
-        topic=topic,
-        count=count
-    )
+    Args:
+        topic (str): The topic to generate flashcards about
+        count (int): Number of flashcards to generate
     
+    Yields:
+        dict: Flashcard with "front" and "back" keys
+    """
+    return iter_structured_items(_generate_flashcards_json(topic, count, stream=True), normalize_flashcard)
+
+@cached_response("subtopics", SUBTOPICS)
+def _generate_subtopics(topic, count):
+    return complete(SUBTOPICS, topic=topic, count=count)
+
+def _parse_subtopics(text):
+    if isinstance(text, ErrorResult):
+        return []
     try:
-        response = llm.invoke(prompt)
-        return response.content
-    except Exception as e:
-        return f"Error generating flashcards: {str(e)}"
+        value = json.loads(text[text.index("["):text.rindex("]") + 1])
+        subtopics = [str(item).strip() for item in value if str(item).strip()]
+    except ValueError:
+        # Not a JSON array: fall back to quoted strings, then to list lines
+        subtopics = re.findall(r'"([^"\n]+)"', text) or [
+            re.sub(r"^\s*(?:[-*•]|\d+[.)])\s*", "", line).strip() for line in text.splitlines()
+        ]
+    seen = set()
+    return [subtopic for subtopic in subtopics
+            if subtopic and subtopic.lower() not in seen and not seen.add(subtopic.lower())]
+
+@cached_response("flashcards_shard", DECK_SHARD)
+def _generate_flashcard_shard(topic, subtopic, count, stream=False):
+    return complete(DECK_SHARD, stream, topic=topic, subtopic=subtopic, count=count)
+
+class _DeckDeduplicator:
+    """Keeps the first of any cards whose fronts are the same or nearly the same."""
+    
+    def __init__(self, threshold=DECK_DUPLICATE_THRESHOLD):
+        self.threshold = threshold
+        self._exact = set()
+        self._vectors = []
+    
+    def add(self, card):
+        fingerprint = " ".join(card["front"].lower().split())
+        if fingerprint in self._exact:
+            return False
+        vector = embed(card["front"])
+        if any(similarity(vector, other) >= self.threshold for other in self._vectors):
+            return False
+        self._exact.add(fingerprint)
+        self._vectors.append(vector)
+        return True
 
-def generate_practice_exercises(topic, difficulty="Intermediate"):
+def stream_flashcard_deck(topic, count=5, shard_size=DECK_SHARD_SIZE, max_workers=DECK_MAX_WORKERS):
+    """
+    Generate a flashcard deck of any size, yielding each card as soon as it is ready
+    
+    Decks up to shard_size cards are a single structured request. Larger decks are split
+    into subtopic shards that are generated in parallel, so the wait grows with the number
+    of rounds of max_workers shards rather than with the card count. Near-duplicate cards
+    across shards are dropped with a local similarity check.
+    
+    Args:
+        topic (str): The topic to generate flashcards about
+        count (int): Number of flashcards in the deck
+        shard_size (int): Cards per shard
+        max_workers (int): Shards generated concurrently
+    
+    Yields:
+        dict: Flashcard with "front" and "back" keys, at most count of them
+    """
+    if count <= shard_size:
+        yield from stream_flashcard_items(topic, count)
+        return
+    
+    shards = math.ceil(count / shard_size)
+    subtopics = _parse_subtopics(_generate_subtopics(topic, shards))
+    if not subtopics:
+        subtopics = [topic]
+    # Ask for a little extra per shard so dropped duplicates do not leave the deck short
+    per_shard = math.ceil(count / shards * 1.1)
+    assignments = [subtopics[i] if i < len(subtopics) else f"{subtopics[i % len(subtopics)]} (part {i // len(subtopics) + 1})"
+                   for i in range(shards)]
+    
+    cards = queue.Queue()
+    stop = threading.Event()
+    
+    def run_shard(subtopic):
+        try:
+            for card in iter_structured_items(_generate_flashcard_shard(topic, subtopic, per_shard, stream=True),
+                                              normalize_flashcard):
+                if stop.is_set():
+                    break
+                cards.put(("card", card))
+            cards.put(("done", None))
+        except Exception as e:
+            cards.put(("error", e))
+    
+    deduplicator = _DeckDeduplicator()
+    produced = 0
+    finished = 0
+    error = None
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        for subtopic in assignments:
+            # Shards keep the caller's priority, metric tags and cache refresh
+            executor.submit(contextvars.copy_context().run, run_shard, subtopic)
+        while finished < shards and produced < count:
+            event, payload = cards.get()
+            if event == "card":
+                if deduplicator.add(payload):
+                    produced += 1
+                    yield payload
+            else:
+                finished += 1
+                if event == "error":
+                    error = payload
+    finally:
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+    if produced == 0 and error is not None:
+        raise error
+
+@cached_response("quiz_json", QUIZ_JSON)
+def _generate_quiz_json(topic, difficulty="Intermediate", stream=False):
+    return complete(QUIZ_JSON, stream, topic=topic, difficulty=difficulty)
+
+def stream_quiz_items(topic, difficulty="Intermediate"):
+    """
+    Generate a quiz in structured JSON mode, yielding each question as soon as it is complete
+    
+    Args:
+        topic (str): The topic to generate a quiz about
+        difficulty (str): Difficulty level ("Beginner", "Intermediate", "Advanced")
+    
+    Yields:
+        dict: Question with "question", "options", "answer" (A-D) and "explanation" keys
+    """
+    return iter_structured_items(_generate_quiz_json(topic, difficulty, stream=True), normalize_question)
+
+@cached_response("exercises", EXERCISES)
+def generate_practice_exercises(topic, difficulty="Intermediate", stream=False):
     """
     Generate practice exercises for the given topic
     
     Args:
         topic (str): The topic to generate exercises about
         difficulty (str): Difficulty level ("Beginner", "Intermediate", "Advanced")
+        stream (bool): Yield the content in chunks as it is generated
     
     Returns:
-        str: Generated exercises with solutions
+        str: Generated exercises with solutions (an iterator of str chunks when stream=True)
     """
-    prompt_template = PromptTemplate(
-        input_variables=["topic", "difficulty"],
-        template="""Create 3 practice exercises about {topic} suitable for {difficulty} level students.
-        For each exercise include:
-        - Problem statement
-        - Step-by-step solution
-        - Explanation of key concepts
-        
-        Make the exercises progressively more challenging. Use markdown formatting for clear presentation."""
-    )
+    return complete(EXERCISES, stream, topic=topic, difficulty=difficulty)
+
+@cached_response("summary_chunk", CHUNK_SUMMARY)
+def _summarize_chunk(content):
+    # Independent of the requested length, so partial summaries are reused across lengths
+    return complete(CHUNK_SUMMARY, content=content)
+
+def _reduce_content(content, chunk_tokens=SUMMARY_CHUNK_TOKENS, max_workers=SUMMARY_MAX_WORKERS):
+    """
+    Condense content with map-reduce rounds until it fits in a single prompt
     
-    prompt = prompt_template.format(
-        topic=topic,
-        difficulty=difficulty
-    )
+    Args:
+        content (str): Content to condense
+        chunk_tokens (int): Token budget per chunk
+        max_workers (int): Maximum concurrent chunk summaries
     
-    try:
-        response = llm.invoke(prompt)
-        return response.content
-    except Exception as e:
-        return f"Error generating practice exercises: {str(e)}"
+    Returns:
+        str: Merged partial summaries, or an error string
+    """
+    while estimate_tokens(content) > chunk_tokens:
+        chunks = split_by_tokens(content, chunk_tokens)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # Each chunk runs in a copy of the caller's context, keeping its priority, tags and refresh flag
+            futures = [executor.submit(contextvars.copy_context().run, _summarize_chunk, chunk) for chunk in chunks]
+            partials = [future.result() for future in futures]
+        for partial in partials:
+            if isinstance(partial, ErrorResult):
+                return partial
+        merged = "\n\n".join(partials)
+        if len(merged) >= len(content):
+            # The model is not condensing; stop instead of looping
+            return merged
+        content = merged
+    return content
 
-def summarize_content(content, length="short"):
+@cached_response("summary", SUMMARY)
+def summarize_content(content, length="short", stream=False):
     """
     Summarize the given content to the specified length
     
+    Content longer than SUMMARY_CHUNK_TOKENS is split into chunks that are summarized
+    concurrently and merged in one or more reduce rounds before the final summary.
+    
     Args:
         content (str): Content to summarize
         length (str): Desired length ("short", "medium", "long")
+        stream (bool): Yield the content in chunks as it is generated
     
     Returns:
-        str: Generated summary
+        str: Generated summary (an iterator of str chunks when stream=True)
     """
-    prompt_template = PromptTemplate(
-        input_variables=["content", "length"],
-        template="""Create a {length} summary of the following content:
-        {content}
-        
-        The summary should capture the key points and main ideas while being concise."""
-    )
+    if estimate_tokens(content) > SUMMARY_CHUNK_TOKENS:
+        content = _reduce_content(content)
+        if isinstance(content, ErrorResult):
+            if stream:
+                raise RuntimeError(content)
+            return content
     
-    prompt = prompt_template.format(
-        content=content,
-        length=length
-    )
+    return complete(SUMMARY, stream, content=content, length=length)
+
+def stream_answer(question, excerpts=None, priority=INTERACTIVE):
+    """
+    Stream an answer to a free-form question, grounded in document excerpts when given
     
-    try:
-        response = llm.invoke(prompt)
-        return response.content
-    except Exception as e:
-        return f"Error generating summary: {str(e)}"
\ No newline at end of file
+    Answers are not cached, since follow-up questions rarely repeat exactly.
+    
+    Args:
+        question (str): The student's question
+        excerpts (list, optional): Relevant chunks of an uploaded document
+        priority (int): Scheduler priority class
+    
+    Returns:
+        iterator: Pieces of the answer as they arrive
+    """
+    if excerpts:
+        context = "\n\n---\n\n".join(excerpts)
+        return complete(DOCUMENT_QA, True, priority, question, context=context, question=question)
+    return complete(QUESTION, True, priority, question, question=question)
+
+def _format_turns(turns):
+    return "\n\n".join(f"Student: {question}\nTutor: {answer}" for question, answer in turns)
+
+def stream_chat_answer(question, summary="", turns=(), excerpts=None, priority=INTERACTIVE):
+    """
+    Stream the answer to a follow-up question in an ongoing conversation
+    
+    The caller keeps the conversation bounded: only a rolling summary of older turns and
+    the most recent turns are sent. Without either, this is the same request as stream_answer.
+    
+    Args:
+        question (str): The student's new question
+        summary (str): Summary of the turns that are not sent verbatim
+        turns (list): Recent (question, answer) pairs, oldest first
+        excerpts (list, optional): Relevant chunks of an uploaded document
+        priority (int): Scheduler priority class
+    
+    Returns:
+        iterator: Pieces of the answer as they arrive
+    """
+    if not summary and not turns:
+        return stream_answer(question, excerpts, priority)
+    params = {"summary": summary or "(nothing yet)", "history": _format_turns(turns) or "(none)",
+              "question": question}
+    if excerpts:
+        context = "\n\n---\n\n".join(excerpts)
+        return complete(DOCUMENT_CHAT, True, priority, question, context=context, **params)
+    return complete(CHAT, True, priority, question, **params)
+
+def summarize_conversation(summary, turns, words=150, priority=BACKGROUND):
+    """
+    Fold conversation turns into a running summary
+    
+    Args:
+        summary (str): Current summary, empty at first
+        turns (list): (question, answer) pairs to fold in, oldest first
+        words (int): Length limit for the new summary
+        priority (int): Scheduler priority class
+    
+    Returns:
+        str: The updated summary, or an "Error generating ..." ErrorResult on failure
+    """
+    return complete(CHAT_SUMMARY, priority=priority, summary=summary or "(empty)",
+                    history=_format_turns(turns), words=words)
+
+def generate_study_pack(topic, difficulty="Intermediate", detail_level="Basic", learning_style=["Visual"], count=5):
+    """
+    Generate a lesson, quiz, flashcards and practice exercises for one topic concurrently
+    
+    All four requests are sent at once, so the total wait is close to the slowest single call.
+    
+    Args:
+        topic (str): The topic to build the study pack for
+        difficulty (str): Difficulty level ("Beginner", "Intermediate", "Advanced")
+        detail_level (str): Level of detail for the lesson
+        learning_style (list): Preferred learning styles for the lesson
+        count (int): Number of flashcards to generate
+    
+    Yields:
+        tuple: (section, content) pairs in the order they finish, where section is one of
+        "lesson", "quiz", "flashcards" or "exercises"
+    """
+    tasks = {
+        "lesson": (generate_lesson, (topic, detail_level, difficulty, learning_style)),
+        "quiz": (generate_quiz, (topic, difficulty)),
+        "flashcards": (generate_flashcards, (topic, count)),
+        "exercises": (generate_practice_exercises, (topic, difficulty)),
+    }
+    
+    with ThreadPoolExecutor(max_workers=len(tasks)) as executor:
+        futures = {executor.submit(contextvars.copy_context().run, func, *args): section
+                   for section, (func, args) in tasks.items()}
+        for future in as_completed(futures):
+            section = futures[future]
+            try:
+                content = future.result()
+            except (SchedulerBusy, DeadlineExceeded) as e:
+                # One busy or slow section should not take the rest of the pack down
+                content = ErrorResult(f"Error generating {section}: {e}")
+            yield section, content
+
+def prefetch_after_lesson(topic, difficulty="Intermediate", count=5):
+    """
+    Speculatively warm the cache for the quiz and flashcards a student usually opens next
+    
+    The calls are queued on the shared prefetcher (a no-op unless EDUTUTOR_PREFETCH=1) at
+    background priority, with the same parameters as the Quiz and Flashcards pages'
+    defaults so those pages are served from the response cache.
+    
+    Args:
+        topic (str): Topic of the lesson that was just generated
+        difficulty (str): Difficulty level of the lesson
+        count (int): Deck size to prefetch
+    
+    Returns:
+        int: Number of calls queued
+    """
+    def quiz():
+        # Streamed like the Quiz page, so a student opening it mid-prefetch joins this call
+        text = "".join(generate_quiz(topic, difficulty, stream=True))
+        return estimate_tokens(QUIZ.format(topic=topic, difficulty=difficulty)) + estimate_tokens(text)
+    
+    def flashcards():
+        # Consuming the stream stores the deck under the Flashcards page's cache key
+        text = "".join(_generate_flashcards_json(topic, count, stream=True))
+        return estimate_tokens(FLASHCARDS_JSON.format(topic=topic, count=count)) + estimate_tokens(text)
+    
+    queued = prefetcher.submit(f"quiz|{normalize_topic(topic)}|{difficulty}", quiz,
+                               lambda: generate_quiz.cached(topic, difficulty))
+    if count <= DECK_SHARD_SIZE:
+        queued += prefetcher.submit(f"flashcards|{normalize_topic(topic)}|{count}", flashcards,
+                                    lambda: _generate_flashcards_json.cached(topic, count))
+    return queued
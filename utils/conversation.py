@@ -0,0 +1,164 @@
+import os
+import threading
+
+from utils.content_gen import stream_chat_answer, summarize_conversation
+from utils.resilience import ErrorResult
+from utils.scheduler import BACKGROUND, priority
+from utils.tokens import CHARS_PER_TOKEN, estimate_tokens
+
+# Conversation memory settings (override through .env)
+RECENT_TURNS = int(os.getenv("EDUTUTOR_CHAT_RECENT_TURNS", 4))
+# Token budget for the verbatim turns; each answer is also clipped to TURN_ANSWER_TOKENS
+HISTORY_TOKENS = int(os.getenv("EDUTUTOR_CHAT_HISTORY_TOKENS", 1500))
+TURN_ANSWER_TOKENS = int(os.getenv("EDUTUTOR_CHAT_ANSWER_TOKENS", 350))
+SUMMARY_WORDS = int(os.getenv("EDUTUTOR_CHAT_SUMMARY_WORDS", 150))
+
+
+def _clip(text, max_tokens):
+    limit = max_tokens * CHARS_PER_TOKEN
+    return text if len(text) <= limit else text[:limit].rstrip() + " …"
+
+
+class Conversation:
+    """
+    Multi-turn Ask AI session with bounded memory.
+
+    Each prompt carries a rolling summary of older turns plus at most RECENT_TURNS
+    recent turns verbatim (within HISTORY_TOKENS), so its size stays roughly constant
+    however long the session runs. Turns that leave the verbatim window are folded into
+    the summary on a background thread at BACKGROUND priority; until a fold lands, those
+    turns are left out of the prompt rather than growing it.
+    """
+
+    def __init__(self, recent_turns=RECENT_TURNS, history_tokens=HISTORY_TOKENS):
+        self.recent_turns = recent_turns
+        self.history_tokens = history_tokens
+        self.turns = []
+        self.summary = ""
+        # Number of leading turns covered by the summary
+        self._folded = 0
+        self._folding = None
+        self._lock = threading.Lock()
+
+    def context(self):
+        """
+        Memory to send with the next question
+
+        Returns:
+            tuple: (summary, recent (question, answer) pairs, oldest first)
+        """
+        with self._lock:
+            summary = self.summary
+            window = self.turns[max(self._folded, len(self.turns) - self.recent_turns):]
+        recent = []
+        used = 0
+        for turn in reversed(window):
+            pair = (turn["question"], _clip(turn["answer"], TURN_ANSWER_TOKENS))
+            tokens = estimate_tokens(pair[0]) + estimate_tokens(pair[1])
+            if recent and used + tokens > self.history_tokens:
+                break
+            recent.append(pair)
+            used += tokens
+        return summary, recent[::-1]
+
+    def search_text(self, question):
+        """
+        Text to retrieve document excerpts with; a short follow-up such as "why?" is
+        searched together with the previous question
+
+        Args:
+            question (str): The student's new question
+
+        Returns:
+            str: Retrieval query
+        """
+        with self._lock:
+            previous = self.turns[-1]["question"] if self.turns else ""
+        return f"{question} {previous}".strip()
+
+    def ask(self, question, excerpts=None):
+        """
+        Stream the answer to the next question; the turn is recorded once it completes
+
+        Args:
+            question (str): The student's question
+            excerpts (list, optional): Relevant chunks of an uploaded document
+
+        Yields:
+            str: Pieces of the answer as they arrive
+        """
+        summary, recent = self.context()
+        pieces = []
+        for piece in stream_chat_answer(question, summary, recent, excerpts):
+            pieces.append(piece)
+            yield piece
+        self.add(question, "".join(pieces), excerpts)
+
+    def add(self, question, answer, excerpts=None):
+        """
+        Record a finished turn and fold older turns into the summary if needed
+
+        Args:
+            question (str): The student's question
+            answer (str): The complete answer
+            excerpts (list, optional): Document excerpts the answer was based on
+        """
+        with self._lock:
+            self.turns.append({"question": question, "answer": answer, "excerpts": excerpts})
+        self._schedule_fold()
+
+    def _schedule_fold(self):
+        with self._lock:
+            end = len(self.turns) - self.recent_turns
+            if self._folding is not None or end <= self._folded:
+                return
+            pending = [(turn["question"], turn["answer"]) for turn in self.turns[self._folded:end]]
+            summary = self.summary
+            self._folding = threading.Thread(target=self._fold, args=(summary, pending, end), daemon=True)
+            self._folding.start()
+
+    def _fold(self, summary, pending, end):
+        try:
+            with priority(BACKGROUND):
+                updated = summarize_conversation(summary, pending, SUMMARY_WORDS)
+        except Exception:
+            updated = None
+        with self._lock:
+            # A failed fold is retried after the next turn
+            if updated and not isinstance(updated, ErrorResult):
+                self.summary = updated.strip()
+                self._folded = end
+            self._folding = None
+        if updated and not isinstance(updated, ErrorResult):
+            # Turns may have arrived while this fold was running
+            self._schedule_fold()
+
+    def wait(self, timeout=None):
+        """
+        Wait for a running fold to finish
+
+        Args:
+            timeout (float, optional): Seconds to wait at most
+        """
+        folding = self._folding
+        if folding is not None:
+            folding.join(timeout)
+
+    def stats(self):
+        """
+        Size of the conversation and of its memory
+
+        Returns:
+            dict: turns, folded_turns, summary_tokens and prompt_history_tokens
+        """
+        summary, recent = self.context()
+        with self._lock:
+            turns, folded = len(self.turns), self._folded
+        return {
+            "turns": turns,
+            "folded_turns": folded,
+            "summary_tokens": estimate_tokens(summary),
+            "prompt_history_tokens": estimate_tokens(summary) + sum(
+                estimate_tokens(question) + estimate_tokens(answer) for question, answer in recent
+            ),
+        }
@@ -0,0 +1,189 @@
+import hashlib
+import io
+import multiprocessing
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.cache import CACHE_DIR
+
+EXTRACT_DIR = os.path.join(CACHE_DIR, "extracted")
+# Extracted texts kept on disk; the least recently used are deleted first (override through .env)
+EXTRACT_MAX_FILES = int(os.getenv("EDUTUTOR_EXTRACT_CACHE_FILES", 500))
+EXTRACT_MAX_BYTES = int(os.getenv("EDUTUTOR_EXTRACT_CACHE_MB", 500)) * 1024 * 1024
+MEMORY_MAX_DOCUMENTS = 16
+# PDFs with at least this many pages are extracted page-parallel
+PARALLEL_MIN_PAGES = int(os.getenv("EDUTUTOR_PARALLEL_MIN_PAGES", 150))
+PARALLEL_WORKERS = int(os.getenv("EDUTUTOR_EXTRACT_WORKERS", min(4, os.cpu_count() or 1)))
+
+PDF_TYPE = "application/pdf"
+WORD_TYPES = ["application/vnd.openxmlformats-officedocument.wordprocessingml.document", "application/msword"]
+TEXT_TYPE = "text/plain"
+
+_memory = OrderedDict()
+_lock = threading.Lock()
+
+
+def content_hash(data):
+    """
+    SHA-256 of an uploaded file's bytes, used as the extraction cache key
+
+    Args:
+        data (bytes): File contents
+
+    Returns:
+        str: Hex digest
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+def iter_pdf_pages(source, start=0, stop=None):
+    """
+    Yield the text of each PDF page without building the whole document text
+
+    Args:
+        source (bytes | str): PDF bytes or a path to a PDF file
+        start (int): First page index
+        stop (int, optional): Page index to stop before (defaults to the last page)
+
+    Yields:
+        str: Text of one page
+    """
+    import fitz  # PyMuPDF
+
+    pdf = fitz.open(source) if isinstance(source, str) else fitz.open(stream=source, filetype="pdf")
+    try:
+        for number in range(start, pdf.page_count if stop is None else min(stop, pdf.page_count)):
+            yield pdf.load_page(number).get_text()
+    finally:
+        pdf.close()
+
+
+def _extract_page_range(path, start, stop):
+    # Runs in a worker process; opens the PDF from disk so the bytes are not pickled
+    return "".join(iter_pdf_pages(path, start, stop))
+
+
+def _extract_pdf(data):
+    import fitz  # PyMuPDF
+
+    with fitz.open(stream=data, filetype="pdf") as pdf:
+        page_count = pdf.page_count
+    if page_count < PARALLEL_MIN_PAGES or PARALLEL_WORKERS < 2:
+        return "".join(iter_pdf_pages(data))
+
+    step = -(-page_count // PARALLEL_WORKERS)
+    ranges = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+        tmp.write(data)
+    try:
+        # spawn avoids forking the Streamlit server's threads
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=len(ranges), mp_context=context) as executor:
+            parts = executor.map(_extract_page_range, [tmp.name] * len(ranges),
+                                 [start for start, _ in ranges], [stop for _, stop in ranges])
+            return "".join(parts)
+    finally:
+        os.unlink(tmp.name)
+
+
+def _extract(data, file_type):
+    if file_type == PDF_TYPE:
+        return _extract_pdf(data)
+    elif file_type in WORD_TYPES:
+        from docx import Document
+        doc = Document(io.BytesIO(data))
+        return "\n".join(para.text for para in doc.paragraphs)
+    elif file_type == TEXT_TYPE:
+        return data.decode("utf-8")
+    else:
+        return None
+
+
+def _remember(digest, text):
+    with _lock:
+        _memory[digest] = text
+        _memory.move_to_end(digest)
+        while len(_memory) > MEMORY_MAX_DOCUMENTS:
+            _memory.popitem(last=False)
+
+
+def extract_text(data, file_type, cache=True):
+    """
+    Extract text from a document, reusing earlier results for identical content
+
+    Results are cached in memory for this process and on disk across processes,
+    keyed by the SHA-256 of the file contents. The disk cache is bounded by
+    EXTRACT_MAX_FILES and EXTRACT_MAX_BYTES, evicting the least recently used texts.
+
+    Args:
+        data (bytes): File contents
+        file_type (str): MIME type reported by the uploader
+        cache (bool): Whether to use and fill the caches; callers that store the text
+            themselves (like utils.library) pass False
+
+    Returns:
+        str | None: Extracted text, or None for unsupported file types
+    """
+    if not cache:
+        return _extract(data, file_type)
+    digest = content_hash(data)
+    with _lock:
+        text = _memory.get(digest)
+        if text is not None:
+            _memory.move_to_end(digest)
+            return text
+
+    path = os.path.join(EXTRACT_DIR, digest + ".txt")
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        try:
+            # The modification time doubles as the last-used time for eviction
+            os.utime(path)
+        except OSError:
+            pass
+        _remember(digest, text)
+        return text
+
+    text = _extract(data, file_type)
+    if text is None:
+        return None
+    _remember(digest, text)
+    try:
+        os.makedirs(EXTRACT_DIR, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+        _evict_extracted()
+    except OSError:
+        pass
+    return text
+
+
+def _evict_extracted(max_files=EXTRACT_MAX_FILES, max_bytes=EXTRACT_MAX_BYTES):
+    # Delete the least recently used extracted texts until both limits hold
+    entries = []
+    with os.scandir(EXTRACT_DIR) as scan:
+        for entry in scan:
+            if entry.name.endswith(".txt"):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+    entries.sort()
+    count = len(entries)
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in entries:
+        if count <= max_files and total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        count -= 1
+        total -= size
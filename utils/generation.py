@@ -0,0 +1,148 @@
+import threading
+
+from dotenv import load_dotenv
+from langchain.prompts import PromptTemplate
+
+from utils.cache import template_hash
+from utils.llm import invoke_text, stream_text
+from utils.metrics import tagged
+from utils.resilience import DeadlineExceeded, ErrorResult, resilient_invoke, resilient_stream
+from utils.router import router
+from utils.scheduler import SchedulerBusy
+
+# The client reads its credentials from the environment
+load_dotenv()
+
+
+class PromptSpec:
+    """
+    A prompt template compiled once, identified by its content-hash version.
+
+    The version changes whenever the template text changes, so response cache keys
+    built from it stop matching entries generated with an older prompt.
+    """
+
+    def __init__(self, kind, text, label=None):
+        self.kind = kind
+        self.text = text
+        self.label = label or kind.replace("_", " ")
+        self.version = template_hash(text)
+        self.template = PromptTemplate.from_template(text)
+
+    def format(self, **params):
+        """
+        Fill the template
+
+        Args:
+            **params: Values for the template's input variables
+
+        Returns:
+            str: Formatted prompt
+        """
+        return self.template.format(**params)
+
+
+class TemplateRegistry:
+    """Process-wide registry of compiled prompt templates, keyed by content type."""
+
+    def __init__(self):
+        self._specs = {}
+        self._lock = threading.Lock()
+
+    def register(self, kind, text, label=None):
+        """
+        Compile a template and register it under a content type
+
+        Registering the same text again returns the existing spec.
+
+        Args:
+            kind (str): Content type (e.g., "lesson", "quiz")
+            text (str): Template text with {placeholders}
+            label (str, optional): Name used in error messages, defaults to the kind
+
+        Returns:
+            PromptSpec: Compiled template
+
+        Raises:
+            ValueError: If a different template is already registered for the kind
+        """
+        with self._lock:
+            spec = self._specs.get(kind)
+            if spec is not None:
+                if spec.text != text:
+                    raise ValueError(f"A different template is already registered for {kind!r}")
+                return spec
+            spec = self._specs[kind] = PromptSpec(kind, text, label)
+            return spec
+
+    def get(self, kind):
+        """
+        Look up a registered template
+
+        Args:
+            kind (str): Content type
+
+        Returns:
+            PromptSpec: Compiled template
+
+        Raises:
+            KeyError: If no template is registered for the kind
+        """
+        return self._specs[kind]
+
+    def versions(self):
+        """
+        Current version of every registered template
+
+        Returns:
+            dict: Content type to template version
+        """
+        return {kind: spec.version for kind, spec in sorted(self._specs.items())}
+
+
+# Shared by every Streamlit session in this process
+templates = TemplateRegistry()
+
+
+def complete(spec, stream=False, priority=None, query=None, **params):
+    """
+    Format a registered template and send it to the shared client
+
+    This is the one path from a prompt template to the model: utils.router picks the
+    model for the content type and detail level (or uses the one an enclosing
+    cached_response pinned), and the call goes through the scheduler, prompt compaction
+    and metrics in utils.llm, tagged with the content type, under the content type's
+    deadline with hedging, retries and the fallback model from utils.resilience. Wrap the calling function in cached_response to add caching and
+    request coalescing.
+
+    Args:
+        spec (PromptSpec): Compiled template
+        stream (bool): Return an iterator of str chunks instead of the full text
+        priority (int, optional): Scheduler priority class
+        query (str, optional): Text used to rank content if the prompt must be compacted
+        **params: Values for the template's input variables
+
+    Returns:
+        str: Completion text, or an "Error generating ..." ErrorResult on failure
+        (an iterator of str chunks when stream=True, which raises on failure instead)
+
+    Raises:
+        SchedulerBusy: If the scheduler cannot admit the call, so callers can ask to retry later
+        DeadlineExceeded: If no model answered within the content type's deadline
+    """
+    prompt = spec.format(**params)
+    llm = router.client(spec.kind, params.get("detail_level"))
+    fallback_llm = router.fallback_client(spec.kind)
+    with tagged(kind=spec.kind):
+        if stream:
+            call = lambda client, timeout: stream_text(client, prompt, priority=priority, query=query,
+                                                       timeout=timeout)
+            return resilient_stream(call, llm, spec.kind, fallback_llm)
+        try:
+            call = lambda client, timeout: invoke_text(client, prompt, priority=priority, query=query,
+                                                       timeout=timeout)
+            return resilient_invoke(call, llm, spec.kind, fallback_llm)
+        except (SchedulerBusy, DeadlineExceeded):
+            raise
+        except Exception as e:
+            return ErrorResult(f"Error generating {spec.label}: {str(e)}")
@@ -0,0 +1,463 @@
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from utils.cache import CACHE_DIR
+from utils.documents import content_hash, extract_text
+from utils.retrieval import CHUNK_OVERLAP, CHUNK_SIZE, TOP_K, chunk_text, tokenize
+from utils.semantic_cache import word_feature
+from utils.singleflight import single_flight
+
+# Library settings (override through .env)
+LIBRARY_DIR = os.getenv("EDUTUTOR_LIBRARY_DIR", os.path.join(CACHE_DIR, "library"))
+# Dense vector width; the hashed word features of utils.semantic_cache are folded into this many dimensions
+VECTOR_DIM = 256
+# Weight of vector similarity next to the max-normalized BM25 score
+VECTOR_WEIGHT = 0.3
+MEMORY_MAX_INDEXES = 16
+# Disk space for chunk texts and index arrays; the least recently used documents are removed first
+LIBRARY_MAX_BYTES = int(os.getenv("EDUTUTOR_LIBRARY_MB", 1000)) * 1024 * 1024
+# Distinct query terms looked up per search, well under SQLite's bound-parameter limit
+MAX_QUERY_TERMS = 256
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+
+def _term_features(terms):
+    features = [word_feature(term) for term in terms]
+    dims = np.fromiter((index % VECTOR_DIM for index, _ in features), dtype=np.int64, count=len(features))
+    signs = np.fromiter((sign for _, sign in features), dtype=np.float32, count=len(features))
+    return dims, signs
+
+
+def _hashed_vectors(rows, dims, weights, count):
+    # Sum signed, sublinear term weights per row, then scale each row to unit length
+    vectors = np.zeros((count, VECTOR_DIM), dtype=np.float32)
+    np.add.at(vectors, (rows, dims), weights)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=vectors, where=norms > 0)
+
+
+def dense_vector(text):
+    """
+    Fixed-width unit vector for a piece of text, from hashed word counts
+
+    Args:
+        text (str): Text to embed
+
+    Returns:
+        numpy.ndarray: float32 vector of VECTOR_DIM values
+    """
+    counts = {}
+    for term in tokenize(text):
+        counts[term] = counts.get(term, 0) + 1
+    if not counts:
+        return np.zeros(VECTOR_DIM, dtype=np.float32)
+    dims, signs = _term_features(counts)
+    weights = signs * (1 + np.log(np.fromiter(counts.values(), dtype=np.float32, count=len(counts))))
+    return _hashed_vectors(np.zeros(len(counts), dtype=np.int64), dims, weights, 1)[0]
+
+
+class _Chunks:
+    """Read-only sequence of a library document's chunks, loaded from SQLite on access."""
+
+    def __init__(self, library, document_id, count):
+        self._library = library
+        self._document_id = document_id
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, chunk_id):
+        if not 0 <= chunk_id < self._count:
+            raise IndexError(chunk_id)
+        return self._library._chunk(self._document_id, chunk_id)
+
+
+class LibraryIndex:
+    """
+    On-disk hybrid BM25 + vector index of one library document.
+
+    Postings, chunk length norms and chunk vectors are memory-mapped NumPy arrays and
+    the term dictionary and chunk texts live in SQLite, so opening an index reads
+    almost nothing and a query only touches the postings of its own terms. Works with
+    utils.retrieval.retrieve_context like an in-memory BM25Index.
+    """
+
+    def __init__(self, library, document_id, count):
+        self.document_id = document_id
+        self.chunks = _Chunks(library, document_id, count)
+        self._library = library
+        directory = library._document_dir(document_id)
+        self._postings = np.load(os.path.join(directory, "postings.npy"), mmap_mode="r")
+        self._frequencies = np.load(os.path.join(directory, "frequencies.npy"), mmap_mode="r")
+        self._norms = np.load(os.path.join(directory, "norms.npy"), mmap_mode="r")
+        self._vectors = np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r")
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def search(self, query, k=TOP_K):
+        """
+        Rank chunks against a query
+
+        Args:
+            query (str): Search query
+            k (int): Number of results to return
+
+        Returns:
+            list: Up to k (score, chunk_id) tuples, best first
+        """
+        if not len(self):
+            return []
+        lexical = np.zeros(len(self), dtype=np.float32)
+        for start, stop, idf in self._library._postings_ranges(self.document_id, tokenize(query)):
+            chunk_ids = self._postings[start:stop]
+            tf = self._frequencies[start:stop].astype(np.float32)
+            lexical[chunk_ids] += idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * self._norms[chunk_ids])
+        best = lexical.max()
+        scores = lexical / best if best > 0 else lexical
+        scores += VECTOR_WEIGHT * (self._vectors @ dense_vector(query))
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[chunk_id]), int(chunk_id)) for chunk_id in top if scores[chunk_id] > 0]
+
+
+class DocumentLibrary:
+    """
+    Persistent library of uploaded documents, deduplicated by content hash.
+
+    A document is extracted, chunked and indexed once; re-uploading the same file or
+    asking about any library document later reuses the stored index without parsing
+    the file again. Metadata, terms and chunk texts are stored in SQLite, the postings
+    and vectors as NumPy arrays next to it.
+
+    Indexes are shared, but listings are not: each document records the owners (e.g. a
+    Streamlit session) that added it, and documents() only lists an owner's own uploads.
+    The library is bounded by ``max_bytes`` of stored chunks and arrays; adding a
+    document removes the documents least recently added or opened by any owner.
+    """
+
+    def __init__(self, path=None, max_bytes=LIBRARY_MAX_BYTES):
+        self.path = path or LIBRARY_DIR
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+        self._conn = None
+        self._indexes = OrderedDict()
+
+    def _connection(self):
+        if self._conn is None:
+            os.makedirs(self.path, exist_ok=True)
+            self._conn = sqlite3.connect(os.path.join(self.path, "library.sqlite3"), check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(
+                """CREATE TABLE IF NOT EXISTS documents (
+                    id TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    file_type TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    characters INTEGER NOT NULL,
+                    chunks INTEGER NOT NULL,
+                    stored_bytes INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS chunks (
+                    document_id TEXT NOT NULL,
+                    chunk_id INTEGER NOT NULL,
+                    text TEXT NOT NULL,
+                    PRIMARY KEY (document_id, chunk_id)
+                ) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS terms (
+                    document_id TEXT NOT NULL,
+                    term TEXT NOT NULL,
+                    start INTEGER NOT NULL,
+                    stop INTEGER NOT NULL,
+                    idf REAL NOT NULL,
+                    PRIMARY KEY (document_id, term)
+                ) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS owners (
+                    owner TEXT NOT NULL,
+                    document_id TEXT NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (owner, document_id)
+                ) WITHOUT ROWID;"""
+            )
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(documents)")}
+            if "stored_bytes" not in columns:
+                # Libraries created before the disk budget; their documents count as 0 bytes
+                self._conn.execute("ALTER TABLE documents ADD COLUMN stored_bytes INTEGER NOT NULL DEFAULT 0")
+            self._conn.commit()
+        return self._conn
+
+    def _document_dir(self, document_id):
+        return os.path.join(self.path, document_id)
+
+    def _chunk(self, document_id, chunk_id):
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT text FROM chunks WHERE document_id = ? AND chunk_id = ?", (document_id, chunk_id)
+            ).fetchone()
+        return row[0]
+
+    def _postings_ranges(self, document_id, terms):
+        # One bound parameter per term: repeats are dropped and very long queries cut short
+        terms = list(dict.fromkeys(terms))[:MAX_QUERY_TERMS]
+        if not terms:
+            return []
+        with self._lock:
+            return self._connection().execute(
+                f"SELECT start, stop, idf FROM terms WHERE document_id = ? AND term IN ({', '.join('?' * len(terms))})",
+                [document_id, *terms],
+            ).fetchall()
+
+    def get(self, document_id):
+        """
+        Metadata of a library document
+
+        Args:
+            document_id (str): Content hash returned by add
+
+        Returns:
+            dict | None: id, name, file_type, size, characters, chunks, created_at and
+            last_used, or None if the document is not in the library
+        """
+        with self._lock:
+            conn = self._connection()
+            cursor = conn.execute("SELECT * FROM documents WHERE id = ?", (document_id,))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            return dict(zip((column[0] for column in cursor.description), row))
+
+    def documents(self, owner):
+        """
+        Library documents added by one owner, most recently added first
+
+        Args:
+            owner (str): Owner passed to add
+
+        Returns:
+            list: Metadata dicts as returned by get
+        """
+        with self._lock:
+            cursor = self._connection().execute(
+                "SELECT documents.* FROM documents JOIN owners ON owners.document_id = documents.id "
+                "WHERE owners.owner = ? ORDER BY owners.last_used DESC",
+                (owner,),
+            )
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def add(self, data, file_type, name=None, owner=None):
+        """
+        Add a document to the library, or find it if the same content is already there
+
+        Args:
+            data (bytes): File contents
+            file_type (str): MIME type reported by the uploader
+            name (str, optional): File name shown in the library
+            owner (str, optional): Session or caller to list the document for
+
+        Returns:
+            str | None: Document id (the content hash), or None for unsupported or empty files
+        """
+        digest = content_hash(data)
+        built = False
+        if self.get(digest) is not None:
+            self._touch(digest)
+            document_id = digest
+        else:
+            # Concurrent uploads of the same file are indexed once
+            document_id = single_flight.do(f"library:{digest}",
+                                           lambda: self._build(digest, data, file_type, name or digest[:12]))
+            built = document_id is not None
+        if document_id is not None and owner is not None:
+            with self._lock:
+                conn = self._connection()
+                conn.execute("INSERT OR REPLACE INTO owners (owner, document_id, last_used) VALUES (?, ?, ?)",
+                             (owner, document_id, time.time()))
+                conn.commit()
+        if built:
+            self._evict(keep=document_id)
+        return document_id
+
+    def add_file(self, file, owner=None):
+        """
+        Add a Streamlit UploadedFile to the library
+
+        Args:
+            file: Uploaded file (PDF, DOCX or TXT)
+            owner (str, optional): Session to list the document for
+
+        Returns:
+            str | None: Document id, or None for unsupported or empty files
+        """
+        return self.add(file.getvalue(), file.type, file.name, owner)
+
+    def _evict(self, keep):
+        # Remove the least recently used documents until the stored bytes fit the budget.
+        # A document was last used when any owner added it or anyone opened its index.
+        with self._lock:
+            conn = self._connection()
+            total = conn.execute("SELECT COALESCE(SUM(stored_bytes), 0) FROM documents").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            rows = conn.execute(
+                "SELECT documents.id, documents.stored_bytes FROM documents "
+                "LEFT JOIN owners ON owners.document_id = documents.id WHERE documents.id != ? "
+                "GROUP BY documents.id "
+                "ORDER BY MAX(documents.last_used, COALESCE(MAX(owners.last_used), 0)) ASC",
+                (keep,),
+            ).fetchall()
+        for document_id, stored_bytes in rows:
+            if total <= self.max_bytes:
+                break
+            self.remove(document_id)
+            total -= stored_bytes
+
+    def _touch(self, document_id):
+        with self._lock:
+            conn = self._connection()
+            conn.execute("UPDATE documents SET last_used = ? WHERE id = ?", (time.time(), document_id))
+            conn.commit()
+
+    def _build(self, document_id, data, file_type, name):
+        if self.get(document_id) is not None:
+            return document_id
+        # The library keeps the chunks, so the text is not also written to the extraction cache
+        text = extract_text(data, file_type, cache=False)
+        chunks = chunk_text(text or "", CHUNK_SIZE, CHUNK_OVERLAP)
+        if not chunks:
+            return None
+
+        postings = {}
+        lengths = np.zeros(len(chunks), dtype=np.float32)
+        for chunk_id, chunk in enumerate(chunks):
+            tokens = tokenize(chunk)
+            lengths[chunk_id] = len(tokens)
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((chunk_id, tf))
+
+        terms = []
+        chunk_ids = []
+        frequencies = []
+        for term, entries in postings.items():
+            idf = float(np.log(1 + (len(chunks) - len(entries) + 0.5) / (len(entries) + 0.5)))
+            terms.append((document_id, term, len(chunk_ids), len(chunk_ids) + len(entries), idf))
+            chunk_ids.extend(chunk_id for chunk_id, _ in entries)
+            frequencies.extend(tf for _, tf in entries)
+        chunk_ids = np.asarray(chunk_ids, dtype=np.int32)
+        frequencies = np.minimum(frequencies, 65535).astype(np.uint16)
+        norms = 1 - BM25_B + BM25_B * lengths / (lengths.mean() or 1)
+        # Chunk vectors come straight from the postings: one hashed feature per term
+        dims, signs = _term_features(postings)
+        lengths_per_term = np.fromiter((len(entries) for entries in postings.values()), dtype=np.int64,
+                                       count=len(postings))
+        vectors = _hashed_vectors(chunk_ids, np.repeat(dims, lengths_per_term),
+                                  np.repeat(signs, lengths_per_term) * (1 + np.log(frequencies.astype(np.float32))),
+                                  len(chunks))
+
+        # Arrays are written to a scratch directory and moved into place in one step
+        directory = self._document_dir(document_id)
+        scratch = f"{directory}.{os.getpid()}.{threading.get_ident()}.tmp"
+        os.makedirs(scratch, exist_ok=True)
+        np.save(os.path.join(scratch, "postings.npy"), chunk_ids)
+        np.save(os.path.join(scratch, "frequencies.npy"), frequencies)
+        np.save(os.path.join(scratch, "norms.npy"), norms.astype(np.float32))
+        np.save(os.path.join(scratch, "vectors.npy"), vectors)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(scratch, directory)
+
+        stored_bytes = (sum(len(chunk.encode("utf-8")) for chunk in chunks)
+                        + chunk_ids.nbytes + frequencies.nbytes + norms.size * 4 + vectors.nbytes)
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM chunks WHERE document_id = ?", (document_id,))
+                conn.execute("DELETE FROM terms WHERE document_id = ?", (document_id,))
+                conn.executemany("INSERT INTO chunks (document_id, chunk_id, text) VALUES (?, ?, ?)",
+                                 ((document_id, chunk_id, chunk) for chunk_id, chunk in enumerate(chunks)))
+                conn.executemany("INSERT INTO terms (document_id, term, start, stop, idf) VALUES (?, ?, ?, ?, ?)",
+                                 terms)
+                # Written last, so a document is only listed once its index is complete
+                conn.execute(
+                    "INSERT OR REPLACE INTO documents (id, name, file_type, size, characters, chunks, stored_bytes, "
+                    "created_at, last_used) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (document_id, name, file_type, len(data), len(text), len(chunks), stored_bytes, now, now),
+                )
+        return document_id
+
+    def index(self, document_id):
+        """
+        Open the search index of a library document
+
+        Args:
+            document_id (str): Document id returned by add
+
+        Returns:
+            LibraryIndex | None: Index usable with retrieve_context, or None if the
+            document is not in the library
+        """
+        with self._lock:
+            index = self._indexes.get(document_id)
+            if index is not None:
+                self._indexes.move_to_end(document_id)
+                return index
+        document = self.get(document_id)
+        if document is None:
+            return None
+        index = LibraryIndex(self, document_id, document["chunks"])
+        self._touch(document_id)
+        with self._lock:
+            self._indexes[document_id] = index
+            while len(self._indexes) > MEMORY_MAX_INDEXES:
+                self._indexes.popitem(last=False)
+        return index
+
+    def remove(self, document_id):
+        """
+        Delete a document and its index from the library
+
+        Args:
+            document_id (str): Document id returned by add
+        """
+        with self._lock:
+            self._indexes.pop(document_id, None)
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM documents WHERE id = ?", (document_id,))
+                conn.execute("DELETE FROM chunks WHERE document_id = ?", (document_id,))
+                conn.execute("DELETE FROM terms WHERE document_id = ?", (document_id,))
+                conn.execute("DELETE FROM owners WHERE document_id = ?", (document_id,))
+        shutil.rmtree(self._document_dir(document_id), ignore_errors=True)
+
+    def stats(self):
+        """
+        Size of the library
+
+        Returns:
+            dict: documents, chunks, characters, stored bytes, the byte budget and open indexes
+        """
+        with self._lock:
+            documents, chunks, characters, stored_bytes = self._connection().execute(
+                "SELECT COUNT(*), COALESCE(SUM(chunks), 0), COALESCE(SUM(characters), 0), "
+                "COALESCE(SUM(stored_bytes), 0) FROM documents"
+            ).fetchone()
+            return {"documents": documents, "chunks": chunks, "characters": characters,
+                    "stored_bytes": stored_bytes, "max_bytes": self.max_bytes, "open_indexes": len(self._indexes)}
+
+
+# Shared by every Streamlit session in this process
+library = DocumentLibrary()
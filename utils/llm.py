@@ -0,0 +1,172 @@
+import os
+import threading
+import time
+
+import httpx
+from langchain_community.chat_models import ChatOpenAI
+
+from utils.metrics import current_tags, metrics
+from utils.resilience import STREAM_IDLE_TIMEOUT
+from utils.scheduler import scheduler
+from utils.tokens import estimate_tokens, fit_prompt
+
+MODEL_NAME = "mistralai/mixtral-8x7b-instruct"
+# Hard cap on one HTTP request; per-content-type deadlines in utils.resilience are shorter
+REQUEST_TIMEOUT = float(os.getenv("EDUTUTOR_LLM_TIMEOUT", 120))
+# Expected completion size, charged against the tokens-per-minute budget up front
+COMPLETION_TOKENS = 1000
+
+# Clients live for the whole process, so the OpenAI SDK's pooled keep-alive
+# HTTP connections are reused across sessions and reruns
+_clients = {}
+_lock = threading.Lock()
+
+
+def get_llm(model=MODEL_NAME, temperature=0.7):
+    """
+    Return the process-wide chat model client for a model/temperature pair
+
+    The client is built once and shared by every Streamlit session and rerun.
+
+    Args:
+        model (str): Model name on the OpenAI-compatible endpoint
+        temperature (float): Sampling temperature
+
+    Returns:
+        ChatOpenAI: Shared chat model client
+    """
+    key = (model, temperature)
+    llm = _clients.get(key)
+    if llm is None:
+        with _lock:
+            llm = _clients.get(key)
+            if llm is None:
+                llm = ChatOpenAI(
+                    model=model,
+                    temperature=temperature,
+                    openai_api_key=os.getenv("OPENAI_API_KEY"),
+                    openai_api_base=os.getenv("OPENAI_API_BASE"),
+                    request_timeout=REQUEST_TIMEOUT,
+                    # Retries are jittered and deadline-aware in utils.resilience instead
+                    max_retries=0
+                )
+                _clients[key] = llm
+    return llm
+
+
+def _token_usage(message):
+    # Providers that report usage put it in the response metadata
+    metadata = getattr(message, "response_metadata", None) or {}
+    usage = metadata.get("token_usage") or metadata.get("usage") or {}
+    return usage.get("prompt_tokens"), usage.get("completion_tokens")
+
+
+def _record_call(llm, prompt_tokens, completion, queue_wait, started, ttft=None, error=None, usage=(None, None),
+                 tags=None):
+    metrics.record(
+        "llm",
+        **dict(tags or {}, model=llm.model_name),
+        queue_wait=queue_wait,
+        latency=time.monotonic() - started if started is not None else None,
+        ttft=ttft,
+        prompt_tokens=usage[0] or prompt_tokens,
+        completion_tokens=usage[1] or (estimate_tokens(completion) if completion else None),
+        error=type(error).__name__ if error is not None else None,
+    )
+
+
+def _request_options(timeout, queue_wait, stream=False):
+    # The HTTP request gets whatever the queue wait left of the caller's time budget
+    if timeout is None:
+        return {}
+    remaining = timeout - queue_wait
+    if remaining <= 0:
+        raise TimeoutError("No time left for the request after waiting for a slot")
+    remaining = min(REQUEST_TIMEOUT, remaining)
+    if not stream:
+        return {"timeout": remaining}
+    # httpx applies the read timeout to every socket read, not just the first, so a
+    # short budget would cut a stream off on an ordinary pause between chunks. Reads
+    # get at least the idle timeout; the first chunk's deadline is enforced by the
+    # caller's attempt (utils.resilience), which gives up on it at the deadline.
+    return {"timeout": httpx.Timeout(remaining, read=max(remaining, STREAM_IDLE_TIMEOUT))}
+
+
+def invoke_text(llm, prompt, priority=None, query=None, timeout=None):
+    """
+    Send a prompt through the shared scheduler and return the completion text
+
+    Prompts over the model's context budget are compacted locally first. Queue wait,
+    latency and token counts are recorded in the shared metrics registry.
+
+    Args:
+        llm: LangChain chat model
+        prompt (str): Fully formatted prompt
+        priority (int, optional): Scheduler priority class, defaults to the current context's
+        query (str, optional): Question used to rank content if the prompt must be compacted
+        timeout (float, optional): Seconds the call may take in total, queue wait included;
+            defaults to the scheduler's queue limit plus REQUEST_TIMEOUT
+
+    Returns:
+        str: Completion text
+
+    Raises:
+        SchedulerBusy: If the scheduler cannot admit the call
+    """
+    prompt = fit_prompt(prompt, llm.model_name, COMPLETION_TOKENS, query)
+    prompt_tokens = estimate_tokens(prompt)
+    queue_wait = started = None
+    try:
+        with scheduler.slot(prompt_tokens + COMPLETION_TOKENS, priority, timeout) as queue_wait:
+            started = time.monotonic()
+            message = llm.invoke(prompt, **_request_options(timeout, queue_wait))
+    except Exception as e:
+        _record_call(llm, prompt_tokens, None, queue_wait, started, error=e)
+        raise
+    _record_call(llm, prompt_tokens, message.content, queue_wait, started, usage=_token_usage(message))
+    return message.content
+
+
+def stream_text(llm, prompt, priority=None, query=None, timeout=None):
+    """
+    Stream a completion from the chat model as plain text chunks
+
+    Prompts over the model's context budget are compacted locally first. The scheduler
+    slot is held until the stream is exhausted or closed. Queue wait, time to first
+    token, latency and token counts are recorded in the shared metrics registry, tagged
+    with the caller's metric tags even if the stream is consumed elsewhere.
+
+    Args:
+        llm: LangChain chat model
+        prompt (str): Fully formatted prompt
+        priority (int, optional): Scheduler priority class, defaults to the current context's
+        query (str, optional): Question used to rank content if the prompt must be compacted
+        timeout (float, optional): Seconds allowed for the queue wait plus connecting and
+            sending the request; each read of the response may wait up to
+            STREAM_IDLE_TIMEOUT (or this budget, if longer)
+
+    Returns:
+        iterator: Pieces of the completion as they arrive
+    """
+    prompt = fit_prompt(prompt, llm.model_name, COMPLETION_TOKENS, query)
+    return _stream(llm, prompt, priority, current_tags(), timeout)
+
+
+def _stream(llm, prompt, priority, tags, timeout=None):
+    prompt_tokens = estimate_tokens(prompt)
+    queue_wait = started = ttft = error = None
+    pieces = []
+    try:
+        with scheduler.slot(prompt_tokens + COMPLETION_TOKENS, priority, timeout) as queue_wait:
+            started = time.monotonic()
+            for chunk in llm.stream(prompt, **_request_options(timeout, queue_wait, stream=True)):
+                if chunk.content:
+                    if ttft is None:
+                        ttft = time.monotonic() - started
+                    pieces.append(chunk.content)
+                    yield chunk.content
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        _record_call(llm, prompt_tokens, "".join(pieces), queue_wait, started, ttft, error, tags=tags)
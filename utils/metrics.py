@@ -0,0 +1,342 @@
+import bisect
+import contextvars
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logging.handlers import RotatingFileHandler
+
+# Metrics settings (override through .env)
+TRACE_FILE = os.getenv("EDUTUTOR_TRACE_FILE", "")
+TRACE_MAX_BYTES = int(os.getenv("EDUTUTOR_TRACE_MAX_BYTES", 10 * 1024 * 1024))
+TRACE_BACKUPS = int(os.getenv("EDUTUTOR_TRACE_BACKUPS", 5))
+METRICS_PORT = int(os.getenv("EDUTUTOR_METRICS_PORT", 0))
+# Recent samples kept per (operation, content type) for the live percentiles
+WINDOW_SIZE = int(os.getenv("EDUTUTOR_METRICS_WINDOW", 500))
+
+# Histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+_tags = contextvars.ContextVar("edututor_metric_tags", default={})
+
+
+@contextmanager
+def tagged(**tags):
+    """
+    Tag every metric recorded in the enclosed block (kind, difficulty, model, ...)
+
+    Tags nest: inner values override outer ones, and None values are ignored.
+    """
+    merged = dict(_tags.get())
+    merged.update({name: str(value) for name, value in tags.items() if value is not None})
+    token = _tags.set(merged)
+    try:
+        yield
+    finally:
+        _tags.reset(token)
+
+
+def current_tags():
+    """
+    Metric tags of the current context
+
+    Returns:
+        dict: Tag names to values
+    """
+    return dict(_tags.get())
+
+
+def percentile(values, q):
+    """
+    Nearest-rank percentile of a list of numbers
+
+    Args:
+        values (list): Samples
+        q (float): Percentile in [0, 100]
+
+    Returns:
+        float | None: Percentile value, or None if there are no samples
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class _Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    pairs = []
+    for name, value in labels:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class Metrics:
+    """
+    In-process registry of per-call measurements.
+
+    Every upstream LLM call and every generator call records one event. Events feed
+    Prometheus-style counters and histograms, a rolling window per operation and
+    content type for live percentiles, and optionally a rotating JSONL trace file.
+    """
+
+    def __init__(self, trace_file=TRACE_FILE, window=WINDOW_SIZE):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._windows = {}
+        self.window = window
+        self._trace = None
+        if trace_file:
+            directory = os.path.dirname(trace_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._trace = logging.getLogger("edututor.trace")
+            self._trace.propagate = False
+            self._trace.setLevel(logging.INFO)
+            if not self._trace.handlers:
+                handler = RotatingFileHandler(trace_file, maxBytes=TRACE_MAX_BYTES, backupCount=TRACE_BACKUPS)
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                self._trace.addHandler(handler)
+
+    def _inc(self, name, labels, amount=1):
+        key = (name, tuple(sorted(labels.items())))
+        self._counters[key] = self._counters.get(key, 0) + amount
+
+    def _observe(self, name, labels, value):
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = _Histogram()
+        histogram.observe(value)
+
+    def record(self, op, **event):
+        """
+        Record one finished call
+
+        Args:
+            op (str): "llm" for an upstream call, "generate" for a generator call
+            **event: Measurements (latency, ttft, queue_wait, prompt_tokens,
+                completion_tokens, cache, error); tags from the current context are added
+        """
+        event = {**current_tags(), **{name: value for name, value in event.items() if value is not None}}
+        event["op"] = op
+        event["time"] = round(time.time(), 3)
+        labels = {name: event.get(name, "") for name in ("kind", "model")}
+        if op == "generate":
+            labels["cache"] = event.get("cache", "")
+        labels["status"] = "error" if event.get("error") else "ok"
+
+        with self._lock:
+            self._inc(f"edututor_{op}_requests_total", labels)
+            timing_labels = {name: labels[name] for name in ("kind", "model")}
+            for field in ("latency", "ttft", "queue_wait"):
+                if field in event:
+                    self._observe(f"edututor_{op}_{field}_seconds", timing_labels, event[field])
+            for field in ("prompt_tokens", "completion_tokens"):
+                if field in event:
+                    self._inc(f"edututor_{op}_tokens_total", dict(timing_labels, type=field[:-7]), event[field])
+            window = self._windows.setdefault((op, event.get("kind", "")), deque(maxlen=self.window))
+            window.append(event)
+
+        if self._trace is not None:
+            self._trace.info(json.dumps(event, default=str))
+
+    def count(self, name, amount=1, **labels):
+        """
+        Increment a named counter, exported as ``edututor_<name>_total``
+
+        Args:
+            name (str): Counter name (e.g., "llm_hedges")
+            amount (int): Increment
+            **labels: Label values
+        """
+        with self._lock:
+            self._inc(f"edututor_{name}_total", {label: str(value) for label, value in labels.items()}, amount)
+
+    def percentile(self, op, field, q, kind=None, model=None, min_samples=1):
+        """
+        Percentile of one measurement over the recent window
+
+        Args:
+            op (str): "llm" or "generate"
+            field (str): Measurement, e.g. "latency" or "ttft"
+            q (float): Percentile in [0, 100]
+            kind (str, optional): Only events of this content type
+            model (str, optional): Only events for this model
+            min_samples (int): Return None when fewer successful samples are available
+
+        Returns:
+            float | None: Percentile in seconds, or None without enough samples
+        """
+        with self._lock:
+            windows = [events for (event_op, event_kind), events in self._windows.items()
+                       if event_op == op and (kind is None or event_kind == kind)]
+            values = [event[field] for events in windows for event in events
+                      if field in event and not event.get("error") and (model is None or event.get("model") == model)]
+        return percentile(values, q) if len(values) >= min_samples else None
+
+    def window_stats(self, op, kind=None, model=None, since=None):
+        """
+        Call count, error rate and latency percentiles over the recent window
+
+        Args:
+            op (str): "llm" or "generate"
+            kind (str, optional): Only events of this content type
+            model (str, optional): Only events for this model
+            since (float, optional): Only events recorded at or after this Unix time
+
+        Returns:
+            dict: count, errors, error_rate, and p50/p95 latency in seconds over the
+            successful calls (None without any)
+        """
+        with self._lock:
+            events = [event for (event_op, event_kind), window in self._windows.items()
+                      if event_op == op and (kind is None or event_kind == kind) for event in window
+                      if (model is None or event.get("model") == model) and (since is None or event["time"] >= since)]
+        errors = sum(1 for event in events if event.get("error"))
+        latencies = [event["latency"] for event in events if "latency" in event and not event.get("error")]
+        return {
+            "count": len(events),
+            "errors": errors,
+            "error_rate": errors / len(events) if events else 0.0,
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+        }
+
+    def summary(self):
+        """
+        Live percentiles over the recent window for each operation and content type
+
+        Returns:
+            list: One dict per (op, kind) with count, p50/p95/p99 latency and TTFT in
+            seconds, error rate and (for generator calls) cache hit rate
+        """
+        with self._lock:
+            windows = {key: list(events) for key, events in self._windows.items()}
+        rows = []
+        for (op, kind), events in sorted(windows.items()):
+            latencies = [event["latency"] for event in events if "latency" in event]
+            ttfts = [event["ttft"] for event in events if "ttft" in event]
+            row = {"op": op, "kind": kind or "-", "count": len(events)}
+            for q in (50, 95, 99):
+                row[f"p{q}"] = percentile(latencies, q)
+            row["ttft_p50"] = percentile(ttfts, 50)
+            row["ttft_p95"] = percentile(ttfts, 95)
+            row["error_rate"] = sum(1 for event in events if event.get("error")) / len(events)
+            if op == "generate":
+                hits = sum(1 for event in events if event.get("cache") in ("hit", "semantic_hit"))
+                row["cache_hit_rate"] = hits / len(events)
+            rows.append(row)
+        return rows
+
+    def recent(self, limit=50):
+        """
+        Most recent events across all windows, newest last
+
+        Args:
+            limit (int): Maximum number of events
+
+        Returns:
+            list: Event dicts
+        """
+        with self._lock:
+            events = [event for window in self._windows.values() for event in window]
+        return sorted(events, key=lambda event: event["time"])[-limit:]
+
+    def render_prometheus(self):
+        """
+        Render every counter and histogram in the Prometheus text exposition format
+
+        Returns:
+            str: Metrics page body
+        """
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items())
+        declared = set()
+        for (name, labels), value in counters:
+            if name not in declared:
+                lines.append(f"# TYPE {name} counter")
+                declared.add(name)
+            lines.append(f"{name}{_label_text(labels)} {value}")
+        for (name, labels), histogram in histograms:
+            if name not in declared:
+                lines.append(f"# TYPE {name} histogram")
+                declared.add(name)
+            cumulative = 0
+            for bound, count in zip(histogram.buckets + ("+Inf",), histogram.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_label_text(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{name}_sum{_label_text(labels)} {histogram.total:.6f}")
+            lines.append(f"{name}_count{_label_text(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+# Shared by every Streamlit session in this process
+metrics = Metrics()
+
+_server = None
+_server_lock = threading.Lock()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = metrics.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port=METRICS_PORT, host="0.0.0.0"):
+    """
+    Serve GET /metrics on a background thread, once per process
+
+    Safe to call on every Streamlit rerun; only the first call starts the server.
+
+    Args:
+        port (int): Port to listen on; 0 leaves the endpoint disabled
+        host (str): Interface to bind
+
+    Returns:
+        ThreadingHTTPServer | None: The running server, or None when disabled
+    """
+    global _server
+    if not port:
+        return None
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, daemon=True).start()
+    return _server
@@ -0,0 +1,115 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.scheduler import BACKGROUND, priority, scheduler
+
+# Speculative prefetch settings (override through .env); off unless EDUTUTOR_PREFETCH=1
+PREFETCH_ENABLED = os.getenv("EDUTUTOR_PREFETCH", "").lower() in ("1", "true", "yes")
+# Spend limits over a rolling hour
+PREFETCH_MAX_REQUESTS_PER_HOUR = int(os.getenv("EDUTUTOR_PREFETCH_MAX_PER_HOUR", 60))
+PREFETCH_MAX_TOKENS_PER_HOUR = int(os.getenv("EDUTUTOR_PREFETCH_MAX_TOKENS_PER_HOUR", 150000))
+# Prefetches running or waiting at once; more are dropped rather than queued
+PREFETCH_MAX_PENDING = int(os.getenv("EDUTUTOR_PREFETCH_MAX_PENDING", 8))
+PREFETCH_WORKERS = 2
+SPEND_WINDOW = 60 * 60
+
+
+class Prefetcher:
+    """
+    Runs speculative generator calls in the background at BACKGROUND priority.
+
+    Prefetched responses land in the response cache, so the request the user is
+    expected to make next is served instantly. Work that is already cached, already
+    pending, over the hourly request/token budget, or submitted while the LLM scheduler
+    has a queue is skipped instead of competing with interactive traffic.
+    """
+
+    def __init__(self, enabled=PREFETCH_ENABLED, max_requests_per_hour=PREFETCH_MAX_REQUESTS_PER_HOUR,
+                 max_tokens_per_hour=PREFETCH_MAX_TOKENS_PER_HOUR, max_pending=PREFETCH_MAX_PENDING,
+                 workers=PREFETCH_WORKERS):
+        self.enabled = enabled
+        self.max_requests_per_hour = max_requests_per_hour
+        self.max_tokens_per_hour = max_tokens_per_hour
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+        self._lock = threading.Lock()
+        self._pending = set()
+        # (finished at, estimated tokens) of recent prefetches
+        self._spend = deque()
+        self._counters = {
+            "submitted": 0, "completed": 0, "failed": 0, "skipped_cached": 0, "skipped_pending": 0,
+            "skipped_busy": 0, "skipped_budget": 0,
+        }
+
+    def _spent(self, now):
+        while self._spend and self._spend[0][0] < now - SPEND_WINDOW:
+            self._spend.popleft()
+        return len(self._spend), sum(tokens for _, tokens in self._spend)
+
+    def _skip(self, reason):
+        self._counters[f"skipped_{reason}"] += 1
+        return False
+
+    def submit(self, key, run, is_cached=None):
+        """
+        Queue one speculative call if it is worth making and the budget allows it
+
+        Args:
+            key (str): Identifies the work, so the same prefetch is not queued twice
+            run (callable): Makes the call and returns its estimated token spend
+            is_cached (callable, optional): Returns True if the result is already cached
+
+        Returns:
+            bool: Whether the call was queued
+        """
+        if not self.enabled:
+            return False
+        if is_cached is not None and is_cached():
+            with self._lock:
+                return self._skip("cached")
+        with self._lock:
+            if key in self._pending:
+                return self._skip("pending")
+            if len(self._pending) >= self.max_pending or scheduler.stats()["queued"] > 0:
+                return self._skip("busy")
+            requests, tokens = self._spent(time.monotonic())
+            if requests + len(self._pending) >= self.max_requests_per_hour or tokens >= self.max_tokens_per_hour:
+                return self._skip("budget")
+            self._pending.add(key)
+            self._counters["submitted"] += 1
+        self._executor.submit(self._run, key, run)
+        return True
+
+    def _run(self, key, run):
+        tokens = 0
+        try:
+            with priority(BACKGROUND):
+                tokens = run()
+            outcome = "completed"
+        except Exception:
+            outcome = "failed"
+        with self._lock:
+            self._pending.discard(key)
+            self._spend.append((time.monotonic(), tokens))
+            self._counters[outcome] += 1
+
+    def stats(self):
+        """
+        Prefetch counters and the spend over the last hour
+
+        Returns:
+            dict: Counters plus enabled, pending, requests_last_hour and tokens_last_hour
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            stats["pending"] = len(self._pending)
+            stats["requests_last_hour"], stats["tokens_last_hour"] = self._spent(time.monotonic())
+        stats["enabled"] = self.enabled
+        return stats
+
+
+# Shared by every Streamlit session in this process
+prefetcher = Prefetcher()
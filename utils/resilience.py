@@ -0,0 +1,387 @@
+import contextvars
+import os
+import queue
+import random
+import threading
+import time
+
+from utils.metrics import metrics
+from utils.scheduler import SchedulerBusy, scheduler
+
+# Resilience settings (override through .env)
+DEFAULT_DEADLINE = float(os.getenv("EDUTUTOR_DEADLINE", 60))
+# Seconds until the full response, per content type, e.g. "lesson=120,quiz=45"
+DEADLINES = {
+    "lesson": 90,
+    "exercises": 90,
+    "quiz": 60,
+    "quiz_json": 60,
+    "flashcards": 45,
+    "flashcards_json": 45,
+    "flashcards_shard": 45,
+    "subtopics": 30,
+    "summary": 60,
+    "summary_chunk": 60,
+    "question": 60,
+    "document_qa": 60,
+    "chat": 60,
+    "document_chat": 60,
+    "chat_summary": 60,
+}
+DEADLINES.update({
+    kind.strip(): float(seconds)
+    for kind, _, seconds in (item.partition("=") for item in os.getenv("EDUTUTOR_DEADLINES", "").split(","))
+    if kind.strip() and seconds.strip()
+})
+# Streams must produce their first chunk within this time (or the kind's deadline, if shorter)
+FIRST_CHUNK_DEADLINE = float(os.getenv("EDUTUTOR_FIRST_CHUNK_DEADLINE", 20))
+# Longest silence allowed between chunks once a stream has started
+STREAM_IDLE_TIMEOUT = float(os.getenv("EDUTUTOR_STREAM_IDLE_TIMEOUT", 30))
+MAX_RETRIES = int(os.getenv("EDUTUTOR_LLM_RETRIES", 2))
+BACKOFF_BASE = float(os.getenv("EDUTUTOR_BACKOFF_BASE", 0.5))
+BACKOFF_MAX = float(os.getenv("EDUTUTOR_BACKOFF_MAX", 8))
+HEDGE_ENABLED = os.getenv("EDUTUTOR_HEDGE", "1").lower() in ("1", "true", "yes")
+# Hedge after the p95 latency of recent calls, but never sooner than this
+HEDGE_MIN_DELAY = float(os.getenv("EDUTUTOR_HEDGE_MIN_DELAY", 2))
+HEDGE_MIN_SAMPLES = 20
+# An attempt failing this close to its deadline is treated as having timed out
+DEADLINE_SLACK = 0.25
+# Faster secondary model used when the primary misses its deadline (empty disables)
+FALLBACK_MODEL = os.getenv("EDUTUTOR_FALLBACK_MODEL", "mistralai/mistral-7b-instruct")
+
+# Upstream HTTP statuses worth retrying among the 4xx client errors
+_RETRYABLE_CLIENT_STATUSES = frozenset({408, 409, 425, 429})
+# The fallback model shares the endpoint and its credentials, so these fail there too
+_AUTH_STATUSES = frozenset({401, 403})
+
+_counters = {
+    "calls": 0, "hedged": 0, "hedge_wins": 0, "retries": 0, "timeouts": 0, "fallbacks": 0, "fallback_wins": 0,
+}
+_counters_lock = threading.Lock()
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when no attempt produced a response before the content type's deadline."""
+
+
+class ErrorResult(str):
+    """
+    Error message a generator returns in place of content.
+
+    It displays like any other text, but callers tell it apart from generated content
+    by type, so a lesson that happens to begin with "Error" is not mistaken for one.
+    """
+
+
+def deadline_for(kind):
+    """
+    Seconds allowed for a full response of a content type
+
+    Args:
+        kind (str): Content type
+
+    Returns:
+        float: Deadline in seconds
+    """
+    return DEADLINES.get(kind, DEFAULT_DEADLINE)
+
+
+def _status_code(error):
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_retryable(error):
+    """
+    Whether sending the same request again could succeed
+
+    SchedulerBusy (this process is saturated) and 4xx client errors such as a bad
+    request, failed authentication or an unknown model fail the same way every time;
+    timeouts, rate limits, connection errors and 5xx responses are worth retrying.
+
+    Args:
+        error (Exception): Error raised by an attempt
+
+    Returns:
+        bool: True if the request should be retried
+    """
+    if isinstance(error, SchedulerBusy):
+        return False
+    status = _status_code(error)
+    return status is None or not 400 <= status < 500 or status in _RETRYABLE_CLIENT_STATUSES
+
+
+def _count(name, kind, model):
+    with _counters_lock:
+        _counters[name] += 1
+    metrics.count(f"llm_{name}", kind=kind or "", model=model)
+
+
+def backoff(attempt):
+    """
+    Jittered exponential backoff ("full jitter")
+
+    Args:
+        attempt (int): Retry number, starting at 0
+
+    Returns:
+        float: Seconds to sleep
+    """
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def hedge_delay(kind, model, stream):
+    """
+    How long to wait for the first response before sending a duplicate request
+
+    Args:
+        kind (str): Content type
+        model (str): Model name
+        stream (bool): Whether the call streams (hedges on time to first chunk)
+
+    Returns:
+        float | None: Delay in seconds, or None when hedging should not happen
+    """
+    if not HEDGE_ENABLED:
+        return None
+    p95 = metrics.percentile("llm", "ttft" if stream else "latency", 95, kind=kind, model=model,
+                             min_samples=HEDGE_MIN_SAMPLES)
+    return None if p95 is None else max(HEDGE_MIN_DELAY, p95)
+
+
+class _Attempt:
+    """One upstream request, consumed on a background thread into a shared event queue."""
+
+    def __init__(self, call, client, events, role, context, deadline):
+        self.role = role
+        self.model = client.model_name
+        self.deadline = deadline
+        self.failed = False
+        self._cancelled = threading.Event()
+        # Each thread needs its own copy: a Context can only be entered by one thread at a time
+        context = context.copy()
+        threading.Thread(target=context.run, args=(self._run, call, client, events), daemon=True).start()
+
+    def _run(self, call, client, events):
+        chunks = None
+        try:
+            # The upstream request is bounded by the attempt's deadline, so an abandoned
+            # attempt gives its scheduler slot back when the caller gives up on it
+            chunks = call(client, max(0.0, self.deadline - time.monotonic()))
+            if isinstance(chunks, str):
+                chunks = iter([chunks])
+            for chunk in chunks:
+                if self._cancelled.is_set():
+                    break
+                events.put((self, "chunk", chunk))
+            events.put((self, "done", None))
+        except Exception as e:
+            events.put((self, "error", e))
+        finally:
+            close = getattr(chunks, "close", None)
+            if close:
+                # Releases the scheduler slot of a losing or abandoned stream
+                close()
+
+    def cancel(self):
+        self._cancelled.set()
+
+
+def _first_response(launch, kind, model, stream):
+    """
+    Launch the primary attempt and wait for the first one to produce output, hedging,
+    retrying and falling back as needed
+
+    Returns:
+        tuple: (winning attempt, first chunk or None, event queue)
+    """
+    events = queue.Queue()
+    deadline_seconds = deadline_for(kind)
+    if stream:
+        deadline_seconds = min(deadline_seconds, FIRST_CHUNK_DEADLINE)
+    deadline = time.monotonic() + deadline_seconds
+    delay = hedge_delay(kind, model, stream)
+    hedge_at = time.monotonic() + delay if delay is not None else None
+    attempts = [launch("primary", events, deadline)]
+    retries = 0
+    error = None
+
+    while True:
+        now = time.monotonic()
+        wake = min(deadline, hedge_at) if hedge_at is not None else deadline
+        try:
+            attempt, event, payload = events.get(timeout=max(0.0, wake - now))
+        except queue.Empty:
+            now = time.monotonic()
+            if hedge_at is not None and now >= hedge_at and now < deadline:
+                hedge_at = None
+                # Under saturation a duplicate request would only deepen the queue
+                if scheduler.stats()["queued"] == 0:
+                    attempts.append(launch("hedge", events, deadline))
+                    _count("hedged", kind, model)
+                continue
+            if now >= deadline:
+                _count("timeouts", kind, model)
+                for attempt in attempts:
+                    attempt.cancel()
+                if any(attempt.role == "fallback" for attempt in attempts):
+                    raise DeadlineExceeded(f"No response within {deadline_seconds:.0f}s")
+                deadline = time.monotonic() + deadline_seconds
+                fallback = launch("fallback", events, deadline)
+                if fallback is None:
+                    raise DeadlineExceeded(f"No response within {deadline_seconds:.0f}s")
+                _count("fallbacks", kind, model)
+                attempts = [fallback]
+                hedge_at = None
+            continue
+
+        if attempt not in attempts:
+            # Late output from an attempt that was already given up on
+            continue
+        if event == "error":
+            attempt.failed = True
+            error = payload
+            if time.monotonic() >= attempt.deadline - DEADLINE_SLACK:
+                # The attempt ran out of time (in the queue or upstream): handled as a
+                # missed deadline once the other attempts have had their chance
+                deadline = min(deadline, attempt.deadline)
+                continue
+            if not all(other.failed for other in attempts):
+                continue
+            # SchedulerBusy means this process is saturated; retrying would only add load
+            if isinstance(payload, SchedulerBusy) or attempt.role == "fallback":
+                raise payload
+            if _status_code(payload) in _AUTH_STATUSES:
+                raise payload
+            if retries < MAX_RETRIES and is_retryable(payload):
+                pause = backoff(retries)
+                if time.monotonic() + pause < deadline:
+                    retries += 1
+                    _count("retries", kind, model)
+                    time.sleep(pause)
+                    attempts.append(launch("primary", events, deadline))
+                    continue
+            deadline = time.monotonic() + deadline_seconds
+            fallback = launch("fallback", events, deadline)
+            if fallback is None:
+                raise error
+            _count("fallbacks", kind, model)
+            attempts.append(fallback)
+            hedge_at = None
+            continue
+
+        for other in attempts:
+            if other is not attempt:
+                other.cancel()
+        if attempt.role == "hedge":
+            _count("hedge_wins", kind, model)
+        elif attempt.role == "fallback":
+            _count("fallback_wins", kind, model)
+        return attempt, payload if event == "chunk" else None, events
+
+
+def _launcher(call, client, fallback_client):
+    # Attempts run with the caller's scheduler priority and metric tags, captured now
+    context = contextvars.copy_context()
+
+    def launch(role, events, deadline):
+        if role == "fallback":
+            if fallback_client is None or fallback_client.model_name == client.model_name:
+                return None
+            return _Attempt(call, fallback_client, events, role, context, deadline)
+        return _Attempt(call, client, events, role, context, deadline)
+    return launch
+
+
+def resilient_invoke(call, client, kind=None, fallback_client=None):
+    """
+    Run a non-streamed LLM call under the content type's deadline
+
+    The call runs on a background thread. If it takes longer than the recent p95, a
+    duplicate request is sent and the first response wins. Failures are retried with
+    jittered backoff, and a call that misses its deadline or runs out of retries is
+    re-sent to the fallback model.
+
+    Args:
+        call (callable): Takes a chat model client and the seconds the attempt may take,
+            and returns the completion text
+        client: Primary chat model client
+        kind (str, optional): Content type, selects the deadline and latency history
+        fallback_client (optional): Secondary client for the fallback model
+
+    Returns:
+        str: Completion text
+
+    Raises:
+        DeadlineExceeded: If neither the primary nor the fallback answered in time
+        Exception: The last error when every attempt failed
+    """
+    with _counters_lock:
+        _counters["calls"] += 1
+    launch = _launcher(call, client, fallback_client)
+    winner, first, events = _first_response(launch, kind, client.model_name, stream=False)
+    return first or ""
+
+
+def resilient_stream(call, client, kind=None, fallback_client=None):
+    """
+    Stream an LLM call with a first-chunk deadline, hedging, retries and fallback
+
+    Hedging, retries and the fallback only apply until the first chunk arrives; after
+    that the winning stream is followed to the end, and a silence longer than
+    STREAM_IDLE_TIMEOUT ends it with DeadlineExceeded.
+
+    Args:
+        call (callable): Takes a chat model client and the seconds the attempt may take
+            to its first chunk, and returns an iterator of str chunks
+        client: Primary chat model client
+        kind (str, optional): Content type, selects the deadline and latency history
+        fallback_client (optional): Secondary client for the fallback model
+
+    Returns:
+        iterator: Pieces of the completion as they arrive
+    """
+    return _follow(_launcher(call, client, fallback_client), kind, client.model_name)
+
+
+def _follow(launch, kind, model):
+    with _counters_lock:
+        _counters["calls"] += 1
+    winner, first, events = _first_response(launch, kind, model, stream=True)
+    try:
+        if first is None:
+            return
+        yield first
+        while True:
+            try:
+                attempt, event, payload = events.get(timeout=STREAM_IDLE_TIMEOUT)
+            except queue.Empty:
+                raise DeadlineExceeded(f"The response stalled for {STREAM_IDLE_TIMEOUT:.0f}s")
+            if attempt is not winner:
+                continue
+            if event == "chunk":
+                yield payload
+            elif event == "error":
+                raise payload
+            else:
+                return
+    finally:
+        winner.cancel()
+
+
+def resilience_stats():
+    """
+    Hedge, retry, timeout and fallback counters with their rates per call
+
+    Returns:
+        dict: Counters plus hedge_rate, hedge_win_rate and fallback_rate
+    """
+    with _counters_lock:
+        stats = dict(_counters)
+    calls = stats["calls"]
+    stats["hedge_rate"] = stats["hedged"] / calls if calls else 0.0
+    stats["hedge_win_rate"] = stats["hedge_wins"] / stats["hedged"] if stats["hedged"] else 0.0
+    stats["fallback_rate"] = stats["fallbacks"] / calls if calls else 0.0
+    return stats
@@ -0,0 +1,91 @@
+import hashlib
+import json
+import os
+import time
+from functools import lru_cache
+
+import requests
+
+from utils.cache import CACHE_DIR
+from utils.singleflight import single_flight
+
+ASSET_DIR = os.path.join(CACHE_DIR, "assets")
+ASSET_TIMEOUT = float(os.getenv("EDUTUTOR_ASSET_TIMEOUT", 5))
+# A failed fetch is tried again after this many seconds, instead of on every rerun
+ASSET_RETRY_AFTER = float(os.getenv("EDUTUTOR_ASSET_RETRY", 300))
+
+# Successfully loaded animations, and when the last fetch of each missing one failed
+_lottie = {}
+_lottie_failures = {}
+
+
+def load_lottie(url):
+    """
+    Load a Lottie animation, fetching it over the network at most once
+
+    The JSON is kept on local disk, so later processes start without a network round trip.
+    When the fetch fails (offline, timeout, bad status) None is returned and the page
+    renders without the animation; the fetch is tried again after ASSET_RETRY_AFTER
+    seconds, so a transient failure does not hide the animation until a restart.
+
+    Args:
+        url (str): URL of the Lottie JSON file
+
+    Returns:
+        dict | None: Parsed animation JSON, or None if it is unavailable
+    """
+    data = _lottie.get(url)
+    if data is not None:
+        return data
+    failed_at = _lottie_failures.get(url)
+    if failed_at is not None and time.monotonic() - failed_at < ASSET_RETRY_AFTER:
+        return None
+    # Sessions starting together share one fetch
+    data = single_flight.do(f"lottie:{url}", lambda: _fetch_lottie(url))
+    if data is None:
+        _lottie_failures[url] = time.monotonic()
+    else:
+        _lottie[url] = data
+        _lottie_failures.pop(url, None)
+    return data
+
+
+def _fetch_lottie(url):
+    path = os.path.join(ASSET_DIR, hashlib.sha256(url.encode("utf-8")).hexdigest()[:16] + ".json")
+    if os.path.exists(path):
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    try:
+        r = requests.get(url, timeout=ASSET_TIMEOUT)
+        if r.status_code != 200:
+            return None
+        data = r.json()
+    except (requests.RequestException, ValueError):
+        return None
+
+    try:
+        os.makedirs(ASSET_DIR, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+    except OSError:
+        pass
+    return data
+
+
+@lru_cache(maxsize=None)
+def load_css(path):
+    """
+    Read a stylesheet once per process and wrap it in a <style> tag
+
+    Args:
+        path (str): Path to the CSS file
+
+    Returns:
+        str: HTML snippet ready for st.markdown
+    """
+    with open(path, encoding="utf-8") as f:
+        return f"<style>\n{f.read()}</style>"
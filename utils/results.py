@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+
+from utils.cache import normalize_topic
+
+# Results kept per session; the oldest are dropped first (override through .env)
+MAX_RESULTS = int(os.getenv("EDUTUTOR_SESSION_RESULTS", 50))
+
+
+class ResultStore:
+    """
+    Generated results of one user session, kept across Streamlit reruns.
+
+    Every Streamlit interaction reruns the script, so anything only rendered inside
+    ``if submitted:`` disappears on the next click. Pages record each request here and
+    render from the stored entry on later reruns. A stored entry is only generated again
+    after an explicit regenerate().
+
+    ``state`` is normally st.session_state. Entries are dicts with kind, title, params,
+    value (None until generated), refresh (whether the next generation must bypass the
+    response cache) and created_at.
+    """
+
+    def __init__(self, state, max_entries=MAX_RESULTS):
+        self.max_entries = max_entries
+        if "results" not in state:
+            state["results"] = OrderedDict()
+            state["current_results"] = {}
+        self._entries = state["results"]
+        self._current = state["current_results"]
+
+    @staticmethod
+    def key(kind, **params):
+        """
+        Identify a request by its content type and parameters
+
+        Args:
+            kind (str): Content type (e.g., "lesson", "quiz")
+            **params: Parameters the generator is called with
+
+        Returns:
+            str: Hex digest identifying the request
+        """
+        if "topic" in params:
+            params["topic"] = normalize_topic(params["topic"])
+        payload = json.dumps({"kind": kind, "params": params}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+    def request(self, kind, title, **params):
+        """
+        Make a request the current result of its content type
+
+        A request already made in this session keeps its stored value, so submitting
+        the same form twice does not generate it again.
+
+        Args:
+            kind (str): Content type
+            title (str): Label shown in the history panel
+            **params: Parameters the generator is called with
+
+        Returns:
+            dict: The request's entry
+        """
+        key = self.key(kind, **params)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = {
+                "key": key, "kind": kind, "title": title, "params": params, "value": None,
+                "refresh": False, "created_at": time.time(),
+            }
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        self._current[kind] = key
+        return entry
+
+    def current(self, kind):
+        """
+        Current request of a content type
+
+        Args:
+            kind (str): Content type
+
+        Returns:
+            dict | None: Entry, or None if nothing was requested (or it was dropped)
+        """
+        return self._entries.get(self._current.get(kind))
+
+    def save(self, entry, value):
+        """
+        Store the generated value of a request
+
+        Args:
+            entry (dict): Entry returned by request() or current()
+            value: Generated content (text, list of items or dict of sections)
+        """
+        entry["value"] = value
+        entry["refresh"] = False
+
+    def discard(self, entry):
+        """
+        Forget a request whose generation failed, so a rerun does not retry it
+
+        Args:
+            entry (dict): Entry returned by request() or current()
+        """
+        self._entries.pop(entry["key"], None)
+        if self._current.get(entry["kind"]) == entry["key"]:
+            del self._current[entry["kind"]]
+
+    def regenerate(self, kind):
+        """
+        Generate the current request of a content type again on the next run, bypassing
+        the response cache
+
+        Args:
+            kind (str): Content type
+        """
+        entry = self.current(kind)
+        if entry is not None:
+            entry["value"] = None
+            entry["refresh"] = True
+
+    def select(self, key):
+        """
+        Show a stored result again as the current one of its content type
+
+        Args:
+            key (str): Entry key
+
+        Returns:
+            dict | None: Entry, or None if it is no longer stored
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._current[entry["kind"]] = key
+        return entry
+
+    def history(self):
+        """
+        Generated results, newest first
+
+        Returns:
+            list: Entries that have a value
+        """
+        return [entry for entry in reversed(self._entries.values()) if entry["value"] is not None]
+
+    def clear(self):
+        """Forget every result of the session."""
+        self._entries.clear()
+        self._current.clear()
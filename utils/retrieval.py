@@ -0,0 +1,149 @@
+import math
+import re
+from collections import Counter
+
+CHUNK_SIZE = 1200
+CHUNK_OVERLAP = 200
+TOP_K = 4
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how in is it its of on or that the this to was were what "
+    "when where which who why will with".split()
+)
+
+
+def tokenize(text):
+    """
+    Split text into lower-cased search terms, dropping common stopwords
+
+    Args:
+        text (str): Text to tokenize
+
+    Returns:
+        list: Search terms in order of appearance
+    """
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in _STOPWORDS]
+
+
+def chunk_text(text, chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+    """
+    Split text into overlapping chunks, preferring to break on paragraph or sentence boundaries
+
+    Args:
+        text (str): Text to split
+        chunk_size (int): Maximum characters per chunk
+        overlap (int): Characters shared between consecutive chunks
+
+    Returns:
+        list: Chunk strings in document order
+    """
+    text = text.strip()
+    if not text:
+        return []
+
+    chunks = []
+    start = 0
+    length = len(text)
+    while start < length:
+        end = min(start + chunk_size, length)
+        if end < length:
+            # Back up to the nearest natural break in the second half of the window
+            for separator in ("\n\n", "\n", ". ", " "):
+                cut = text.rfind(separator, start + chunk_size // 2, end)
+                if cut != -1:
+                    end = cut + len(separator)
+                    break
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= length:
+            break
+        start = max(end - overlap, start + 1)
+    return chunks
+
+
+class BM25Index:
+    """
+    In-memory Okapi BM25 index over a list of text chunks.
+    """
+
+    def __init__(self, chunks, k1=1.5, b=0.75):
+        self.chunks = list(chunks)
+        self.k1 = k1
+        self.b = b
+        self.postings = {}
+        self.doc_lengths = []
+
+        for doc_id, chunk in enumerate(self.chunks):
+            counts = Counter(tokenize(chunk))
+            self.doc_lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self.postings.setdefault(term, []).append((doc_id, tf))
+
+        doc_count = len(self.chunks)
+        self.avg_length = sum(self.doc_lengths) / doc_count if doc_count else 0.0
+        self.idf = {
+            term: math.log(1 + (doc_count - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def search(self, query, k=TOP_K):
+        """
+        Rank chunks against a query
+
+        Args:
+            query (str): Search query
+            k (int): Number of results to return
+
+        Returns:
+            list: Up to k (score, chunk_id) tuples, best first
+        """
+        scores = {}
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_id, tf in self.postings[term]:
+                norm = 1 - self.b + self.b * self.doc_lengths[doc_id] / (self.avg_length or 1)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(score, doc_id) for doc_id, score in ranked]
+
+
+def build_index(text, chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+    """
+    Chunk a document and index the chunks
+
+    Args:
+        text (str): Extracted document text
+        chunk_size (int): Maximum characters per chunk
+        overlap (int): Characters shared between consecutive chunks
+
+    Returns:
+        BM25Index: Searchable index over the document chunks
+    """
+    return BM25Index(chunk_text(text, chunk_size, overlap))
+
+
+def retrieve_context(index, query, k=TOP_K):
+    """
+    Select the chunks most relevant to a question, in document order
+
+    Falls back to the opening chunks when nothing matches, so the prompt always has context.
+    The result is at most k chunks long regardless of document size.
+
+    Args:
+        index (BM25Index): Index built with build_index
+        query (str): User question
+        k (int): Maximum number of chunks to include
+
+    Returns:
+        list: Selected chunk strings
+    """
+    hits = index.search(query, k)
+    chunk_ids = sorted(doc_id for _, doc_id in hits) if hits else range(min(k, len(index)))
+    return [index.chunks[doc_id] for doc_id in chunk_ids]
@@ -0,0 +1,237 @@
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from utils.llm import MODEL_NAME, get_llm
+from utils.metrics import metrics
+from utils.resilience import FALLBACK_MODEL, deadline_for
+
+# Model and sampling temperature per tier, fastest last (override through .env)
+TIERS = {
+    "large": os.getenv("EDUTUTOR_MODEL_LARGE", MODEL_NAME),
+    "fast": os.getenv("EDUTUTOR_MODEL_FAST", "mistralai/mistral-7b-instruct"),
+}
+DOWNGRADES = {"large": "fast"}
+DEFAULT_TIER = "large"
+DEFAULT_TEMPERATURE = 0.7
+
+# Content type (or "content type/detail level") -> tier, e.g. "lesson=fast,lesson/Comprehensive=large"
+ROUTES = {
+    "lesson": "large",
+    "lesson/Overview": "fast",
+    "quiz": "large",
+    "quiz_json": "large",
+    "exercises": "large",
+    "flashcards": "fast",
+    "flashcards_json": "fast",
+    "flashcards_shard": "fast",
+    "subtopics": "fast",
+    "summary": "large",
+    "summary_chunk": "fast",
+    "chat_summary": "fast",
+}
+ROUTES.update({
+    route.strip(): tier.strip()
+    for route, _, tier in (item.partition("=") for item in os.getenv("EDUTUTOR_ROUTES", "").split(","))
+    if route.strip() and tier.strip() in TIERS
+})
+# Structured output parses more reliably with less sampling noise
+TEMPERATURES = {
+    "quiz_json": 0.3,
+    "flashcards_json": 0.3,
+    "flashcards_shard": 0.3,
+    "subtopics": 0.3,
+    "summary_chunk": 0.3,
+    "chat_summary": 0.3,
+}
+
+# Downgrade a content type to the next faster tier while its model's recent p95 latency
+# passes this fraction of the content type's deadline, or its error rate passes the limit
+DOWNGRADE_LATENCY_FRACTION = float(os.getenv("EDUTUTOR_ROUTER_LATENCY_FRACTION", 0.5))
+DOWNGRADE_ERROR_RATE = float(os.getenv("EDUTUTOR_ROUTER_ERROR_RATE", 0.25))
+ROUTER_MIN_SAMPLES = int(os.getenv("EDUTUTOR_ROUTER_MIN_SAMPLES", 10))
+# How long a downgrade lasts before the preferred tier is tried again
+DOWNGRADE_COOLDOWN = float(os.getenv("EDUTUTOR_ROUTER_COOLDOWN", 120))
+
+# (content type, model) decided by an enclosing cached_response call
+_pinned = contextvars.ContextVar("edututor_routed_model", default=None)
+
+
+def temperature_for(kind):
+    """
+    Sampling temperature for a content type, on every model including the fallback
+
+    Args:
+        kind (str): Content type
+
+    Returns:
+        float: Temperature
+    """
+    return TEMPERATURES.get(kind, DEFAULT_TEMPERATURE)
+
+
+class ModelRouter:
+    """
+    Picks the model tier for each call from a routing table, with automatic downgrades.
+
+    The table maps a content type, optionally refined by detail level, to a tier, so
+    small structured requests go to the fast model and heavy ones to the large one.
+    The router watches the rolling latency and error statistics that utils.metrics
+    keeps per model and content type; when the preferred model is too slow or failing
+    for a content type, that content type moves to the next faster tier for a cooldown
+    period, then the preferred tier is tried again with fresh statistics.
+    """
+
+    def __init__(self, tiers=TIERS, routes=ROUTES, downgrades=DOWNGRADES):
+        self.tiers = tiers
+        self.routes = routes
+        self.downgrades = downgrades
+        self._lock = threading.Lock()
+        # kind -> (downgraded until, monotonic) and kind -> start of the current stats period (Unix time)
+        self._downgraded = {}
+        self._since = {}
+        self._counters = {"routed": 0, "downgraded": 0, "downgrades": 0, "restores": 0}
+
+    def preferred_tier(self, kind, detail_level=None):
+        """
+        Tier the routing table assigns to a request
+
+        Args:
+            kind (str): Content type
+            detail_level (str, optional): Detail level, for content types that have one
+
+        Returns:
+            str: Tier name
+        """
+        if detail_level is not None and f"{kind}/{detail_level}" in self.routes:
+            return self.routes[f"{kind}/{detail_level}"]
+        return self.routes.get(kind, DEFAULT_TIER)
+
+    def _too_slow(self, kind, model, since):
+        stats = metrics.window_stats("llm", kind=kind, model=model, since=since)
+        if stats["count"] < ROUTER_MIN_SAMPLES:
+            return False
+        limit = DOWNGRADE_LATENCY_FRACTION * deadline_for(kind)
+        return stats["error_rate"] > DOWNGRADE_ERROR_RATE or (stats["p95"] is not None and stats["p95"] > limit)
+
+    def route(self, kind, detail_level=None):
+        """
+        Tier to use for a request right now
+
+        Args:
+            kind (str): Content type
+            detail_level (str, optional): Detail level, for content types that have one
+
+        Returns:
+            str: Tier name
+        """
+        tier = self.preferred_tier(kind, detail_level)
+        faster = self.downgrades.get(tier)
+        with self._lock:
+            check = faster is not None and kind not in self._downgraded
+            since = self._since.get(kind)
+        # The metrics scan runs outside the lock so concurrent routing does not queue behind it
+        too_slow = check and self._too_slow(kind, self.tiers[tier], since)
+        now = time.monotonic()
+        with self._lock:
+            self._counters["routed"] += 1
+            if faster is None:
+                return tier
+            until = self._downgraded.get(kind)
+            if until is not None:
+                if now < until:
+                    self._counters["downgraded"] += 1
+                    return faster
+                # Cooldown over: judge the preferred model on new calls only
+                del self._downgraded[kind]
+                self._since[kind] = time.time()
+                self._counters["restores"] += 1
+                return tier
+            if not too_slow:
+                return tier
+            self._downgraded[kind] = now + DOWNGRADE_COOLDOWN
+            self._counters["downgrades"] += 1
+            self._counters["downgraded"] += 1
+        metrics.count("llm_downgrades", kind=kind, model=self.tiers[tier])
+        return faster
+
+    def model(self, kind, detail_level=None):
+        """
+        Model to use for a request right now
+
+        Args:
+            kind (str): Content type
+            detail_level (str, optional): Detail level, for content types that have one
+
+        Returns:
+            str: Model name of the routed tier
+        """
+        return self.tiers[self.route(kind, detail_level)]
+
+    @contextmanager
+    def pinned(self, kind, model):
+        """
+        Send the enclosed calls of a content type to a model decided earlier
+
+        cached_response routes before building its cache key and pins the result, so
+        the response is generated by the model the key (and metric tags) name.
+
+        Args:
+            kind (str): Content type
+            model (str): Model name
+        """
+        token = _pinned.set((kind, model))
+        try:
+            yield
+        finally:
+            _pinned.reset(token)
+
+    def client(self, kind, detail_level=None):
+        """
+        Shared chat model client for a request
+
+        Args:
+            kind (str): Content type
+            detail_level (str, optional): Detail level, for content types that have one
+
+        Returns:
+            ChatOpenAI: Client for the pinned or routed model at the content type's temperature
+        """
+        pinned = _pinned.get()
+        model = pinned[1] if pinned is not None and pinned[0] == kind else self.model(kind, detail_level)
+        return get_llm(model, temperature_for(kind))
+
+    def fallback_client(self, kind):
+        """
+        Shared client for the fallback model at the content type's temperature
+
+        Args:
+            kind (str): Content type
+
+        Returns:
+            ChatOpenAI | None: Client, or None when no fallback model is configured
+        """
+        return get_llm(FALLBACK_MODEL, temperature_for(kind)) if FALLBACK_MODEL else None
+
+    def stats(self):
+        """
+        Routing counters, active downgrades and rolling statistics per model
+
+        Returns:
+            dict: Counters, "downgraded" content types with seconds left, and "models"
+            with each tier's model, call count, error rate and p50/p95 latency
+        """
+        now = time.monotonic()
+        with self._lock:
+            stats = dict(self._counters)
+            stats["active_downgrades"] = {kind: round(until - now, 1) for kind, until in self._downgraded.items()
+                                          if until > now}
+        stats["models"] = {tier: {"model": model, **metrics.window_stats("llm", model=model)}
+                           for tier, model in self.tiers.items()}
+        return stats
+
+
+# Shared by every Streamlit session in this process
+router = ModelRouter()
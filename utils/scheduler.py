@@ -0,0 +1,186 @@
+import contextvars
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Priority classes (lower runs first)
+INTERACTIVE = 0
+DEFAULT = 1
+BACKGROUND = 2
+
+# Scheduler settings (override through .env)
+MAX_CONCURRENCY = int(os.getenv("EDUTUTOR_LLM_CONCURRENCY", 8))
+REQUESTS_PER_MINUTE = float(os.getenv("EDUTUTOR_LLM_RPM", 60))
+TOKENS_PER_MINUTE = float(os.getenv("EDUTUTOR_LLM_TPM", 100000))
+MAX_QUEUE_DEPTH = int(os.getenv("EDUTUTOR_LLM_MAX_QUEUE", 64))
+MAX_QUEUE_WAIT = float(os.getenv("EDUTUTOR_LLM_MAX_WAIT", 30))
+
+_priority = contextvars.ContextVar("edututor_llm_priority", default=DEFAULT)
+
+
+class SchedulerBusy(RuntimeError):
+    """Raised instead of queueing when the LLM scheduler cannot take more work."""
+
+
+@contextmanager
+def priority(level):
+    """
+    Run the enclosed LLM calls at the given priority class
+
+    Args:
+        level (int): INTERACTIVE, DEFAULT or BACKGROUND
+    """
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority():
+    """
+    Priority class of the current context
+
+    Returns:
+        int: INTERACTIVE, DEFAULT or BACKGROUND
+    """
+    return _priority.get()
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at ``per_minute / 60`` tokens per second.
+
+    A rate of 0 disables the limit.
+    """
+
+    def __init__(self, per_minute):
+        self.rate = per_minute / 60
+        self.capacity = per_minute
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """Seconds until ``amount`` tokens are available (0 if they are now)."""
+        if not self.rate:
+            return 0.0
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def take(self, amount):
+        if self.rate:
+            self.tokens -= min(amount, self.capacity)
+
+
+class LLMScheduler:
+    """
+    Process-wide admission control for upstream LLM calls.
+
+    Calls wait in a priority queue until a concurrency slot is free and both the
+    request and token rate limits allow them. When the queue is full, or a call
+    would wait longer than ``max_wait`` seconds, SchedulerBusy is raised so the UI
+    can answer right away instead of spinning.
+    """
+
+    def __init__(self, max_concurrency=MAX_CONCURRENCY, requests_per_minute=REQUESTS_PER_MINUTE,
+                 tokens_per_minute=TOKENS_PER_MINUTE, max_queue_depth=MAX_QUEUE_DEPTH, max_wait=MAX_QUEUE_WAIT):
+        self.max_concurrency = max_concurrency
+        self.max_queue_depth = max_queue_depth
+        self.max_wait = max_wait
+        self._requests = TokenBucket(requests_per_minute)
+        self._tokens = TokenBucket(tokens_per_minute)
+        self._cond = threading.Condition()
+        self._queue = []
+        self._seq = itertools.count()
+        self._active = 0
+        self._counters = {"granted": 0, "rejected": 0, "timed_out": 0, "queue_wait_seconds": 0.0}
+
+    def _drop(self, ticket):
+        self._queue.remove(ticket)
+        heapq.heapify(self._queue)
+        self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, tokens=0, level=None, max_wait=None):
+        """
+        Hold one upstream call slot for the duration of the with-block
+
+        Args:
+            tokens (int): Estimated prompt plus completion tokens for the call
+            level (int, optional): Priority class, defaults to the current context's
+            max_wait (float, optional): Seconds to wait at most, if shorter than the
+                scheduler's own limit
+
+        Yields:
+            float: Seconds spent waiting in the queue
+
+        Raises:
+            SchedulerBusy: If the queue is full or the wait would exceed max_wait
+        """
+        level = current_priority() if level is None else level
+        ticket = (level, next(self._seq))
+        start = time.monotonic()
+        deadline = start + (self.max_wait if max_wait is None else min(self.max_wait, max_wait))
+
+        with self._cond:
+            if len(self._queue) >= self.max_queue_depth:
+                self._counters["rejected"] += 1
+                raise SchedulerBusy("EduTutor AI is busy right now. Please try again in a moment.")
+            heapq.heappush(self._queue, ticket)
+            try:
+                while True:
+                    wait = None
+                    if self._queue[0] == ticket and self._active < self.max_concurrency:
+                        wait = max(self._requests.wait_time(1), self._tokens.wait_time(tokens))
+                        if wait == 0:
+                            break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._counters["timed_out"] += 1
+                        raise SchedulerBusy("EduTutor AI is busy right now. Please try again in a moment.")
+                    self._cond.wait(min(wait, remaining) if wait else remaining)
+            except BaseException:
+                self._drop(ticket)
+                raise
+            heapq.heappop(self._queue)
+            self._requests.take(1)
+            self._tokens.take(tokens)
+            self._active += 1
+            self._counters["granted"] += 1
+            waited = time.monotonic() - start
+            self._counters["queue_wait_seconds"] += waited
+            # The next ticket may be able to start as well
+            self._cond.notify_all()
+
+        try:
+            yield waited
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify_all()
+
+    def stats(self):
+        """
+        Current load and admission counters
+
+        Returns:
+            dict: active, queued, granted, rejected, timed_out and total queue wait
+        """
+        with self._cond:
+            stats = dict(self._counters)
+            stats["active"] = self._active
+            stats["queued"] = len(self._queue)
+        return stats
+
+
+# Shared by every Streamlit session in this process
+scheduler = LLMScheduler()
@@ -0,0 +1,238 @@
+import math
+import os
+import re
+import threading
+import time
+import zlib
+from collections import deque
+
+from utils.retrieval import _STOPWORDS
+
+# Minimum cosine similarity for a stored response to be served for a new topic
+SIMILARITY_THRESHOLD = float(os.getenv("EDUTUTOR_SEMANTIC_THRESHOLD", 0.82))
+N_FEATURES = 2 ** 14
+MAX_ENTRIES_PER_INDEX = 2000
+AUDIT_LOG_SIZE = 500
+
+# Words that frame a request without changing its subject
+_FILLER_WORDS = frozenset(
+    "basic basics beginner beginners does do explain explained explanation fundamental fundamentals "
+    "guide intro introduction learn overview understand understanding".split()
+)
+# "how does X work" asks about X; "work" on its own is a subject (physics)
+_HOW_WORKS_RE = re.compile(r"\bhow (?:does|do) (.+?) works?\b")
+# Words plus the symbols that tell languages apart ("c" vs "c++" vs "c#")
+_WORD_RE = re.compile(r"[a-z0-9]+(?:\+\+|#)?|\+\+|#")
+# Tokens that name a different subject however similar the rest of the topic is
+_DISCRIMINATING_RE = re.compile(r"\d|\+\+|#")
+# "World War II" and "world war 2" are the same subject; single letters are left alone
+_ROMAN_NUMERALS = {
+    numeral: str(value)
+    for value, numeral in enumerate("i ii iii iv v vi vii viii ix x xi xii xiii xiv xv xvi xvii xviii xix xx".split(), 1)
+    if len(numeral) > 1
+}
+
+
+def _stem(word):
+    return word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+
+
+def _words(text):
+    text = _HOW_WORKS_RE.sub(r"\1", text.lower())
+    words = [_ROMAN_NUMERALS.get(word, word) for word in _WORD_RE.findall(text) if word not in _STOPWORDS]
+    return [_stem(word) for word in words if word not in _FILLER_WORDS] or [_stem(word) for word in words]
+
+
+def topic_terms(text):
+    """
+    Subject words of a topic, ignoring filler, word order and plural endings
+
+    Args:
+        text (str): Topic string
+
+    Returns:
+        frozenset: Normalized subject words
+    """
+    return frozenset(_words(text))
+
+
+def discriminating_terms(text):
+    """
+    Subject words that carry a version or language marker (numbers, "++", "#")
+
+    Topics that differ in these are never served for each other, whatever their
+    similarity, so "C" never matches "C++" and "Python 2" never matches "Python 3".
+
+    Args:
+        text (str): Topic string
+
+    Returns:
+        frozenset: Normalized subject words containing a digit or symbol
+    """
+    return frozenset(word for word in _words(text) if _DISCRIMINATING_RE.search(word))
+
+
+def _feature(token):
+    digest = zlib.crc32(token.encode("utf-8"))
+    return digest % N_FEATURES, 1.0 if digest & 0x80000000 else -1.0
+
+
+def word_feature(word):
+    """
+    Hashed feature of a whole word, as used by embed
+
+    Args:
+        word (str): Search term from tokenize
+
+    Returns:
+        tuple: (feature index below N_FEATURES, sign +1.0 or -1.0)
+    """
+    return _feature("w:" + word)
+
+
+def embed(text):
+    """
+    Embed a topic string locally with a signed hashing vectorizer
+
+    Features are whole words (weighted double, plural endings dropped) plus character
+    trigrams of each word, so small spelling variations still overlap.
+
+    Args:
+        text (str): Topic string
+
+    Returns:
+        dict: Sparse L2-normalized vector as {feature index: weight}
+    """
+    vector = {}
+    for word in _words(text):
+        index, sign = word_feature(word)
+        vector[index] = vector.get(index, 0.0) + 2.0 * sign
+        padded = f"<{word}>"
+        for i in range(len(padded) - 2):
+            index, sign = _feature("c:" + padded[i:i + 3])
+            vector[index] = vector.get(index, 0.0) + sign
+    norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+    return {index: weight / norm for index, weight in vector.items()} if norm else {}
+
+
+def similarity(a, b):
+    """
+    Cosine similarity of two vectors produced by embed
+
+    Args:
+        a (dict): First vector
+        b (dict): Second vector
+
+    Returns:
+        float: Similarity in [-1, 1]
+    """
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(index, 0.0) for index, weight in a.items())
+
+
+class SemanticCache:
+    """
+    Near-duplicate topic lookup in front of the exact-key response cache.
+
+    One vector index is kept per content type and parameter partition (difficulty,
+    detail level, ...). Each entry points at a response cache key, so expiry and
+    eviction stay with the response cache.
+    """
+
+    def __init__(self, threshold=SIMILARITY_THRESHOLD, max_entries=MAX_ENTRIES_PER_INDEX):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._indexes = {}
+        self._lock = threading.Lock()
+        self._audit = deque(maxlen=AUDIT_LOG_SIZE)
+        self._counters = {"lookups": 0, "hits": 0}
+
+    def add(self, kind, partition, topic, key):
+        """
+        Register a stored response under its topic
+
+        Args:
+            kind (str): Content type
+            partition (str): Identifier of the non-topic parameters
+            topic (str): Topic the response was generated for
+            key (str): Response cache key of the stored response
+        """
+        vector = embed(topic)
+        if not vector:
+            return
+        with self._lock:
+            index = self._indexes.setdefault((kind, partition), deque(maxlen=self.max_entries))
+            index.append((vector, discriminating_terms(topic), topic, key))
+
+    def lookup(self, kind, partition, topic, threshold=None):
+        """
+        Find the most similar stored topic about the same subject
+
+        Entries whose discriminating_terms differ from the requested topic's are never
+        served; the audit log still records the closest entry overall, to help tune
+        the threshold.
+
+        Args:
+            kind (str): Content type
+            partition (str): Identifier of the non-topic parameters
+            topic (str): Topic being requested
+            threshold (float, optional): Override for the configured threshold
+
+        Returns:
+            tuple | None: (key, score, matched_topic) when the best score passes the
+            threshold, otherwise None
+        """
+        threshold = self.threshold if threshold is None else threshold
+        vector = embed(topic)
+        terms = discriminating_terms(topic)
+        best = (None, 0.0, None)
+        closest = best
+        with self._lock:
+            for stored_vector, stored_terms, stored_topic, key in self._indexes.get((kind, partition), ()):
+                score = similarity(vector, stored_vector)
+                if score > closest[1]:
+                    closest = (key, score, stored_topic)
+                if stored_terms == terms and score > best[1]:
+                    best = (key, score, stored_topic)
+            hit = best[0] is not None and best[1] >= threshold
+            if not hit:
+                best = closest
+            self._counters["lookups"] += 1
+            self._counters["hits"] += int(hit)
+            self._audit.append({
+                "time": time.time(),
+                "kind": kind,
+                "topic": topic,
+                "matched_topic": best[2],
+                "score": round(best[1], 4),
+                "hit": hit,
+            })
+        return best if hit else None
+
+    def audit_log(self):
+        """
+        Recent lookups with their best similarity scores, newest last
+
+        Returns:
+            list: Dicts with time, kind, topic, matched_topic, score and hit
+        """
+        with self._lock:
+            return list(self._audit)
+
+    def stats(self):
+        """
+        Lookup counters and index sizes
+
+        Returns:
+            dict: Lookups, hits, threshold and number of indexed topics
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            stats["entries"] = sum(len(index) for index in self._indexes.values())
+        stats["threshold"] = self.threshold
+        return stats
+
+
+# Shared by every Streamlit session in this process
+semantic_cache = SemanticCache()
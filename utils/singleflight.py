@@ -0,0 +1,178 @@
+import contextvars
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _StreamCall:
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.cond = threading.Condition()
+        # Counted under SingleFlight._lock; the upstream stream stops once the last one leaves
+        self.subscribers = 0
+        self.abandoned = False
+
+    def subscribe(self):
+        position = 0
+        while True:
+            with self.cond:
+                while position >= len(self.chunks) and not self.done:
+                    self.cond.wait()
+                if position < len(self.chunks):
+                    chunk = self.chunks[position]
+                    position += 1
+                elif self.error is not None:
+                    raise self.error
+                else:
+                    return
+            yield chunk
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical requests into one upstream call.
+
+    While a call for a key is in flight, later callers with the same key wait for it
+    and receive the same result instead of issuing their own request.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._counters = {"issued": 0, "coalesced": 0}
+
+    def _join(self, key, factory):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self._counters["coalesced"] += 1
+                leader = False
+            else:
+                call = factory()
+                self._calls[key] = call
+                self._counters["issued"] += 1
+                leader = True
+            if isinstance(call, _StreamCall):
+                call.subscribers += 1
+            return call, leader
+
+    def _finish(self, key, call):
+        with self._lock:
+            # An abandoned stream's key may already belong to a newer call
+            if self._calls.get(key) is call:
+                del self._calls[key]
+
+    def do(self, key, fn):
+        """
+        Run fn once for all concurrent callers with the same key
+
+        Args:
+            key (str): Request key
+            fn (callable): Zero-argument function performing the request
+
+        Returns:
+            Any: Result of fn, shared by every caller that joined the call
+        """
+        call, leader = self._join(key, _Call)
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            self._finish(key, call)
+            call.event.set()
+        return call.result
+
+    def stream(self, key, fn, on_complete=None):
+        """
+        Share one streamed response between all concurrent callers with the same key
+
+        The upstream stream is consumed on a background thread, so every subscriber
+        (including the first) receives chunks as they arrive and a slow or abandoned
+        reader does not hold up the others. Once every subscriber has closed its iterator
+        before the end, the upstream stream is closed at its next chunk (releasing its
+        scheduler slot) and on_complete is not called; later callers start a new one.
+
+        Args:
+            key (str): Request key
+            fn (callable): Zero-argument function returning an iterator of str chunks
+            on_complete (callable, optional): Called with the full text once the stream ends
+
+        Returns:
+            iterator: Chunks of the shared response
+        """
+        # Separate key space, so a streamed and a non-streamed call never share a _Call
+        key = ("stream", key)
+        call, leader = self._join(key, _StreamCall)
+        if leader:
+            # Run in a copy of the caller's context so its scheduler priority carries over
+            context = contextvars.copy_context()
+            threading.Thread(target=context.run, args=(self._pump, key, call, fn, on_complete), daemon=True).start()
+        return self._subscribe(key, call)
+
+    def _subscribe(self, key, call):
+        try:
+            yield from call.subscribe()
+        finally:
+            with self._lock:
+                call.subscribers -= 1
+                if call.subscribers == 0 and not call.done:
+                    # Nobody is listening any more: new callers must not join a stream
+                    # that is about to stop
+                    call.abandoned = True
+                    if self._calls.get(key) is call:
+                        del self._calls[key]
+
+    def _pump(self, key, call, fn, on_complete):
+        chunks = None
+        try:
+            chunks = fn()
+            for chunk in chunks:
+                with call.cond:
+                    call.chunks.append(chunk)
+                    call.cond.notify_all()
+                if call.abandoned:
+                    break
+            else:
+                if on_complete:
+                    on_complete("".join(call.chunks))
+        except Exception as e:
+            call.error = e
+        finally:
+            close = getattr(chunks, "close", None)
+            if close:
+                close()
+            self._finish(key, call)
+            with call.cond:
+                call.done = True
+                call.cond.notify_all()
+
+    def stats(self):
+        """
+        Issued vs coalesced request counts
+
+        Returns:
+            dict: issued, coalesced and in_flight counts
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            stats["in_flight"] = len(self._calls)
+        return stats
+
+
+# Shared by every Streamlit session in this process
+single_flight = SingleFlight()
@@ -0,0 +1,224 @@
+import json
+import re
+
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+_PAIR_RE = re.compile(r'"(\w+)"\s*:\s*"((?:[^"\\]|\\.)*)')
+
+
+class JSONObjectStreamParser:
+    """
+    Incremental parser that pulls complete JSON objects out of a streamed completion.
+
+    Feed it chunks as they arrive; every top-level ``{...}`` object (typically the items
+    of a JSON array) is returned as soon as its closing brace is seen. Text outside
+    objects, such as array brackets or stray prose, is ignored.
+    """
+
+    def __init__(self):
+        self._current = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk):
+        """
+        Consume a chunk of streamed text
+
+        Args:
+            chunk (str): Next piece of the completion
+
+        Returns:
+            list: Raw JSON text of each object completed in this chunk
+        """
+        completed = []
+        for ch in chunk:
+            if self._depth == 0:
+                if ch == "{":
+                    self._depth = 1
+                    self._current = [ch]
+                continue
+
+            self._current.append(ch)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    completed.append("".join(self._current))
+                    self._current = []
+        return completed
+
+    def close(self):
+        """
+        Flush an object left unterminated when the stream ended
+
+        Returns:
+            str | None: Raw text of the partial object, if any
+        """
+        if self._depth == 0 or not self._current:
+            return None
+        partial = "".join(self._current)
+        self._current = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        return partial
+
+
+def repair_json(raw):
+    """
+    Parse a JSON object, repairing common model formatting mistakes locally
+
+    Handles raw newlines inside strings, trailing commas, and unterminated strings,
+    objects or arrays. If the text still does not parse, string fields are recovered
+    with a pattern match.
+
+    Args:
+        raw (str): Text of one JSON object
+
+    Returns:
+        dict | None: Parsed object, or None if nothing could be recovered
+    """
+    try:
+        value = json.loads(raw)
+        return value if isinstance(value, dict) else None
+    except ValueError:
+        pass
+
+    fixed = []
+    closers = []
+    in_string = escape = False
+    for ch in raw.strip():
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+            elif ch == "\n":
+                ch = "\\n"
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            closers.append("}" if ch == "{" else "]")
+        elif ch in "}]" and closers:
+            closers.pop()
+        fixed.append(ch)
+    if in_string:
+        fixed.append('"')
+    text = "".join(fixed) + "".join(reversed(closers))
+    text = _TRAILING_COMMA_RE.sub(r"\1", text)
+    try:
+        value = json.loads(text)
+        if isinstance(value, dict):
+            return value
+    except ValueError:
+        pass
+
+    pairs = {key: value.replace('\\"', '"').replace("\\n", "\n") for key, value in _PAIR_RE.findall(raw)}
+    return pairs or None
+
+
+def _first(item, *names):
+    for name in names:
+        value = item.get(name)
+        if value not in (None, ""):
+            return value
+    return ""
+
+
+def normalize_flashcard(item):
+    """
+    Coerce a parsed flashcard into {"front", "back"}
+
+    Args:
+        item (dict): Parsed JSON object
+
+    Returns:
+        dict | None: Flashcard, or None if it has no front
+    """
+    front = str(_first(item, "front", "question", "term", "Front")).strip()
+    back = str(_first(item, "back", "answer", "definition", "Back")).strip()
+    return {"front": front, "back": back} if front else None
+
+
+def normalize_question(item):
+    """
+    Coerce a parsed quiz question into {"question", "options", "answer", "explanation"}
+
+    Options are returned as a list of up to four strings, and the answer as the letter
+    (A-D) of the correct option.
+
+    Args:
+        item (dict): Parsed JSON object
+
+    Returns:
+        dict | None: Quiz question, or None if it has no question text
+    """
+    question = str(_first(item, "question", "stem", "prompt")).strip()
+    if not question:
+        return None
+
+    options = _first(item, "options", "choices")
+    if isinstance(options, dict):
+        options = [options[key] for key in sorted(options)]
+    elif not isinstance(options, list):
+        options = [item[letter] for letter in "ABCD" if item.get(letter)]
+    options = [re.sub(r"^\s*[A-Da-d][.)]\s*", "", str(option)).strip() for option in options][:4]
+
+    answer = str(_first(item, "answer", "correct", "correct_answer")).strip()
+    if answer[:1].upper() in "ABCD" and (len(answer) == 1 or not answer[1:2].isalpha()):
+        answer = answer[:1].upper()
+    elif answer in options:
+        answer = "ABCD"[options.index(answer)]
+
+    return {
+        "question": question,
+        "options": options,
+        "answer": answer,
+        "explanation": str(_first(item, "explanation", "rationale")).strip(),
+    }
+
+
+def iter_structured_items(chunks, normalize):
+    """
+    Turn a streamed JSON array completion into normalized items as each one completes
+
+    Malformed items are repaired locally; items that cannot be recovered are skipped
+    instead of failing the whole set. An object that wraps the list (for example
+    ``{"cards": [...]}``) is unpacked.
+
+    Args:
+        chunks (iterator): Streamed completion text
+        normalize (callable): normalize_flashcard or normalize_question
+
+    Yields:
+        dict: Normalized items in stream order
+    """
+    parser = JSONObjectStreamParser()
+
+    def emit(raw):
+        item = repair_json(raw)
+        if item is None:
+            return []
+        nested = [value for value in item.values() if isinstance(value, list) and value
+                  and all(isinstance(entry, dict) for entry in value)]
+        entries = nested[0] if nested and len(item) == 1 else [item]
+        return [normalized for normalized in map(normalize, entries) if normalized]
+
+    for chunk in chunks:
+        for raw in parser.feed(chunk):
+            yield from emit(raw)
+    partial = parser.close()
+    if partial:
+        yield from emit(partial)
@@ -0,0 +1,166 @@
+import re
+import threading
+from collections import Counter
+
+from utils.retrieval import BM25Index, chunk_text
+
+# Rough characters-per-token ratio for English text on Mixtral-style tokenizers
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text):
+    """
+    Estimate how many tokens a piece of text will use
+
+    Args:
+        text (str): Text to measure
+
+    Returns:
+        int: Approximate token count
+    """
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def split_by_tokens(text, max_tokens, overlap_tokens=0):
+    """
+    Split text into chunks of at most roughly max_tokens tokens
+
+    Args:
+        text (str): Text to split
+        max_tokens (int): Token budget per chunk
+        overlap_tokens (int): Tokens shared between consecutive chunks
+
+    Returns:
+        list: Chunk strings in document order
+    """
+    return chunk_text(text, max_tokens * CHARS_PER_TOKEN, overlap_tokens * CHARS_PER_TOKEN)
+
+
+# Context window per model, in tokens
+CONTEXT_WINDOWS = {
+    "mistralai/mixtral-8x7b-instruct": 32768,
+    "mistralai/mistral-7b-instruct": 32768,
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+
+_BLANK_LINES_RE = re.compile(r"\n\s*\n")
+_SPACES_RE = re.compile(r"[ \t\f\v]+")
+# Page numbers, separators and similar lines that carry no content
+_BOILERPLATE_RE = re.compile(r"^\s*(page\s+\d+(\s+of\s+\d+)?|\d+|[-_=*.·•]{3,})\s*$", re.IGNORECASE)
+
+_stats = {"checked": 0, "compacted": 0, "truncated": 0, "tokens_saved": 0}
+_stats_lock = threading.Lock()
+
+
+def prompt_budget(model, reserve=0):
+    """
+    Maximum prompt tokens for a model, leaving room for the completion
+
+    Args:
+        model (str): Model name
+        reserve (int): Tokens to keep free for the completion
+
+    Returns:
+        int: Prompt token budget
+    """
+    return CONTEXT_WINDOWS.get(model, DEFAULT_CONTEXT_WINDOW) - reserve
+
+
+def _paragraphs(text):
+    return [paragraph for paragraph in _BLANK_LINES_RE.split(text) if paragraph.strip()]
+
+
+def _strip_whitespace_and_boilerplate(text):
+    lines = [_SPACES_RE.sub(" ", line).strip() for line in text.splitlines()]
+    counts = Counter(line for line in lines if line)
+    kept = []
+    for line in lines:
+        # Lines repeated on many pages (running headers/footers) are boilerplate
+        if line and (_BOILERPLATE_RE.match(line) or (counts[line] > 3 and len(line) < 80)):
+            continue
+        kept.append(line)
+    return "\n\n".join(paragraph.strip() for paragraph in _paragraphs("\n".join(kept)))
+
+
+def _drop_duplicate_paragraphs(text):
+    seen = set()
+    kept = []
+    for paragraph in _paragraphs(text):
+        fingerprint = " ".join(paragraph.lower().split())
+        if fingerprint not in seen:
+            seen.add(fingerprint)
+            kept.append(paragraph)
+    return "\n\n".join(kept)
+
+
+def _keep_relevant_paragraphs(text, budget, query=None):
+    paragraphs = _paragraphs(text)
+    if len(paragraphs) < 3:
+        return text
+    # The opening and closing paragraphs hold the instructions and the question
+    head, body, tail = paragraphs[0], paragraphs[1:-1], paragraphs[-1]
+    remaining = budget - estimate_tokens(head) - estimate_tokens(tail)
+    index = BM25Index(body)
+    ranked = [doc_id for _, doc_id in index.search(query or f"{head}\n{tail}", k=len(body))]
+    ranked_ids = set(ranked)
+    ranked += [doc_id for doc_id in range(len(body)) if doc_id not in ranked_ids]
+    selected = []
+    for doc_id in ranked:
+        cost = estimate_tokens(body[doc_id]) + 1
+        if cost <= remaining:
+            selected.append(doc_id)
+            remaining -= cost
+    return "\n\n".join([head] + [body[doc_id] for doc_id in sorted(selected)] + [tail])
+
+
+def fit_prompt(prompt, model, reserve=0, query=None):
+    """
+    Make sure a prompt fits the model's context budget before it is sent
+
+    Prompts within budget are returned unchanged. Oversized prompts are compacted step by
+    step until they fit: whitespace and boilerplate stripping, dropping duplicate
+    paragraphs, then keeping only the paragraphs most relevant to the query (or to the
+    prompt's opening and closing instructions). A hard cut is the last resort.
+
+    Args:
+        prompt (str): Fully formatted prompt
+        model (str): Model the prompt will be sent to
+        reserve (int): Tokens to keep free for the completion
+        query (str, optional): Text to rank paragraphs against
+
+    Returns:
+        str: Prompt within budget
+    """
+    budget = prompt_budget(model, reserve)
+    original_tokens = estimate_tokens(prompt)
+    with _stats_lock:
+        _stats["checked"] += 1
+    if original_tokens <= budget:
+        return prompt
+
+    for strategy in (_strip_whitespace_and_boilerplate, _drop_duplicate_paragraphs):
+        prompt = strategy(prompt)
+        if estimate_tokens(prompt) <= budget:
+            break
+    else:
+        prompt = _keep_relevant_paragraphs(prompt, budget, query)
+
+    truncated = estimate_tokens(prompt) > budget
+    if truncated:
+        prompt = prompt[:budget * CHARS_PER_TOKEN]
+    with _stats_lock:
+        _stats["compacted"] += 1
+        _stats["truncated"] += int(truncated)
+        _stats["tokens_saved"] += original_tokens - estimate_tokens(prompt)
+    return prompt
+
+
+def compaction_stats():
+    """
+    Counters for prompts checked, compacted and truncated, and tokens saved
+
+    Returns:
+        dict: Compaction counters
+    """
+    with _stats_lock:
+        return dict(_stats)